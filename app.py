@@ -8,5 +8,9 @@ from src.main import app
 application = app
 
 if __name__ == '__main__':
+    # Execução local: prepara o banco antes de subir (na Vercel, rode `flask --app app init-db`)
+    from src.seed import init_database
+    with app.app_context():
+        init_database()
     app.run(host='0.0.0.0', port=5000, debug=False)
 
@@ -0,0 +1,131 @@
+"""
+Benchmark do motor metabólico: cálculo por objeto (implementação original de
+User.calculate_bmr/tdee/macros) versus cálculo vetorizado em lote.
+
+Uso:
+    python benchmarks/bench_metabolic_engine.py --patients 10000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services import metabolic_engine
+
+FREQUENCIES = ['sedentario', 'leve', 'moderado', 'intenso', 'muito_intenso', None]
+GOALS = ['perder_peso', 'ganhar_peso', 'ganhar_massa', 'manter_peso', None]
+
+
+class LegacyProfile:
+    """Cópia dos métodos escalares originais de User, usada como referência"""
+
+    def __init__(self, weight, height, age, exercise_frequency, goal):
+        self.weight = weight
+        self.height = height
+        self.age = age
+        self.exercise_frequency = exercise_frequency
+        self.goal = goal
+
+    def calculate_bmr(self):
+        if not self.weight or not self.height or not self.age:
+            return None
+        bmr = 88.362 + (13.397 * self.weight) + (4.799 * self.height) - (5.677 * self.age)
+        return round(bmr, 2)
+
+    def calculate_tdee(self):
+        bmr = self.calculate_bmr()
+        if not bmr:
+            return None
+        factor = metabolic_engine.ACTIVITY_FACTORS.get(self.exercise_frequency, 1.2)
+        return round(bmr * factor, 2)
+
+    def calculate_macros(self):
+        tdee = self.calculate_tdee()
+        if not tdee:
+            return None
+        if self.goal == 'perder_peso':
+            calories = tdee * 0.85
+        elif self.goal == 'ganhar_peso':
+            calories = tdee * 1.15
+        else:
+            calories = tdee
+        return {
+            'calories': round(calories, 0),
+            'protein_g': round((calories * 0.25) / 4, 1),
+            'carb_g': round((calories * 0.45) / 4, 1),
+            'fat_g': round((calories * 0.30) / 9, 1)
+        }
+
+
+def make_profiles(n, seed=42):
+    rng = random.Random(seed)
+    profiles = []
+    for _ in range(n):
+        profiles.append((
+            round(rng.uniform(45, 130), 1) if rng.random() > 0.05 else None,
+            round(rng.uniform(150, 200), 1),
+            rng.randint(18, 80),
+            rng.choice(FREQUENCIES),
+            rng.choice(GOALS)
+        ))
+    return profiles
+
+
+def timed(fn, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--patients', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    profiles = make_profiles(args.patients)
+    legacy_objects = [LegacyProfile(*p) for p in profiles]
+
+    # Como to_dict/rotas usavam: TMB, TDEE e macros chamados separadamente (TMB calculada 3x)
+    def legacy():
+        return [(o.calculate_bmr(), o.calculate_tdee(), o.calculate_macros()) for o in legacy_objects]
+
+    def batch():
+        return metabolic_engine.compute_batch(*zip(*profiles))
+
+    def scalar():
+        return [metabolic_engine.compute_profile(*p) for p in profiles]
+
+    legacy_time, legacy_result = timed(legacy, args.repeat)
+    batch_time, batch_result = timed(batch, args.repeat)
+    scalar_time, _ = timed(scalar, 1)
+
+    # Confere que o motor reproduz os valores originais
+    bmr = metabolic_engine.to_list(batch_result['bmr'])
+    calories = metabolic_engine.to_list(batch_result['calories'])
+    mismatches = sum(
+        1 for i, (l_bmr, _, l_macros) in enumerate(legacy_result)
+        if l_bmr != bmr[i] or (l_macros['calories'] if l_macros else None) != calories[i]
+    )
+
+    print(f"Perfis: {args.patients}")
+    print(f"{'método':<28}{'tempo total':>14}{'por perfil':>14}")
+    for name, elapsed in (
+        ('por objeto (original)', legacy_time),
+        ('escalar via motor', scalar_time),
+        ('lote vetorizado', batch_time),
+    ):
+        print(f"{name:<28}{elapsed * 1000:>11.2f} ms{elapsed / args.patients * 1e6:>11.2f} µs")
+    print(f"Speedup do lote: {legacy_time / batch_time:.1f}x")
+    print(f"Divergências: {mismatches}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Micro-benchmark do hashing de senhas: custo de uma verificação (login) em cada
+configuração de PASSWORD_HASH_METHOD, em logins/s por núcleo, e a vazão do
+PasswordHasher com várias threads (hashlib libera o GIL durante o KDF).
+
+Uso:
+    python benchmarks/bench_password_hashing.py
+    python benchmarks/bench_password_hashing.py --methods scrypt:32768:8:1 pbkdf2:sha256:600000 --threads 4
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from src.services.passwords import PasswordHasher
+
+DEFAULT_METHODS = [
+    'scrypt:16384:8:1',
+    'scrypt:32768:8:1',   # padrão do Werkzeug
+    'scrypt:65536:8:1',
+    'pbkdf2:sha256:260000',
+    'pbkdf2:sha256:600000',  # padrão pbkdf2 do Werkzeug
+    'pbkdf2:sha256:1000000',
+]
+
+
+def single_core(method, rounds):
+    stored = generate_password_hash('senha-de-teste', method)
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        check_password_hash(stored, 'senha-de-teste')
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def pooled(method, threads, rounds):
+    hasher = PasswordHasher()
+    hasher.configure(method, workers=threads, queue_size=threads * rounds)
+    stored = generate_password_hash('senha-de-teste', method)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as clients:
+        list(clients.map(lambda _: hasher.verify(stored, 'senha-de-teste'), range(threads * rounds)))
+    return threads * rounds / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--methods', nargs='+', default=DEFAULT_METHODS)
+    parser.add_argument('--rounds', type=int, default=10, help='Verificações por medição')
+    parser.add_argument('--threads', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    print(f'Núcleos: {os.cpu_count()} | threads do pool: {args.threads}')
+    print(f"{'método':<24}{'ms/login':>10}{'logins/s/núcleo':>17}{f'logins/s ({args.threads} thr)':>20}")
+    for method in args.methods:
+        seconds = single_core(method, args.rounds)
+        throughput = pooled(method, args.threads, args.rounds)
+        print(f'{method:<24}{seconds * 1000:>10.1f}{1 / seconds:>17.1f}{throughput:>20.1f}')
+
+
+if __name__ == '__main__':
+    main()
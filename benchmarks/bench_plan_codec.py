@@ -0,0 +1,145 @@
+"""
+Benchmark do codec de planos: tamanho armazenado e custo de codificação/decodificação
+de planos realistas (mesmo formato que o prompt pede ao Gemini) em cada codec.
+
+Uso:
+    python benchmarks/bench_plan_codec.py --plans 500
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services import plan_codec
+
+FOODS = [
+    ('Peito de frango', '150g', 12.00, 248, 46, 0, 5), ('Arroz integral', '100g', 1.20, 124, 3, 26, 1),
+    ('Feijão carioca', '100g', 0.90, 76, 5, 14, 0.5), ('Ovos', '2 unidades', 2.00, 140, 12, 1, 10),
+    ('Aveia', '40g', 1.50, 152, 5, 27, 3), ('Banana', '1 unidade', 1.00, 105, 1, 27, 0.4),
+    ('Salmão', '120g', 15.00, 250, 25, 0, 16), ('Batata doce', '150g', 2.00, 129, 2, 30, 0.2),
+    ('Brócolis', '100g', 3.00, 34, 3, 7, 0.4), ('Iogurte natural', '170g', 3.50, 100, 6, 8, 5),
+    ('Queijo branco', '30g', 2.50, 75, 5, 1, 6), ('Pão integral', '2 fatias', 2.00, 160, 8, 28, 2),
+    ('Azeite de oliva', '10ml', 0.80, 88, 0, 0, 10), ('Tomate', '1 unidade', 1.00, 20, 1, 4, 0.2),
+    ('Quinoa', '50g', 4.00, 185, 7, 32, 3), ('Castanha-do-pará', '15g', 2.20, 98, 2, 2, 10),
+]
+SENTENCES = [
+    'Distribuição calórica ajustada ao gasto energético total estimado pela equação de Harris-Benedict.',
+    'Priorize alimentos minimamente processados e mantenha a hidratação ao longo do dia.',
+    'O histórico familiar sugere atenção ao consumo de sódio e gorduras saturadas.',
+    'Ajuste as porções conforme a evolução do peso nas próximas quatro semanas.',
+    'A proteína distribuída entre as refeições favorece a síntese proteica muscular.',
+    'Prefira preparações grelhadas, assadas ou cozidas no vapor.',
+    'Reavalie o plano se houver alteração significativa na rotina de treinos ou de sono.',
+]
+
+
+def build_meal(rng, name, timing):
+    ingredients = []
+    for item, quantity, price, calories, protein, carbs, fat in rng.sample(FOODS, rng.randint(3, 6)):
+        ingredients.append({
+            'item': item, 'quantity': quantity, 'price': price, 'calories': calories,
+            'protein': protein, 'carbs': carbs, 'fat': fat
+        })
+    return {
+        'name': name,
+        'ingredients': ingredients,
+        'preparation': ' '.join(rng.sample(SENTENCES, 3)),
+        'total_calories': sum(i['calories'] for i in ingredients),
+        'total_cost': round(sum(i['price'] for i in ingredients), 2),
+        'macros': {
+            'protein': sum(i['protein'] for i in ingredients),
+            'carbs': sum(i['carbs'] for i in ingredients),
+            'fat': sum(i['fat'] for i in ingredients)
+        },
+        'timing': timing
+    }
+
+
+def build_plan(rng):
+    meals = {
+        'breakfast': build_meal(rng, 'Café da manhã', '7h00 - Otimiza metabolismo matinal'),
+        'lunch': build_meal(rng, 'Almoço', '12h00 - Pico energético do dia'),
+        'dinner': build_meal(rng, 'Jantar', '19h00 - Facilita digestão noturna'),
+    }
+    snacks = [build_meal(rng, f'Lanche {n + 1}', '15h00 - Sustenta energia') for n in range(rng.randint(1, 3))]
+    all_meals = list(meals.values()) + snacks
+    return {
+        'plan_type': rng.choice(['Plano para Emagrecimento', 'Plano para Ganho de Massa', 'Plano Balanceado']),
+        **meals,
+        'snacks': snacks,
+        'daily_totals': {
+            'total_calories': sum(m['total_calories'] for m in all_meals),
+            'total_cost': round(sum(m['total_cost'] for m in all_meals), 2),
+            'protein_g': sum(m['macros']['protein'] for m in all_meals),
+            'carbs_g': sum(m['macros']['carbs'] for m in all_meals),
+            'fat_g': sum(m['macros']['fat'] for m in all_meals),
+            'fiber_g': rng.randint(20, 35),
+            'sodium_mg': rng.randint(1500, 2300)
+        },
+        'shopping_list': [
+            {'item': item, 'quantity': quantity, 'estimated_price': round(price * 4, 2), 'where_to_buy': 'Supermercado'}
+            for item, quantity, price, *_ in rng.sample(FOODS, 10)
+        ],
+        'nutritionist_notes': {
+            key: ' '.join(rng.sample(SENTENCES, 2))
+            for key in ('metabolic_analysis', 'family_prevention', 'lifestyle_adaptations',
+                        'supplement_recommendations', 'monitoring_tips')
+        },
+        'scientific_rationale': {
+            key: ' '.join(rng.sample(SENTENCES, 2))
+            for key in ('caloric_distribution', 'macro_rationale', 'timing_science', 'ingredient_selection')
+        }
+    }
+
+
+def measure(fn, items):
+    timings = []
+    results = []
+    for item in items:
+        start = time.perf_counter()
+        results.append(fn(item))
+        timings.append((time.perf_counter() - start) * 1e6)
+    return results, statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--plans', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    plans = [build_plan(rng) for _ in range(args.plans)]
+
+    raw, encode_us = measure(plan_codec.serialize, plans)
+    _, decode_us = measure(json.loads, raw)
+    raw_size = sum(len(blob) for blob in raw)
+
+    print(f'Planos: {args.plans} | JSON médio: {raw_size / args.plans:.0f} bytes')
+    print(f"{'codec':<12}{'bytes/plano':>12}{'razão':>9}{'encode µs':>12}{'decode µs':>12}")
+    print(f"{'json':<12}{raw_size / args.plans:>12.0f}{1:>9.2f}{encode_us:>12.1f}{decode_us:>12.1f}")
+
+    codecs = [('zlib', level) for level in (1, 6, 9)]
+    if plan_codec.zstandard is not None:
+        codecs += [('zstd', level) for level in (3, 10, 19)]
+    else:
+        print('(zstandard não instalado: codec zstd ignorado)')
+
+    for codec, level in codecs:
+        os.environ[f'PLAN_DATA_{codec.upper()}_LEVEL'] = str(level)
+        payloads, encode_us = measure(lambda plan: plan_codec.encode(plan, codec), plans)
+        decoded, decode_us = measure(plan_codec.decode, payloads)
+        assert decoded == plans, f'{codec}: plano decodificado difere do original'
+
+        size = sum(len(payload) for payload in payloads)
+        label = f'{codec}-{level}'
+        print(f'{label:<12}{size / args.plans:>12.0f}{raw_size / size:>9.2f}{encode_us:>12.1f}{decode_us:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark de cold start do entry point (app.py): cada rodada é um processo Python novo
+que mede o import com `-X importtime` e a latência das primeiras requisições.
+
+Uso:
+    python benchmarks/bench_startup.py --runs 5
+    python benchmarks/bench_startup.py --json > startup.json   # para acompanhar entre versões
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Executado no processo filho: importa o app e faz as primeiras requisições
+CHILD = """
+import json, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+timings = {'import_ms': (imported - started) * 1000}
+for label, path in (('first_health_ms', '/api/health'), ('second_health_ms', '/api/health'),
+                    ('first_index_ms', '/'), ('second_index_ms', '/')):
+    start = time.perf_counter()
+    response = client.get(path, headers={'Accept-Encoding': 'gzip, br'})
+    timings[label] = (time.perf_counter() - start) * 1000
+    assert response.status_code < 500, (path, response.status_code)
+print('BENCH' + json.dumps(timings))
+"""
+
+IMPORT_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def run_once(env):
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CHILD],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    timings = json.loads(result.stdout.split('BENCH', 1)[1])
+
+    modules = {}
+    for match in IMPORT_LINE.finditer(result.stderr):
+        self_us, cumulative_us, indent, name = match.groups()
+        modules[name] = (int(self_us), int(cumulative_us), len(indent))
+    timings['importtime_app_ms'] = modules['app'][1] / 1000 if 'app' in modules else None
+    return timings, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10, help='Pacotes mais caros a listar')
+    parser.add_argument('--json', action='store_true', help='Saída em JSON')
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault('JWT_SECRET_KEY', 'bench-startup-' + 'x' * 32)
+    env.setdefault('NEON_DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench_startup.db'))
+    env.setdefault('STATUS_REFRESH_INTERVAL', '3600')
+
+    runs, last_modules = [], {}
+    for _ in range(args.runs):
+        timings, last_modules = run_once(env)
+        runs.append(timings)
+
+    summary = {key: round(statistics.median(run[key] for run in runs), 2) for key in runs[0]}
+
+    # Custo por pacote de terceiros e por módulo src.* de primeiro nível
+    top_level = {}
+    for name, (_, cumulative, _) in last_modules.items():
+        package = name.split('.')[0]
+        if package == 'app' or (package == 'src' and name.count('.') != 1):
+            continue
+        key = name if package == 'src' else package
+        top_level[key] = max(top_level.get(key, 0), cumulative)
+    slowest = sorted(top_level.items(), key=lambda item: -item[1])[:args.top]
+
+    if args.json:
+        print(json.dumps({'runs': args.runs, 'median': summary, 'slowest_imports_ms': {
+            name: round(us / 1000, 1) for name, us in slowest
+        }}, indent=2))
+        return
+
+    print(f'Rodadas: {args.runs} (mediana)')
+    for key, value in summary.items():
+        print(f'  {key:<22}{value:>10.1f}')
+    print('Imports mais caros (cumulativo, última rodada):')
+    for name, us in slowest:
+        print(f'  {name:<40}{us / 1000:>8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""
+Benchmark da divisão vertical de users: tamanho médio da linha e latência das consultas
+de login, validação de token e listagem na tabela larga original versus users + user_profiles.
+
+Cria tabelas temporárias próprias (bench_*) e as remove ao final.
+
+Uso:
+    python benchmarks/bench_user_split.py --users 5000
+    python benchmarks/bench_user_split.py --url postgresql://...
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import Column, ForeignKey, Integer, MetaData, Table, create_engine, select, text
+
+from src.models.nutriai_models import User, UserProfile, PROFILE_FIELDS
+
+TEXT_SAMPLES = [
+    'Já tentei várias dietas mas sempre desisto depois de algumas semanas',
+    'Melhorar saúde e autoestima, reduzir o cansaço no fim do dia',
+    'Omeprazol 20mg em jejum; vitamina D 2000UI após o almoço',
+    'Brócolis, fígado, jiló e peixes de sabor forte',
+    'Azia após refeições grandes e inchaço no fim da tarde',
+]
+
+
+def _columns(table, exclude=()):
+    return [
+        Column(c.name, c.type, primary_key=c.primary_key, unique=c.unique)
+        for c in table.columns if c.name not in exclude
+    ]
+
+
+def build_tables(metadata):
+    wide = Table('bench_users_wide', metadata, *_columns(User.__table__), *_columns(UserProfile.__table__, {'user_id'}))
+    core = Table('bench_users', metadata, *_columns(User.__table__))
+    profiles = Table(
+        'bench_user_profiles', metadata,
+        Column('user_id', Integer, ForeignKey('bench_users.id'), primary_key=True),
+        *_columns(UserProfile.__table__, {'user_id'})
+    )
+    return wide, core, profiles
+
+
+def fake_value(rng, column):
+    python_type = column.type.python_type
+    if python_type is bool:
+        return rng.random() < 0.3
+    if python_type is int:
+        return rng.randint(1, 10)
+    if python_type is float:
+        return round(rng.uniform(50, 110), 1)
+    if python_type is str:
+        length = getattr(column.type, 'length', None)
+        return rng.choice(TEXT_SAMPLES)[:length] if length else rng.choice(TEXT_SAMPLES)
+    return None
+
+
+def build_rows(count, wide, rng):
+    rows = []
+    for user_id in range(1, count + 1):
+        row = {column.name: fake_value(rng, column) for column in wide.columns}
+        row.update({
+            'id': user_id,
+            'email': f'usuario{user_id}@email.com',
+            'name': f'Usuário {user_id}',
+            'password_hash': 'scrypt:32768:8:1$' + 'x' * 120,
+            'user_type': 'nutritionist' if user_id % 20 == 0 else 'user',
+            'created_at': None,
+            'goal': rng.choice(['perder_peso', 'ganhar_massa', 'manter_peso']),
+            'exercise_frequency': rng.choice(['sedentario', 'leve', 'moderado', 'intenso']),
+            'crn_number': None,
+            'specialization': None,
+        })
+        rows.append(row)
+    return rows
+
+
+def row_size(conn, table_name, count):
+    if conn.dialect.name == 'postgresql':
+        return conn.execute(text(f'SELECT avg(pg_column_size(t.*)) FROM {table_name} t')).scalar()
+    payload = conn.execute(text('SELECT sum(payload) FROM dbstat WHERE name = :name'), {'name': table_name}).scalar()
+    return payload / count
+
+
+def measure(conn, statement, params_list, repeat):
+    timings = []
+    for _ in range(repeat):
+        for params in params_list:
+            start = time.perf_counter()
+            conn.execute(statement, params).fetchall()
+            timings.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--url', default=None, help='Banco a usar (padrão: SQLite temporário)')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    url = args.url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench_user_split.db')
+    engine = create_engine(url)
+    metadata = MetaData()
+    wide, core, profiles = build_tables(metadata)
+
+    rng = random.Random(args.seed)
+    rows = build_rows(args.users, wide, rng)
+    core_names = {column.name for column in core.columns}
+
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+    try:
+        with engine.begin() as conn:
+            conn.execute(wide.insert(), rows)
+            conn.execute(core.insert(), [{k: v for k, v in row.items() if k in core_names} for row in rows])
+            conn.execute(profiles.insert(), [
+                {'user_id': row['id'], **{field: row[field] for field in PROFILE_FIELDS}} for row in rows
+            ])
+            if conn.dialect.name == 'postgresql':
+                conn.execute(text('ANALYZE bench_users_wide; ANALYZE bench_users; ANALYZE bench_user_profiles'))
+
+        sample_ids = [rng.randint(1, args.users) for _ in range(200)]
+        by_email = [{'email': f'usuario{user_id}@email.com'} for user_id in sample_ids]
+        by_id = [{'user_id': user_id} for user_id in sample_ids]
+
+        with engine.connect() as conn:
+            print(f'Usuários: {args.users} | banco: {engine.dialect.name}')
+            print(f'{"":<34}{"antes (larga)":>15}{"depois (core)":>15}')
+            print(f'{"bytes por linha de users":<34}{row_size(conn, wide.name, args.users):>15.0f}'
+                  f'{row_size(conn, core.name, args.users):>15.0f}')
+
+            checks = [
+                ('login (por email) µs', lambda t: select(t).where(t.c.email == text(':email')), by_email),
+                ('validação de token (por id) µs', lambda t: select(t).where(t.c.id == text(':user_id')), by_id),
+                ('listagem 50 usuários µs',
+                 lambda t: select(t).where(t.c.user_type == 'user').order_by(t.c.id).limit(50), [{}] * 20),
+            ]
+            for label, build, params in checks:
+                before = measure(conn, build(wide), params, args.repeat)
+                after = measure(conn, build(core), params, args.repeat)
+                print(f'{label:<34}{before:>15.1f}{after:>15.1f}')
+
+            joined = select(core, profiles).join(profiles, profiles.c.user_id == core.c.id).where(
+                core.c.id == text(':user_id')
+            )
+            full_before = measure(conn, select(wide).where(wide.c.id == text(':user_id')), by_id, args.repeat)
+            full_after = measure(conn, joined, by_id, args.repeat)
+            print(f'{"perfil completo (com anamnese) µs":<34}{full_before:>15.1f}{full_after:>15.1f}')
+    finally:
+        metadata.drop_all(engine)
+
+
+if __name__ == '__main__':
+    main()
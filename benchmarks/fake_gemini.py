@@ -0,0 +1,89 @@
+"""
+Modelo Gemini falso e determinístico para benchmarks e testes de carga.
+Substitui o `model` do GeminiService compartilhado sem chamar a API:
+
+    from src.services.gemini_service import get_gemini_service
+    get_gemini_service().model = FakeGeminiModel(latency=0.2, response_size=4000)
+"""
+import json
+import random
+import threading
+import time
+
+
+def build_plan(response_size: int = 4000, seed: int = 0) -> dict:
+    """Plano no formato pedido pelo prompt, completado até ~response_size bytes de JSON"""
+    rng = random.Random(seed)
+
+    def meal(name, items):
+        ingredients = [
+            {"item": item, "quantity": f"{rng.randint(30, 200)}g",
+             "price": round(rng.uniform(1, 15), 2), "calories": rng.randint(20, 300)}
+            for item in items
+        ]
+        return {
+            "name": name,
+            "ingredients": ingredients,
+            "total_calories": sum(i["calories"] for i in ingredients),
+            "total_cost": round(sum(i["price"] for i in ingredients), 2)
+        }
+
+    plan = {
+        "plan_type": "Plano Balanceado",
+        "breakfast": meal("Café Balanceado", ["Pão integral", "Queijo branco", "Tomate"]),
+        "lunch": meal("Frango Grelhado com Quinoa", ["Peito de frango", "Quinoa", "Brócolis"]),
+        "dinner": meal("Salmão com Vegetais", ["Salmão", "Batata doce", "Aspargos"]),
+        "daily_totals": {"total_calories": 1800, "total_cost": 45.0,
+                         "protein_g": 120, "carbs_g": 180, "fat_g": 60},
+        "shopping_list": [],
+        "nutritionist_notes": {"metabolic_analysis": "Plano gerado pelo modelo falso de benchmark"}
+    }
+
+    size = len(json.dumps(plan, ensure_ascii=False).encode('utf-8'))
+    while size < response_size:
+        entry = {"item": f"Item {len(plan['shopping_list']) + 1}", "quantity": f"{rng.randint(1, 5)}kg",
+                 "estimated_price": round(rng.uniform(2, 40), 2)}
+        plan["shopping_list"].append(entry)
+        size += len(json.dumps(entry, ensure_ascii=False).encode('utf-8')) + 2
+    return plan
+
+
+class FakeChunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGeminiModel:
+    """
+    Imita GenerativeModel.generate_content: responde o mesmo plano após `latency`
+    segundos (± jitter). Com stream=True, a latência vai para o primeiro pedaço e
+    o texto sai em pedaços de chunk_size caracteres.
+    """
+
+    def __init__(self, latency: float = 0.2, response_size: int = 4000, jitter: float = 0.0,
+                 chunk_size: int = 256, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.chunk_size = chunk_size
+        self.text = json.dumps(build_plan(response_size, seed), ensure_ascii=False)
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _delay(self) -> float:
+        with self._lock:
+            self.calls += 1
+            offset = self._rng.uniform(-self.jitter, self.jitter) if self.jitter else 0.0
+        return max(self.latency + offset, 0.0)
+
+    def generate_content(self, prompt, stream=False, generation_config=None):
+        delay = self._delay()
+        if not stream:
+            time.sleep(delay)
+            return FakeChunk(self.text)
+        return self._stream(delay)
+
+    def _stream(self, delay):
+        time.sleep(delay)
+        for start in range(0, len(self.text), self.chunk_size):
+            yield FakeChunk(self.text[start:start + self.chunk_size])
@@ -0,0 +1,309 @@
+"""
+Servidor local que imita a API REST do Gemini (generateContent e streamGenerateContent)
+para testar o GeminiService sem chave nem rede. Responde planos no formato pedido pelos
+templates de src/services/prompt_builder.py (meta calórica e orçamento lidos do prompt;
+chaves curtas quando o prompt é o compacto) ou um plano fixo (--plan-file), com latência,
+JSON malformado, 429 e timeouts injetáveis.
+
+Uso:
+    python benchmarks/gemini_standin.py --port 8765 --latency lognormal:0.8:0.4 \\
+        --malformed-rate 0.1 --rate-limit-rate 0.05 --timeout-rate 0.02
+
+    # no app (o SDK usa o transporte REST quando GEMINI_API_ENDPOINT está definido)
+    GEMINI_API_KEY=local GEMINI_API_ENDPOINT=http://127.0.0.1:8765 python app.py
+
+Latência: fixed:S | uniform:MIN:MAX | normal:MEDIA:DESVIO | lognormal:MEDIANA:SIGMA (segundos).
+GET /stats devolve os contadores de requisições e falhas injetadas.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.prompt_builder import COMPACT_RESPONSE_KEYS
+
+MODEL_PATH = re.compile(r'^/v1(?:beta)?/models/([^/:]+):(generateContent|streamGenerateContent)$')
+FINISH_REASON_STOP = 1
+
+
+def parse_latency(spec: str):
+    """Converte 'lognormal:0.8:0.4' numa função rng -> segundos"""
+    kind, *params = spec.split(':')
+    values = [float(p) for p in params]
+    distributions = {
+        'fixed': (1, lambda rng: values[0]),
+        'uniform': (2, lambda rng: rng.uniform(values[0], values[1])),
+        'normal': (2, lambda rng: rng.gauss(values[0], values[1])),
+        'lognormal': (2, lambda rng: values[0] * rng.lognormvariate(0, values[1]))
+    }
+    if kind not in distributions or len(values) != distributions[kind][0]:
+        raise argparse.ArgumentTypeError(f'Latência inválida: {spec}')
+    sample = distributions[kind][1]
+    return lambda rng: max(sample(rng), 0.0)
+
+
+def _number(pattern, prompt, default):
+    match = re.search(pattern, prompt)
+    return float(match.group(1)) if match else default
+
+
+def templated_plan(prompt: str) -> dict:
+    """Plano com as chaves canônicas, coerente com a meta e o orçamento do prompt"""
+    calories = _number(r'Meta calórica diária: ([\d.]+)', prompt, 1800)
+    budget = _number(r'Orçamento por refeição: R\$ ([\d.]+)', prompt, 25)
+    goal = re.search(r'Objetivo: (.+)', prompt)
+
+    def meal(name, share, cost_share, timing, items):
+        total = round(calories * share)
+        return {
+            "name": name,
+            "ingredients": [
+                {"item": item, "quantity": "100g", "price": round(budget * cost_share / len(items), 2),
+                 "calories": round(total / len(items)), "protein": 10, "carbs": 15, "fat": 5}
+                for item in items
+            ],
+            "preparation": "Preparo simples, sem frituras",
+            "total_calories": total,
+            "total_cost": round(budget * cost_share, 2),
+            "macros": {"protein": round(total * 0.3 / 4), "carbs": round(total * 0.45 / 4),
+                       "fat": round(total * 0.25 / 9)},
+            "timing": timing
+        }
+
+    return {
+        "breakfast": meal("Café da manhã", 0.25, 0.6, "7h00 - Otimiza metabolismo matinal",
+                          ["Aveia", "Banana", "Iogurte natural"]),
+        "lunch": meal("Almoço", 0.35, 1.0, "12h00 - Pico energético do dia",
+                      ["Arroz integral", "Feijão", "Peito de frango", "Salada verde"]),
+        "dinner": meal("Jantar", 0.3, 0.8, "19h00 - Facilita digestão noturna",
+                       ["Peixe grelhado", "Legumes no vapor"]),
+        "snacks": [meal("Lanche", 0.1, 0.3, "15h00 - Sustenta energia", ["Castanhas", "Maçã"])],
+        "daily_totals": {"total_calories": round(calories), "total_cost": round(budget * 2.7, 2),
+                         "protein_g": round(calories * 0.3 / 4), "carbs_g": round(calories * 0.45 / 4),
+                         "fat_g": round(calories * 0.25 / 9), "fiber_g": 25, "sodium_mg": 2000},
+        "shopping_list": [
+            {"item": "Frango (peito)", "quantity": "1kg", "estimated_price": 18.00, "where_to_buy": "Açougue local"},
+            {"item": "Arroz integral", "quantity": "1kg", "estimated_price": 8.50, "where_to_buy": "Supermercado"}
+        ],
+        "nutritionist_notes": {
+            "metabolic_analysis": f"Plano de {round(calories)} kcal gerado pelo servidor local do Gemini",
+            "goal_alignment": goal.group(1).strip() if goal else "Manter peso"
+        },
+        "scientific_rationale": {"caloric_distribution": "25/35/30/10 entre as refeições"}
+    }
+
+
+def _compact(value, schema):
+    """Inverso da expansão do PromptTemplate: chaves canônicas -> chaves curtas"""
+    if isinstance(schema, list) and isinstance(value, list):
+        return [_compact(item, schema[0]) for item in value]
+    if isinstance(schema, dict) and isinstance(value, dict):
+        short = {canonical: (key, child) for key, (canonical, child) in schema.items()}
+        return {short.get(key, (key, None))[0]: _compact(item, short.get(key, (key, None))[1])
+                for key, item in value.items()}
+    return value
+
+
+def compact_plan(plan: dict) -> dict:
+    return _compact({key: value for key, value in plan.items()
+                     if key not in ('nutritionist_notes', 'scientific_rationale')}, COMPACT_RESPONSE_KEYS)
+
+
+class StandinState:
+    """Configuração das falhas e contadores compartilhados pelas threads do servidor"""
+
+    def __init__(self, args):
+        self.args = args
+        self.latency = parse_latency(args.latency)
+        self.canned = None
+        if args.plan_file:
+            with open(args.plan_file, encoding='utf-8') as f:
+                self.canned = f.read()
+        self._rng = random.Random(args.seed)
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'streams': 0, 'ok': 0, 'rate_limited': 0, 'timeouts': 0, 'malformed': 0}
+
+    def draw(self):
+        """Sorteia a falha (ou None) e a latência desta requisição"""
+        with self._lock:
+            roll = self._rng.random()
+            latency = self.latency(self._rng)
+            malformed_kind = self._rng.choice(('truncated', 'prose'))
+        args = self.args
+        if roll < args.rate_limit_rate:
+            return 'rate_limited', latency, None
+        roll -= args.rate_limit_rate
+        if roll < args.timeout_rate:
+            return 'timeouts', latency, None
+        roll -= args.timeout_rate
+        if roll < args.malformed_rate:
+            return 'malformed', latency, malformed_kind
+        return 'ok', latency, None
+
+    def count(self, *keys):
+        with self._lock:
+            for key in keys:
+                self.stats[key] += 1
+
+    def response_text(self, prompt, malformed_kind):
+        if self.canned:
+            text = self.canned
+        elif '"pt":' in prompt:
+            text = json.dumps(compact_plan(templated_plan(prompt)), ensure_ascii=False, separators=(',', ':'))
+        else:
+            text = json.dumps(templated_plan(prompt), ensure_ascii=False, indent=2)
+        if malformed_kind == 'truncated':
+            return text[:len(text) // 2]
+        if malformed_kind == 'prose':
+            return f'Claro! Aqui está o plano alimentar solicitado:\n{text}\nEspero que ajude.'
+        return text
+
+
+def _response_body(text):
+    return {
+        "candidates": [{
+            "content": {"parts": [{"text": text}], "role": "model"},
+            "finishReason": FINISH_REASON_STOP,
+            "index": 0
+        }]
+    }
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'GeminiStandin/1.0'
+
+    @property
+    def state(self) -> StandinState:
+        return self.server.state
+
+    def log_message(self, format, *args):
+        if self.state.args.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=UTF-8')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f'{len(data):X}\r\n'.encode('ascii') + data + b'\r\n')
+        self.wfile.flush()
+
+    def do_GET(self):
+        if urlparse(self.path).path == '/stats':
+            return self._send_json(200, self.state.stats)
+        self._send_json(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        match = MODEL_PATH.match(url.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        if not match:
+            return self._send_json(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+
+        try:
+            request = json.loads(raw or b'{}')
+            prompt = '\n'.join(part.get('text', '') for content in request.get('contents', [])
+                               for part in content.get('parts', []))
+        except ValueError:
+            return self._send_json(400, {"error": {"code": 400, "message": "Invalid JSON payload",
+                                                   "status": "INVALID_ARGUMENT"}})
+
+        streaming = match.group(2) == 'streamGenerateContent'
+        outcome, latency, malformed_kind = self.state.draw()
+        self.state.count('requests', outcome, *(('streams',) if streaming else ()))
+
+        if outcome == 'rate_limited':
+            time.sleep(min(latency, 0.05))
+            return self._send_json(429, {"error": {"code": 429, "message": "Resource has been exhausted (e.g. check quota).",
+                                                   "status": "RESOURCE_EXHAUSTED"}},
+                                   {'Retry-After': str(self.state.args.retry_after)})
+
+        text = self.state.response_text(prompt, malformed_kind)
+
+        if not streaming:
+            time.sleep(self.state.args.hang if outcome == 'timeouts' else latency)
+            return self._send_json(200, _response_body(text))
+
+        sse = parse_qs(url.query).get('alt', [''])[0] == 'sse'
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream' if sse else 'application/json; charset=UTF-8')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        # Latência até o primeiro pedaço; o timeout trava o stream depois dele
+        time.sleep(latency)
+        size = self.state.args.chunk_size
+        pieces = [text[i:i + size] for i in range(0, len(text), size)] or ['']
+        try:
+            for index, piece in enumerate(pieces):
+                if index == 1 and outcome == 'timeouts':
+                    time.sleep(self.state.args.hang)
+                body = json.dumps(_response_body(piece), ensure_ascii=False)
+                if sse:
+                    self._write_chunk(f'data: {body}\r\n\r\n'.encode('utf-8'))
+                else:
+                    self._write_chunk(((',' if index else '[') + body).encode('utf-8'))
+                time.sleep(self.state.args.chunk_delay)
+            if not sse:
+                self._write_chunk(b']')
+            self.wfile.write(b'0\r\n\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # cliente desistiu (idle timeout do GeminiService)
+
+
+def create_server(args) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((args.host, args.port), StandinHandler)
+    server.daemon_threads = True
+    server.state = StandinState(args)
+    return server
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', default='fixed:0.5', help='Distribuição da latência até a resposta')
+    parser.add_argument('--chunk-size', type=int, default=200, help='Caracteres por pedaço no streaming')
+    parser.add_argument('--chunk-delay', type=float, default=0.02, help='Intervalo (s) entre pedaços')
+    parser.add_argument('--malformed-rate', type=float, default=0.0, help='Fração com JSON truncado ou texto em volta')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Fração respondida com 429')
+    parser.add_argument('--retry-after', type=int, default=1, help='Header Retry-After dos 429')
+    parser.add_argument('--timeout-rate', type=float, default=0.0, help='Fração que trava por --hang segundos')
+    parser.add_argument('--hang', type=float, default=60.0)
+    parser.add_argument('--plan-file', help='JSON fixo devolvido no lugar do plano gerado a partir do prompt')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--verbose', action='store_true', help='Loga cada requisição')
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    server = create_server(args)
+    print(f'🤖 Gemini local em http://{args.host}:{server.server_port} '
+          f'(GEMINI_API_ENDPOINT=http://{args.host}:{server.server_port})')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,297 @@
+"""
+Teste de carga dos endpoints: sobe o app num servidor HTTP local com SQLite e um
+Gemini falso (latência e tamanho de resposta configuráveis) e executa sessões de
+usuário (register → login → profile → validate-token → generate → jobs → my-plans)
+e de nutricionista (login → pending → dashboard → validate) com N clientes simultâneos.
+
+Gera um relatório JSON com vazão e p50/p95/p99 por endpoint. Com --baseline, compara
+o p95 com um relatório anterior e sai com código 1 se algum endpoint regrediu além
+de --max-regression (ou se houve respostas com status inesperado).
+
+Uso:
+    python benchmarks/load_test.py --users 50 --concurrency 8 --output load-report.json
+    python benchmarks/load_test.py --baseline load-baseline.json --max-regression 0.25
+    python benchmarks/load_test.py --gemini-endpoint http://127.0.0.1:8765   # com benchmarks/gemini_standin.py
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+NUTRITIONIST_EMAIL = 'maria@nutricionista.com'
+SEED_PASSWORD = '123456'
+# Chaves de ACTIVITY_FACTORS (metabolic_engine): valores fora delas caem no fator sedentário
+ACTIVITY_LEVELS = ('sedentario', 'leve', 'moderado', 'intenso', 'muito_intenso')
+
+
+def percentile(sorted_values, fraction):
+    """Percentil por rank mais próximo (valores já ordenados)"""
+    if not sorted_values:
+        return None
+    index = max(int(round(fraction * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+class Recorder:
+    """Latências e status por endpoint, compartilhado entre as threads clientes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.errors = defaultdict(int)
+
+    def record(self, name, seconds, status, ok):
+        with self._lock:
+            self.samples[name].append(seconds)
+            self.statuses[name][status] += 1
+            if not ok:
+                self.errors[name] += 1
+
+    def report(self, duration):
+        endpoints = {}
+        for name in sorted(self.samples):
+            timings = sorted(self.samples[name])
+            endpoints[name] = {
+                'requests': len(timings),
+                'errors': self.errors[name],
+                'status_codes': {str(code): count for code, count in sorted(self.statuses[name].items())},
+                'throughput_rps': round(len(timings) / duration, 2),
+                'mean_ms': round(sum(timings) / len(timings) * 1000, 2),
+                'p50_ms': round(percentile(timings, 0.50) * 1000, 2),
+                'p95_ms': round(percentile(timings, 0.95) * 1000, 2),
+                'p99_ms': round(percentile(timings, 0.99) * 1000, 2),
+                'max_ms': round(timings[-1] * 1000, 2)
+            }
+        return endpoints
+
+
+class Client:
+    """Cliente HTTP mínimo (urllib) que mede cada chamada no Recorder"""
+
+    def __init__(self, base_url, recorder, timeout):
+        self.base_url = base_url
+        self.recorder = recorder
+        self.timeout = timeout
+        self.token = None
+
+    def call(self, name, method, path, body=None, expected=(200,)):
+        headers = {'Content-Type': 'application/json', 'Accept-Encoding': 'identity'}
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                status, payload = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, payload = e.code, e.read()
+        except OSError:
+            status, payload = 0, b''
+        elapsed = time.perf_counter() - started
+
+        ok = status in expected
+        self.recorder.record(name, elapsed, status, ok)
+        try:
+            return status, json.loads(payload) if payload else {}
+        except ValueError:
+            return status, {}
+
+
+def user_session(client, index, run_id, job_timeout):
+    email = f'load-{run_id}-{index}@example.com'
+    password = 'senha-de-carga'
+    client.call('register', 'POST', '/api/auth/register', {
+        'email': email, 'password': password, 'name': f'Usuário de carga {index}',
+        # Perfis distintos para não depender do cache de planos
+        'age': 20 + index % 40, 'weight': 55 + index % 50, 'height': 155 + index % 35,
+        'goal': ('Perder peso', 'Manter peso', 'Ganhar massa')[index % 3],
+        'exercise_frequency': ACTIVITY_LEVELS[index % len(ACTIVITY_LEVELS)], 'budget_per_meal': 20 + index % 20
+    }, expected=(201,))
+
+    status, body = client.call('login', 'POST', '/api/auth/login', {'email': email, 'password': password})
+    if status != 200:
+        return
+    client.token = body['access_token']
+
+    client.call('profile', 'GET', '/api/auth/profile')
+    client.call('validate_token', 'GET', '/api/auth/validate-token')
+
+    started = time.perf_counter()
+    status, body = client.call('generate', 'POST', '/api/diet-plans/generate', {}, expected=(202,))
+    if status == 202:
+        job_path = f"/api/diet-plans/jobs/{body['job']['id']}"
+        deadline = started + job_timeout
+        while time.perf_counter() < deadline:
+            status, body = client.call('job_status', 'GET', job_path)
+            if status != 200 or body['job']['status'] in ('completed', 'failed'):
+                break
+            time.sleep(0.05)
+        completed = status == 200 and body['job']['status'] == 'completed'
+        client.recorder.record('generate_end_to_end', time.perf_counter() - started,
+                               200 if completed else 0, completed)
+
+    client.call('my_plans', 'GET', '/api/diet-plans/my-plans')
+
+
+def nutritionist_session(client):
+    status, body = client.call('login', 'POST', '/api/auth/login',
+                               {'email': NUTRITIONIST_EMAIL, 'password': SEED_PASSWORD})
+    if status != 200:
+        return
+    client.token = body['access_token']
+
+    status, body = client.call('pending', 'GET', '/api/diet-plans/pending?limit=20')
+    client.call('dashboard', 'GET', '/api/diet-plans/nutritionist-dashboard')
+    if status == 200 and body.get('pending_plans'):
+        plan_id = body['pending_plans'][0]['id']
+        client.call('validate_plan', 'POST', f'/api/diet-plans/{plan_id}/validate',
+                    {'action': 'approve', 'feedback': 'Aprovado no teste de carga'})
+
+
+def compare(report, baseline, max_regression, floor_ms):
+    """Endpoints cujo p95 piorou além da tolerância em relação ao baseline"""
+    regressions = []
+    for name, current in report['endpoints'].items():
+        previous = baseline.get('endpoints', {}).get(name)
+        if not previous:
+            continue
+        limit = max(previous['p95_ms'] * (1 + max_regression), previous['p95_ms'] + floor_ms)
+        if current['p95_ms'] > limit:
+            regressions.append(f"{name}: p95 {previous['p95_ms']} → {current['p95_ms']} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=30, help='Sessões de usuário')
+    parser.add_argument('--nutritionist-sessions', type=int, default=None, help='Padrão: metade de --users')
+    parser.add_argument('--concurrency', type=int, default=8, help='Clientes simultâneos')
+    parser.add_argument('--gemini-latency', type=float, default=0.2, help='Latência (s) do Gemini falso')
+    parser.add_argument('--gemini-jitter', type=float, default=0.0)
+    parser.add_argument('--gemini-size', type=int, default=4000, help='Tamanho (bytes) do plano retornado')
+    parser.add_argument('--gemini-endpoint', help='Usa um servidor compatível (ex.: gemini_standin.py) no lugar do modelo falso')
+    parser.add_argument('--password-method', default=None, help='PASSWORD_HASH_METHOD do servidor')
+    parser.add_argument('--plan-cache', action='store_true', help='Mantém o cache de planos ligado')
+    parser.add_argument('--job-timeout', type=float, default=30.0)
+    parser.add_argument('--request-timeout', type=float, default=30.0)
+    parser.add_argument('--output', default='load-report.json', help='Arquivo do relatório JSON')
+    parser.add_argument('--baseline', help='Relatório anterior para comparar o p95')
+    parser.add_argument('--max-regression', type=float, default=0.25, help='Piora tolerada do p95 (fração)')
+    parser.add_argument('--regression-floor-ms', type=float, default=5.0,
+                        help='Piora absoluta do p95 sempre tolerada (ruído)')
+    args = parser.parse_args()
+
+    # Configuração lida no import do app
+    workdir = tempfile.mkdtemp(prefix='nutriai-load-')
+    os.environ['NEON_DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'load.db')
+    os.environ.setdefault('JWT_SECRET_KEY', 'load-test-' + 'x' * 32)
+    os.environ['GEMINI_API_KEY'] = 'load-test'
+    if args.gemini_endpoint:
+        os.environ['GEMINI_API_ENDPOINT'] = args.gemini_endpoint
+    os.environ['PLAN_WORKER_MODE'] = 'thread'
+    os.environ['PLAN_CACHE_ENABLED'] = 'true' if args.plan_cache else 'false'
+    os.environ.setdefault('STATUS_REFRESH_INTERVAL', '3600')
+    if args.password_method:
+        os.environ['PASSWORD_HASH_METHOD'] = args.password_method
+
+    from werkzeug.serving import make_server
+
+    from fake_gemini import FakeGeminiModel
+    from src.main import app
+    from src.seed import init_database
+    from src.services.gemini_service import get_gemini_service
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    with app.app_context():
+        init_database()
+
+    fake_model = FakeGeminiModel(latency=args.gemini_latency, response_size=args.gemini_size,
+                                 jitter=args.gemini_jitter)
+    if not args.gemini_endpoint:
+        get_gemini_service().model = fake_model
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+
+    recorder = Recorder()
+    Client(base_url, Recorder(), args.request_timeout).call('warmup', 'GET', '/api/health')
+
+    nutritionist_sessions = args.users // 2 if args.nutritionist_sessions is None else args.nutritionist_sessions
+    run_id = str(int(time.time()))
+    # Intercala as sessões para que nutricionistas encontrem planos pendentes durante a carga
+    sessions = [('user', i) for i in range(args.users)]
+    for i in range(nutritionist_sessions):
+        sessions.insert(min(2 * i + 2, len(sessions)), ('nutritionist', i))
+
+    def run(session):
+        kind, index = session
+        client = Client(base_url, recorder, args.request_timeout)
+        if kind == 'user':
+            user_session(client, index, run_id, args.job_timeout)
+        else:
+            nutritionist_session(client)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(run, sessions))
+    duration = time.perf_counter() - started
+    server.shutdown()
+
+    endpoints = recorder.report(duration)
+    report = {
+        'config': {
+            'users': args.users,
+            'nutritionist_sessions': nutritionist_sessions,
+            'concurrency': args.concurrency,
+            'gemini_latency_s': args.gemini_latency,
+            'gemini_jitter_s': args.gemini_jitter,
+            'gemini_endpoint': args.gemini_endpoint,
+            'gemini_response_bytes': None if args.gemini_endpoint else len(fake_model.text.encode('utf-8')),
+            'password_hash_method': app.config.get('PASSWORD_HASH_METHOD'),
+            'plan_cache': args.plan_cache,
+            'cpus': os.cpu_count()
+        },
+        'duration_s': round(duration, 3),
+        'total_requests': sum(e['requests'] for name, e in endpoints.items() if name != 'generate_end_to_end'),
+        'gemini_calls': None if args.gemini_endpoint else fake_model.calls,
+        'endpoints': endpoints
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print(f"Duração: {report['duration_s']} s | requisições: {report['total_requests']} | "
+          f"chamadas ao Gemini: {report['gemini_calls']} | relatório: {args.output}")
+    print(f"{'endpoint':<22}{'req':>6}{'erros':>7}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, e in endpoints.items():
+        print(f"{name:<22}{e['requests']:>6}{e['errors']:>7}{e['throughput_rps']:>9}"
+              f"{e['p50_ms']:>10}{e['p95_ms']:>10}{e['p99_ms']:>10}")
+
+    failures = [f'{name}: {e["errors"]} respostas com status inesperado'
+                for name, e in endpoints.items() if e['errors']]
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            failures += compare(report, json.load(f), args.max_regression, args.regression_floor_ms)
+    if failures:
+        print('❌ Regressões encontradas:')
+        for failure in failures:
+            print(f'  {failure}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
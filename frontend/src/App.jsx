@@ -843,16 +843,20 @@ function App() {
     const [showPlanGenerator, setShowPlanGenerator] = useState(false)
     const [showProfileForm, setShowProfileForm] = useState(false)
     const [userPlans, setUserPlans] = useState([])
+    const [plansCursor, setPlansCursor] = useState(null)
     const [loading, setLoading] = useState(false)
 
     useEffect(() => {
       loadUserPlans()
     }, [])
 
-    const loadUserPlans = async () => {
+    // A API devolve uma página por vez: next_cursor busca a seguinte
+    const loadUserPlans = async (cursor = null) => {
       try {
-        const data = await apiRequest('/api/diet-plans/my-plans')
-        setUserPlans(data.plans)
+        const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : ''
+        const data = await apiRequest(`/api/diet-plans/my-plans${query}`)
+        setUserPlans(prev => cursor ? [...prev, ...data.plans] : data.plans)
+        setPlansCursor(data.next_cursor)
       } catch (error) {
         console.error('Erro ao carregar planos:', error)
       }
@@ -861,10 +865,21 @@ function App() {
     const generatePlan = async () => {
       setLoading(true)
       try {
-        const data = await apiRequest('/api/diet-plans/generate', {
+        const { job } = await apiRequest('/api/diet-plans/generate', {
           method: 'POST'
         })
-        
+
+        // A geração roda em background: consulta o job até concluir
+        let data = { job }
+        while (data.job.status === 'queued' || data.job.status === 'running') {
+          await new Promise(resolve => setTimeout(resolve, 2000))
+          data = await apiRequest(`/api/diet-plans/jobs/${job.id}`)
+        }
+
+        if (data.job.status === 'failed') {
+          throw new Error(data.job.error || 'Falha na geração do plano')
+        }
+
         setUserPlans(prev => [data.plan, ...prev])
         setShowPlanGenerator(false)
         alert('Plano gerado com sucesso! Aguarde validação do nutricionista.')
@@ -978,7 +993,7 @@ function App() {
                       <Calendar className="h-5 w-5 text-purple-600" />
                       <div>
                         <p className="text-sm text-gray-600">Planos Gerados</p>
-                        <p className="text-2xl font-bold">{userPlans.length}</p>
+                        <p className="text-2xl font-bold">{userPlans.length}{plansCursor ? '+' : ''}</p>
                       </div>
                     </div>
                   </CardContent>
@@ -1055,6 +1070,11 @@ function App() {
                           )}
                         </div>
                       ))}
+                      {plansCursor && (
+                        <Button variant="outline" className="w-full" onClick={() => loadUserPlans(plansCursor)}>
+                          Carregar mais planos
+                        </Button>
+                      )}
                     </div>
                   ) : (
                     <div className="text-center py-8">
@@ -1155,28 +1175,37 @@ function App() {
   // Dashboard do Nutricionista
   const NutritionistDashboard = () => {
     const [pendingPlans, setPendingPlans] = useState([])
+    const [pendingCursor, setPendingCursor] = useState(null)
     const [dashboardStats, setDashboardStats] = useState({})
     const [selectedPlan, setSelectedPlan] = useState(null)
     const [loading, setLoading] = useState(false)
 
     useEffect(() => {
-      loadDashboardData()
+      loadDashboardStats()
+      loadPendingPlans()
     }, [])
 
-    const loadDashboardData = async () => {
+    const loadDashboardStats = async () => {
       try {
-        const [dashboardData, pendingData] = await Promise.all([
-          apiRequest('/api/diet-plans/nutritionist-dashboard'),
-          apiRequest('/api/diet-plans/pending')
-        ])
-        
+        const dashboardData = await apiRequest('/api/diet-plans/nutritionist-dashboard')
         setDashboardStats(dashboardData.dashboard)
-        setPendingPlans(pendingData.pending_plans)
       } catch (error) {
         console.error('Erro ao carregar dashboard:', error)
       }
     }
 
+    // A fila vem paginada: next_cursor busca a próxima página
+    const loadPendingPlans = async (cursor = null) => {
+      try {
+        const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : ''
+        const pendingData = await apiRequest(`/api/diet-plans/pending${query}`)
+        setPendingPlans(prev => cursor ? [...prev, ...pendingData.pending_plans] : pendingData.pending_plans)
+        setPendingCursor(pendingData.next_cursor)
+      } catch (error) {
+        console.error('Erro ao carregar planos pendentes:', error)
+      }
+    }
+
     const validatePlan = async (planId, action, feedback = '') => {
       setLoading(true)
       try {
@@ -1189,8 +1218,8 @@ function App() {
         setPendingPlans(prev => prev.filter(p => p.id !== planId))
         setSelectedPlan(null)
         
-        // Atualiza estatísticas
-        loadDashboardData()
+        // Atualiza estatísticas (a lista já carregada é mantida)
+        loadDashboardStats()
         
         alert(`Plano ${action === 'approve' ? 'aprovado' : 'rejeitado'} com sucesso!`)
       } catch (error) {
@@ -1282,7 +1311,7 @@ function App() {
                 <CardHeader>
                   <CardTitle className="flex items-center gap-2">
                     <AlertCircle className="h-5 w-5" />
-                    Planos Aguardando Validação ({pendingPlans.length})
+                    Planos Aguardando Validação ({dashboardStats.pending_validation ?? pendingPlans.length})
                   </CardTitle>
                 </CardHeader>
                 <CardContent>
@@ -1314,12 +1343,17 @@ function App() {
                         </div>
                       ))}
                     </div>
-                  ) : (
+                  ) : !pendingCursor && (
                     <div className="text-center py-8">
                       <CheckCircle className="h-12 w-12 text-green-500 mx-auto mb-4" />
                       <p className="text-gray-600">Todos os planos foram validados!</p>
                     </div>
                   )}
+                  {pendingCursor && (
+                    <Button variant="outline" className="w-full mt-4" onClick={() => loadPendingPlans(pendingCursor)}>
+                      Carregar mais planos
+                    </Button>
+                  )}
                 </CardContent>
               </Card>
             </div>
@@ -0,0 +1,233 @@
+import os
+import sys
+import time
+
+import click
+from flask.cli import AppGroup
+
+from src.models.nutriai_models import db
+
+db_cli = AppGroup('db', help='Migrações do banco de dados')
+stats_cli = AppGroup('stats', help='Estatísticas agregadas de planos')
+plans_cli = AppGroup('plans', help='Manutenção dos planos armazenados')
+assets_cli = AppGroup('assets', help='Arquivos estáticos do frontend')
+users_cli = AppGroup('users', help='Gestão de usuários em lote')
+
+
+@db_cli.command('upgrade')
+@click.option('--target', type=int, default=None, help='Versão final (padrão: a mais recente)')
+def db_upgrade(target):
+    """Aplica as migrações pendentes"""
+    from src.migrations import runner
+
+    applied = runner.upgrade(db.engine, target)
+    if applied:
+        click.echo(f"✅ Migrações aplicadas: {', '.join(map(str, applied))}")
+    else:
+        click.echo('✅ Banco já está atualizado')
+
+
+@db_cli.command('downgrade')
+@click.option('--target', type=int, required=True, help='Versão para a qual voltar')
+def db_downgrade(target):
+    """Reverte migrações até a versão informada"""
+    from src.migrations import runner
+
+    reverted = runner.downgrade(db.engine, target)
+    click.echo(f"↩️ Migrações revertidas: {', '.join(map(str, reverted)) or 'nenhuma'}")
+
+
+@db_cli.command('status')
+def db_status():
+    """Lista as migrações e se já foram aplicadas"""
+    from src.migrations import runner
+
+    for migration in runner.status(db.engine):
+        mark = '✅' if migration['applied'] else '⏳'
+        click.echo(f"{mark} {migration['version']:04d} {migration['description']}")
+
+
+@db_cli.command('verify')
+@click.option('--show-plans', is_flag=True, help='Mostra o plano de execução completo')
+def db_verify(show_plans):
+    """Confere via EXPLAIN se o planner usa os índices das migrações"""
+    from src.migrations import runner
+
+    failures = 0
+    for result in runner.verify(db.engine):
+        mark = '✅' if result['used'] else '❌'
+        failures += not result['used']
+        click.echo(f"{mark} [{result['version']:04d}] {result['check']}: {result['index']}")
+        if show_plans or not result['used']:
+            click.echo('    ' + result['plan'].replace('\n', '\n    '))
+
+    if failures:
+        sys.exit(1)
+
+
+@click.command('init-db')
+@click.option('--no-seed', is_flag=True, help='Não cria os usuários de exemplo')
+def init_db(no_seed):
+    """Aplica as migrações e cria os usuários de exemplo (substitui a inicialização na 1ª requisição)"""
+    from src.seed import init_database
+
+    applied, created = init_database(seed=not no_seed)
+    click.echo(f"   migrações aplicadas: {', '.join(map(str, applied)) or 'nenhuma'}; usuários de exemplo criados: {created}")
+
+
+@stats_cli.command('rebuild')
+def stats_rebuild():
+    """Recalcula do zero as estatísticas dos nutricionistas e os contadores globais"""
+    from src.services.plan_stats import rebuild_stats
+
+    with db.engine.begin() as conn:
+        result = rebuild_stats(conn)
+    click.echo(
+        f"✅ Estatísticas recalculadas: {result['nutritionists']} nutricionistas, "
+        f"{result['total_plans']} planos, {result['pending_plans']} pendentes"
+    )
+
+
+@plans_cli.command('reencode')
+@click.option('--codec', type=click.Choice(['json', 'zlib', 'zstd']), default=None,
+              help='Codec de destino (padrão: PLAN_DATA_CODEC)')
+@click.option('--batch-size', type=int, default=200, show_default=True, help='Planos por transação')
+@click.option('--pause', type=float, default=0.0, show_default=True,
+              help='Segundos de espera entre lotes, para não competir com o tráfego')
+def plans_reencode(codec, batch_size, pause):
+    """Regrava os planos existentes com o codec de destino, em lotes"""
+    from src.models.nutriai_models import DietPlan
+    from src.services import plan_codec
+
+    codec = codec or plan_codec.configured_codec()
+    last_id, scanned, converted = 0, 0, 0
+    bytes_before, bytes_after = 0, 0
+
+    while True:
+        plans = (
+            DietPlan.query.options(*DietPlan.plan_options())
+            .filter(DietPlan.id > last_id)
+            .order_by(DietPlan.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not plans:
+            break
+
+        for plan in plans:
+            scanned += 1
+            if plan_codec.codec_of(plan._plan_payload) == codec:
+                continue
+            data = plan.plan_data
+            if data is None:
+                continue
+            bytes_before += len(plan._plan_payload or plan_codec.serialize(data))
+            plan.store_plan(data, codec)
+            bytes_after += len(plan._plan_payload or plan_codec.serialize(data))
+            converted += 1
+
+        last_id = plans[-1].id
+        db.session.commit()
+        db.session.expunge_all()
+        click.echo(f'   ... {scanned} planos lidos, {converted} recodificados')
+        if pause:
+            time.sleep(pause)
+
+    ratio = f' ({bytes_after / bytes_before:.1%} do tamanho original)' if bytes_before else ''
+    click.echo(f'✅ {converted} de {scanned} planos recodificados para {codec}{ratio}')
+
+
+@plans_cli.command('export')
+@click.option('--output', '-o', type=click.Path(dir_okay=False, writable=True), default='-', show_default=True,
+              help='Arquivo de saída (- para stdout)')
+@click.option('--format', 'fmt', type=click.Choice(['ndjson', 'csv']), default='ndjson', show_default=True)
+@click.option('--status', type=click.Choice(['pending', 'approved', 'rejected']), default=None)
+@click.option('--nutritionist-id', type=int, default=None)
+@click.option('--user-id', type=int, default=None)
+@click.option('--from', 'date_from', default=None, help='Criados a partir de (AAAA-MM-DD)')
+@click.option('--to', 'date_to', default=None, help='Criados até (AAAA-MM-DD, inclusive)')
+@click.option('--gzip', 'compress', is_flag=True, help='Comprime a saída com gzip')
+@click.option('--include-plan', is_flag=True, help='Inclui o plan_data completo (só NDJSON)')
+@click.option('--chunk-size', type=int, default=1000, show_default=True, help='Linhas lidas por vez do cursor')
+def plans_export(output, fmt, status, nutritionist_id, user_id, date_from, date_to, compress, include_plan, chunk_size):
+    """Exporta planos e métricas dos pacientes em NDJSON ou CSV, em fluxo"""
+    from src.services import plan_export
+
+    try:
+        query = plan_export.build_query(
+            status=status, nutritionist_id=nutritionist_id, user_id=user_id,
+            date_from=plan_export.parse_date(date_from), date_to=plan_export.parse_date(date_to, end=True)
+        )
+    except ValueError as e:
+        raise click.UsageError(str(e))
+
+    written = 0
+    with click.open_file(output, 'wb') as f:
+        for chunk in plan_export.export_plans(query, fmt, compress=compress, include_plan=include_plan,
+                                              chunk_size=chunk_size):
+            f.write(chunk)
+            written += len(chunk)
+    if output != '-':
+        click.echo(f'✅ {written} bytes exportados para {output}')
+
+
+@assets_cli.command('build')
+@click.option('--no-split', is_flag=True, help='Mantém CSS/JS inline no HTML')
+def assets_build(no_split):
+    """Gera STATIC_BUILD_DIR com arquivos com hash e variantes gzip/brotli"""
+    from flask import current_app
+    from src.services import static_assets
+
+    build_dir = current_app.config['STATIC_BUILD_DIR']
+    written = static_assets.build(
+        current_app.static_folder, build_dir, split=not no_split,
+        min_size=current_app.config['STATIC_COMPRESS_MIN_SIZE']
+    )
+    for path in written:
+        click.echo(f'   {os.path.relpath(path, build_dir)} ({os.path.getsize(path)} bytes)')
+    if static_assets.brotli is None:
+        click.echo('⚠️ Pacote brotli não instalado: apenas variantes gzip foram geradas')
+    click.echo(f'✅ {len(written)} arquivos gerados em {build_dir}')
+
+
+@users_cli.command('import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), default=None,
+              help='Formato do arquivo (padrão: pela extensão)')
+@click.option('--batch-size', type=int, default=200, show_default=True, help='Usuários por transação')
+@click.option('--allow-nutritionists', is_flag=True, help='Aceita linhas com user_type=nutritionist')
+@click.option('--dry-run', is_flag=True, help='Só valida, sem gravar')
+def users_import(path, fmt, batch_size, allow_nutritionists, dry_run):
+    """Importa usuários de um arquivo CSV ou JSONL (mesmos campos do cadastro)"""
+    from src.services import user_import
+
+    fmt = fmt or user_import.detect_format(path)
+    if fmt is None:
+        raise click.UsageError('Não foi possível detectar o formato: use --format csv|jsonl')
+
+    def report_error(error):
+        click.echo(f"   ❌ linha {error['line']} ({error['email'] or '-'}): {error['error']}", err=True)
+
+    def report_batch(result):
+        click.echo(f'   ... {result.rows} linhas lidas, {result.imported} importadas, {result.failed} com erro')
+
+    allowed_types = user_import.USER_TYPES if allow_nutritionists else ('user',)
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        result = user_import.import_users(
+            user_import.iter_rows(f, fmt), batch_size=batch_size, allowed_types=allowed_types,
+            dry_run=dry_run, max_errors=0, on_error=report_error, on_batch=report_batch
+        )
+
+    verb = 'válidos' if dry_run else 'importados'
+    click.echo(f'✅ {result.imported} de {result.rows} usuários {verb}; {result.failed} linhas com erro')
+    if result.failed:
+        sys.exit(1)
+
+
+def register_commands(app):
+    app.cli.add_command(init_db)
+    app.cli.add_command(db_cli)
+    app.cli.add_command(stats_cli)
+    app.cli.add_command(plans_cli)
+    app.cli.add_command(assets_cli)
+    app.cli.add_command(users_cli)
@@ -6,15 +6,29 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 from flask import Flask, send_from_directory
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
-from dotenv import load_dotenv
+from sqlalchemy import text
 
-# Carrega variáveis de ambiente
-load_dotenv()
+# Carrega variáveis de ambiente do .env local (em produção elas vêm do ambiente)
+_env_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
+if os.path.exists(_env_file):
+    from dotenv import load_dotenv
+    load_dotenv(_env_file)
 
 # Importa modelos e rotas
 from src.models.nutriai_models import db
 from src.routes.auth import auth_bp
 from src.routes.diet_plans import diet_plans_bp
+from src.services.plan_jobs import plan_job_queue
+from src.services.plan_cache import plan_cache
+from src.services.gemini_service import get_gemini_service
+from src.services.prompt_builder import prompt_stats
+from src.services.status_snapshot import statistics_snapshot
+from src.services.passwords import password_hasher
+from src.services.static_assets import static_assets
+from src.services import db_pool
+from src.services.metrics import metrics
+from src.services.profiler import request_profiler
+from src.cli import register_commands
 
 app = Flask(__name__, static_folder='../static', static_url_path='')
 
@@ -41,8 +55,30 @@ else:
 
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# Pool de conexões conforme o perfil (DB_POOL_PROFILE: auto, serverless, pooled, sqlite)
+db_pool.configure_app(app, app.config['SQLALCHEMY_DATABASE_URI'])
+
 # Inicializa banco
 db.init_app(app)
+db_pool.init_app(app, db)
+
+# Fila de geração de planos (PLAN_WORKERS / PLAN_WORKER_MODE)
+plan_job_queue.init_app(app)
+
+# Snapshot das estatísticas de /api/status (STATUS_REFRESH_INTERVAL)
+statistics_snapshot.init_app(app)
+
+# Hashing de senhas fora da thread da requisição (PASSWORD_HASH_METHOD / PASSWORD_HASH_WORKERS)
+password_hasher.init_app(app)
+
+# Arquivos estáticos comprimidos, com ETag e cache (STATIC_BUILD_DIR)
+static_assets.init_app(app)
+
+# Métricas Prometheus em /metrics (requer prometheus-client; PROMETHEUS_MULTIPROC_DIR com vários workers)
+metrics.init_app(app, db)
+
+# Perfil de SQL por requisição, Server-Timing e dumps do cProfile (PROFILER_ENABLED / PROFILE_DIR)
+request_profiler.init_app(app, db)
 
 # Registra blueprints
 app.register_blueprint(auth_bp, url_prefix='/api/auth')
@@ -51,149 +87,63 @@ app.register_blueprint(diet_plans_bp, url_prefix='/api/diet-plans')
 # Rota para servir frontend
 @app.route('/')
 def index():
-    return app.send_static_file('index.html')
+    return static_assets.send('index.html')
+
+# Probe de liveness/readiness: apenas verifica a conexão com o banco
+@app.route('/api/health')
+def api_health():
+    try:
+        db.session.execute(text('SELECT 1'))
+        return {"status": "ok", "database": "connected"}
+    except Exception as e:
+        return {"status": "error", "database": "disconnected", "message": str(e)}, 503
 
-# Rota de status da API
+# Rota de status da API (estatísticas servidas do snapshot em memória)
 @app.route('/api/status')
 def api_status():
-    from src.models.nutriai_models import User, DietPlan
+    snapshot = statistics_snapshot.get()
     
-    try:
-        # Conta usuários e planos
-        total_users = User.query.count()
-        total_plans = DietPlan.query.count()
-        pending_validation = DietPlan.query.filter_by(status='pending').count()
-        
-        # Verifica se IA Gemini está configurada
-        gemini_configured = bool(os.getenv('GEMINI_API_KEY'))
-        
-        # Determina tipo de banco
-        database_type = "Neon" if "neon" in app.config['SQLALCHEMY_DATABASE_URI'] else "SQLite"
-        
-        return {
-            "status": "online",
-            "message": "NutriAI API Científica funcionando",
-            "version": "2.0.0",
-            "database": database_type,
-            "gemini_configured": gemini_configured,
-            "statistics": {
-                "total_users": total_users,
-                "total_plans": total_plans,
-                "pending_validation": pending_validation
-            },
-            "features": {
-                "scientific_fields": 50,
-                "metabolic_calculations": True,
-                "ai_personalization": True,
-                "nutritionist_validation": True
-            },
-            "test_users": {
-                "user": "ana@email.com / 123456",
-                "nutritionist": "maria@nutricionista.com / 123456"
-            }
-        }
-    except Exception as e:
-        return {
-            "status": "error",
-            "message": f"Erro no banco de dados: {str(e)}",
-            "database": "disconnected"
-        }, 500
-
-# Inicialização do banco e dados de exemplo
-@app.before_first_request
-def create_tables():
-    from src.models.nutriai_models import User, DietPlan
+    # Verifica se IA Gemini está configurada
+    gemini_configured = bool(os.getenv('GEMINI_API_KEY'))
     
-    try:
-        db.create_all()
-        
-        # Usuário exemplo com dados científicos CORRIGIDOS
-        if not User.query.filter_by(email='ana@email.com').first():
-            user = User(
-                email='ana@email.com',
-                name='Ana Silva',
-                user_type='user',
-                age=28,
-                weight=65.5,
-                height=165.0,
-                goal='perder_peso',
-                budget_per_meal=25.0,
-                dietary_restrictions='Sem lactose',
-                waist_circumference=78.0,
-                weight_6_months_ago=70.0,
-                target_weight=60.0,
-                weight_variation_pattern='engorda_facil',
-                meal_times='{"cafe": "07:00", "almoco": "12:00", "jantar": "19:00"}',
-                eating_speed='normal',
-                snacking_frequency='raramente',
-                daily_water_intake=8,
-                alcohol_consumption='social',
-                food_dislikes='Brócolis, fígado',
-                sleep_hours=7.5,
-                sleep_quality='regular',
-                stress_level=7,
-                work_routine='sedentario',
-                work_schedule='comercial',
-                family_diabetes=True,
-                family_hypertension=True,
-                family_obesity=False,
-                family_heart_disease=False,
-                current_exercise='Caminhada',
-                exercise_frequency='leve',  # ✅ CORRIGIDO: String em vez de Integer
-                exercise_duration=30,
-                exercise_intensity='leve',
-                energy_level=6,
-                disposition_level=7,
-                bloating_frequency='frequentemente',
-                hunger_satiety_pattern='muita_fome',
-                monthly_weight_goal=2.0,
-                total_timeframe=6,
-                main_motivation='Melhorar saúde e autoestima',
-                previous_diet_experience='Já tentei várias dietas mas sempre desisto'
-            )
-            user.set_password('123456')
-            db.session.add(user)
-        
-        # Nutricionista exemplo
-        if not User.query.filter_by(email='maria@nutricionista.com').first():
-            nutritionist = User(
-                email='maria@nutricionista.com',
-                name='Dr. Maria Oliveira',
-                user_type='nutritionist',
-                crn_number='CRN-3 12345',
-                specialization='Nutrição Clínica e Esportiva'
-            )
-            nutritionist.set_password('123456')
-            db.session.add(nutritionist)
-        
-        # Segundo usuário exemplo
-        if not User.query.filter_by(email='carlos@email.com').first():
-            user2 = User(
-                email='carlos@email.com',
-                name='Carlos Santos',
-                user_type='user',
-                age=35,
-                weight=85.0,
-                height=178.0,
-                goal='ganhar_massa',
-                budget_per_meal=30.0,
-                dietary_restrictions='Nenhuma',
-                exercise_frequency='moderado',  # ✅ CORRIGIDO: String em vez de Integer
-                stress_level=5,
-                energy_level=8,
-                family_diabetes=False,
-                family_hypertension=False
-            )
-            user2.set_password('123456')
-            db.session.add(user2)
-        
-        db.session.commit()
-        print("✅ Banco de dados inicializado com sucesso")
-        
-    except Exception as e:
-        print(f"❌ Erro ao inicializar banco: {e}")
-        db.session.rollback()
+    # Determina tipo de banco
+    database_type = "Neon" if "neon" in app.config['SQLALCHEMY_DATABASE_URI'] else "SQLite"
+    
+    return {
+        "status": "online" if snapshot['error'] is None else "degraded",
+        "message": "NutriAI API Científica funcionando",
+        "version": "2.0.0",
+        "database": database_type,
+        "gemini_configured": gemini_configured,
+        "statistics": snapshot['statistics'],
+        "statistics_refreshed_at": snapshot['refreshed_at'],
+        "statistics_refresh_interval": snapshot['refresh_interval'],
+        "plan_cache": plan_cache.stats(),
+        "gemini_circuit": get_gemini_service().breaker.state,
+        "gemini_prompt": {
+            "variant": get_gemini_service().prompt_builder.variant,
+            "templates": prompt_stats.snapshot()
+        },
+        "database_pool": db_pool.pool_status(db.engine, app.config['DB_POOL_PROFILE']),
+        "features": {
+            "scientific_fields": 50,
+            "metabolic_calculations": True,
+            "ai_personalization": True,
+            "nutritionist_validation": True
+        },
+        "test_users": {
+            "user": "ana@email.com / 123456",
+            "nutritionist": "maria@nutricionista.com / 123456"
+        }
+    }
+
+# Comandos de linha de comando (flask --app app init-db, db upgrade|status|verify, ...)
+register_commands(app)
 
 if __name__ == '__main__':
+    # Em desenvolvimento prepara o banco antes de subir; em produção use `flask --app app init-db`
+    from src.seed import init_database
+    with app.app_context():
+        init_database()
     app.run(debug=True, host='0.0.0.0', port=5000)
 
@@ -0,0 +1,13 @@
+"""Esquema base: cria as tabelas dos modelos que ainda não existem (equivalente ao antigo db.create_all())"""
+from src.models.nutriai_models import db
+
+VERSION = 1
+DESCRIPTION = 'Esquema inicial (users, diet_plans e tabelas auxiliares)'
+
+
+def upgrade(conn):
+    db.metadata.create_all(conn, checkfirst=True)
+
+
+def downgrade(conn):
+    raise RuntimeError('A migração inicial não pode ser revertida')
@@ -0,0 +1,55 @@
+"""
+Índices compostos das consultas quentes de diet_plans.py:
+- status + created_at: fila de pendentes ordenada (/pending, dashboard)
+- user_id + created_at: histórico do usuário (/my-plans)
+- nutritionist_id + status: contagens por nutricionista
+- users.user_type: listagem de pacientes (/cohort-metrics)
+"""
+from src.migrations.utils import check_index_used
+from src.models.nutriai_models import DietPlan, User
+
+VERSION = 2
+DESCRIPTION = 'Índices compostos para status, user_id/created_at e nutritionist_id/status'
+
+INDEXES = [index for model in (DietPlan, User) for index in model.__table__.indexes
+           if index.name in (
+               'ix_diet_plans_status_created',
+               'ix_diet_plans_user_created',
+               'ix_diet_plans_nutritionist_status',
+               'ix_users_user_type',
+           )]
+
+
+def upgrade(conn):
+    for index in INDEXES:
+        index.create(conn, checkfirst=True)
+
+
+def downgrade(conn):
+    for index in INDEXES:
+        index.drop(conn, checkfirst=True)
+
+
+def verify(conn):
+    return [
+        check_index_used(
+            conn, 'pendentes ordenados',
+            "SELECT id FROM diet_plans WHERE status = :status ORDER BY created_at DESC, id DESC LIMIT 21",
+            'ix_diet_plans_status_created', {'status': 'pending'}
+        ),
+        check_index_used(
+            conn, 'histórico do usuário',
+            "SELECT id FROM diet_plans WHERE user_id = :user_id ORDER BY created_at DESC, id DESC LIMIT 21",
+            'ix_diet_plans_user_created', {'user_id': 1}
+        ),
+        check_index_used(
+            conn, 'contagem por nutricionista',
+            "SELECT count(*) FROM diet_plans WHERE nutritionist_id = :nutritionist_id AND status = :status",
+            'ix_diet_plans_nutritionist_status', {'nutritionist_id': 1, 'status': 'approved'}
+        ),
+        check_index_used(
+            conn, 'pacientes por tipo',
+            "SELECT id FROM users WHERE user_type = :user_type",
+            'ix_users_user_type', {'user_type': 'user'}
+        ),
+    ]
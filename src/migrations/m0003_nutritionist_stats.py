@@ -0,0 +1,17 @@
+"""Tabelas de estatísticas mantidas incrementalmente, preenchidas a partir dos planos existentes"""
+from src.models.nutriai_models import NutritionistStats, SystemCounter
+from src.services.plan_stats import rebuild_stats
+
+VERSION = 3
+DESCRIPTION = 'Estatísticas por nutricionista e contadores globais de planos'
+
+
+def upgrade(conn):
+    NutritionistStats.__table__.create(conn, checkfirst=True)
+    SystemCounter.__table__.create(conn, checkfirst=True)
+    rebuild_stats(conn)
+
+
+def downgrade(conn):
+    NutritionistStats.__table__.drop(conn, checkfirst=True)
+    SystemCounter.__table__.drop(conn, checkfirst=True)
@@ -0,0 +1,80 @@
+"""
+plan_data como JSON nativo (JSONB no Postgres) e colunas de resumo
+(plan_type, total_calories, total_cost) preenchidas a partir dos planos existentes.
+"""
+import json
+
+from sqlalchemy import Column, Float, String, text
+
+from src.migrations.utils import has_column
+
+VERSION = 4
+DESCRIPTION = 'plan_data em JSON/JSONB e colunas de resumo do plano'
+
+SUMMARY_COLUMNS = [
+    Column('plan_type', String(100)),
+    Column('total_calories', Float),
+    Column('total_cost', Float),
+]
+
+BATCH_SIZE = 500
+
+
+def _as_float(value):
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _as_text(value, length):
+    if value is None or value == '':
+        return None
+    return str(value)[:length]
+
+
+def upgrade(conn):
+    for column in SUMMARY_COLUMNS:
+        if not has_column(conn, 'diet_plans', column.name):
+            column_type = column.type.compile(dialect=conn.dialect)
+            conn.execute(text(f'ALTER TABLE diet_plans ADD COLUMN {column.name} {column_type}'))
+
+    if conn.dialect.name == 'postgresql':
+        # No SQLite o tipo JSON já é armazenado como texto: nada a converter
+        conn.execute(text(
+            'ALTER TABLE diet_plans ALTER COLUMN plan_data TYPE JSONB USING plan_data::jsonb'
+        ))
+
+    # Preenche o resumo em lotes, lendo o JSON bruto para funcionar com TEXT ou JSONB
+    last_id = 0
+    while True:
+        rows = conn.execute(text(
+            'SELECT id, plan_data FROM diet_plans WHERE id > :last_id AND plan_data IS NOT NULL '
+            'ORDER BY id LIMIT :limit'
+        ), {'last_id': last_id, 'limit': BATCH_SIZE}).fetchall()
+        if not rows:
+            break
+
+        updates = []
+        for row in rows:
+            plan = row.plan_data if isinstance(row.plan_data, dict) else json.loads(row.plan_data)
+            totals = plan.get('daily_totals') or {}
+            updates.append({
+                'plan_id': row.id,
+                'plan_type': _as_text(plan.get('plan_type'), SUMMARY_COLUMNS[0].type.length),
+                'total_calories': _as_float(totals.get('total_calories')),
+                'total_cost': _as_float(totals.get('total_cost'))
+            })
+        conn.execute(text(
+            'UPDATE diet_plans SET plan_type = :plan_type, total_calories = :total_calories, '
+            'total_cost = :total_cost WHERE id = :plan_id'
+        ), updates)
+        last_id = rows[-1].id
+
+
+def downgrade(conn):
+    if conn.dialect.name == 'postgresql':
+        conn.execute(text('ALTER TABLE diet_plans ALTER COLUMN plan_data TYPE TEXT USING plan_data::text'))
+    for column in SUMMARY_COLUMNS:
+        if has_column(conn, 'diet_plans', column.name):
+            conn.execute(text(f'ALTER TABLE diet_plans DROP COLUMN {column.name}'))
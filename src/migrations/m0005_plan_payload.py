@@ -0,0 +1,31 @@
+"""
+Coluna plan_payload para planos comprimidos (ver src/services/plan_codec.py).
+As linhas existentes continuam em plan_data até serem recodificadas com `flask plans reencode`.
+"""
+from sqlalchemy import JSON, LargeBinary, bindparam, text
+from sqlalchemy.dialects.postgresql import JSONB
+
+from src.migrations.utils import has_column
+
+VERSION = 5
+DESCRIPTION = 'plan_payload comprimido (zlib/zstd) em diet_plans'
+
+
+def upgrade(conn):
+    if not has_column(conn, 'diet_plans', 'plan_payload'):
+        column_type = LargeBinary().compile(dialect=conn.dialect)
+        conn.execute(text(f'ALTER TABLE diet_plans ADD COLUMN plan_payload {column_type}'))
+
+
+def downgrade(conn):
+    # Devolve os planos comprimidos para plan_data antes de remover a coluna
+    from src.services import plan_codec
+
+    restore = text('UPDATE diet_plans SET plan_data = :plan_data, plan_payload = NULL WHERE id = :plan_id').bindparams(
+        bindparam('plan_data', type_=JSON().with_variant(JSONB(), 'postgresql'))
+    )
+    rows = conn.execute(text('SELECT id, plan_payload FROM diet_plans WHERE plan_payload IS NOT NULL')).fetchall()
+    for row in rows:
+        conn.execute(restore, {'plan_data': plan_codec.decode(row.plan_payload), 'plan_id': row.id})
+    if has_column(conn, 'diet_plans', 'plan_payload'):
+        conn.execute(text('ALTER TABLE diet_plans DROP COLUMN plan_payload'))
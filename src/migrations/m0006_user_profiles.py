@@ -0,0 +1,47 @@
+"""
+Divisão vertical de users: os campos da anamnese vão para user_profiles (1:1),
+deixando em users apenas autenticação, dados básicos e entradas do cálculo metabólico.
+"""
+from sqlalchemy import text
+
+from src.migrations.utils import has_column, has_table
+from src.models.nutriai_models import PROFILE_FIELDS, UserProfile
+
+VERSION = 6
+DESCRIPTION = 'Anamnese científica movida de users para user_profiles'
+
+
+def upgrade(conn):
+    UserProfile.__table__.create(conn, checkfirst=True)
+
+    # Bancos criados já com o esquema novo não têm o que copiar
+    legacy_fields = [field for field in PROFILE_FIELDS if has_column(conn, 'users', field)]
+    if not legacy_fields:
+        return
+
+    columns = ', '.join(legacy_fields)
+    conn.execute(text(
+        f'INSERT INTO user_profiles (user_id, {columns}) '
+        f'SELECT id, {columns} FROM users '
+        f'WHERE NOT EXISTS (SELECT 1 FROM user_profiles WHERE user_profiles.user_id = users.id)'
+    ))
+
+    for field in legacy_fields:
+        conn.execute(text(f'ALTER TABLE users DROP COLUMN {field}'))
+
+
+def downgrade(conn):
+    if not has_table(conn, 'user_profiles'):
+        return
+
+    for column in UserProfile.__table__.columns:
+        if column.name != 'user_id' and not has_column(conn, 'users', column.name):
+            column_type = column.type.compile(dialect=conn.dialect)
+            conn.execute(text(f'ALTER TABLE users ADD COLUMN {column.name} {column_type}'))
+
+    assignments = ', '.join(
+        f'{field} = (SELECT {field} FROM user_profiles WHERE user_profiles.user_id = users.id)'
+        for field in PROFILE_FIELDS
+    )
+    conn.execute(text(f'UPDATE users SET {assignments}'))
+    UserProfile.__table__.drop(conn)
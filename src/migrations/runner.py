@@ -0,0 +1,101 @@
+from datetime import datetime
+from typing import Dict, List
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, select
+
+from src.migrations import (
+    m0001_initial_schema, m0002_hot_query_indexes, m0003_nutritionist_stats, m0004_plan_data_json,
+    m0005_plan_payload, m0006_user_profiles
+)
+
+# Ordem de aplicação; cada módulo expõe VERSION, DESCRIPTION, upgrade(conn), downgrade(conn)
+# e, opcionalmente, verify(conn) -> lista de checagens EXPLAIN
+MIGRATIONS = [
+    m0001_initial_schema,
+    m0002_hot_query_indexes,
+    m0003_nutritionist_stats,
+    m0004_plan_data_json,
+    m0005_plan_payload,
+    m0006_user_profiles,
+]
+
+_metadata = MetaData()
+schema_migrations = Table(
+    'schema_migrations', _metadata,
+    Column('version', Integer, primary_key=True),
+    Column('description', String(200), nullable=False),
+    Column('applied_at', DateTime, nullable=False)
+)
+
+
+# Execução
+
+def applied_versions(conn) -> List[int]:
+    schema_migrations.create(conn, checkfirst=True)
+    return [row.version for row in conn.execute(select(schema_migrations.c.version).order_by(schema_migrations.c.version))]
+
+
+def current_version(engine) -> int:
+    with engine.begin() as conn:
+        versions = applied_versions(conn)
+    return versions[-1] if versions else 0
+
+
+def upgrade(engine, target: int = None) -> List[int]:
+    """Aplica as migrações pendentes até `target` (padrão: a mais recente)"""
+    applied = []
+    for migration in MIGRATIONS:
+        if target is not None and migration.VERSION > target:
+            break
+        with engine.begin() as conn:
+            if migration.VERSION in applied_versions(conn):
+                continue
+            migration.upgrade(conn)
+            conn.execute(schema_migrations.insert().values(
+                version=migration.VERSION,
+                description=migration.DESCRIPTION,
+                applied_at=datetime.utcnow()
+            ))
+        applied.append(migration.VERSION)
+    return applied
+
+
+def downgrade(engine, target: int) -> List[int]:
+    """Reverte as migrações aplicadas com versão maior que `target`"""
+    reverted = []
+    for migration in reversed(MIGRATIONS):
+        if migration.VERSION <= target:
+            break
+        with engine.begin() as conn:
+            if migration.VERSION not in applied_versions(conn):
+                continue
+            migration.downgrade(conn)
+            conn.execute(schema_migrations.delete().where(schema_migrations.c.version == migration.VERSION))
+        reverted.append(migration.VERSION)
+    return reverted
+
+
+def status(engine) -> List[Dict]:
+    with engine.begin() as conn:
+        versions = set(applied_versions(conn))
+    return [
+        {'version': m.VERSION, 'description': m.DESCRIPTION, 'applied': m.VERSION in versions}
+        for m in MIGRATIONS
+    ]
+
+
+def verify(engine) -> List[Dict]:
+    """Roda as checagens EXPLAIN das migrações aplicadas (em transação revertida)"""
+    results = []
+    with engine.connect() as conn:
+        versions = set(applied_versions(conn))
+        conn.commit()
+        for migration in MIGRATIONS:
+            if migration.VERSION not in versions or not hasattr(migration, 'verify'):
+                continue
+            with conn.begin() as transaction:
+                for result in migration.verify(conn):
+                    result['version'] = migration.VERSION
+                    results.append(result)
+                transaction.rollback()
+    return results
@@ -0,0 +1,34 @@
+from typing import Dict
+
+from sqlalchemy import inspect, text
+
+
+# Utilitários para migrações idempotentes (create_all pode já ter criado o objeto)
+
+def has_table(conn, table: str) -> bool:
+    return inspect(conn).has_table(table)
+
+
+def has_column(conn, table: str, column: str) -> bool:
+    return any(col['name'] == column for col in inspect(conn).get_columns(table))
+
+
+def has_index(conn, table: str, index: str) -> bool:
+    return any(ix['name'] == index for ix in inspect(conn).get_indexes(table))
+
+
+def explain(conn, sql: str, params: Dict = None) -> str:
+    """Plano de execução em texto, em Postgres ou SQLite"""
+    if conn.dialect.name == 'sqlite':
+        rows = conn.execute(text(f'EXPLAIN QUERY PLAN {sql}'), params or {}).fetchall()
+        return '\n'.join(str(row[-1]) for row in rows)
+
+    # Em tabelas pequenas o Postgres prefere seq scan; desligá-lo mostra se o índice é utilizável
+    conn.execute(text('SET LOCAL enable_seqscan = off'))
+    rows = conn.execute(text(f'EXPLAIN {sql}'), params or {}).fetchall()
+    return '\n'.join(str(row[0]) for row in rows)
+
+
+def check_index_used(conn, name: str, sql: str, index: str, params: Dict = None) -> Dict:
+    plan = explain(conn, sql, params)
+    return {'check': name, 'index': index, 'used': index in plan, 'plan': plan}
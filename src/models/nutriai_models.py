@@ -1,12 +1,30 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.associationproxy import association_proxy
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
-import json
+import uuid
+from src.services import plan_codec
+from src.services.passwords import password_hasher
 
 db = SQLAlchemy()
 
+def _as_float(value):
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+def _as_text(value, length):
+    """Texto livre vindo da IA, convertido para str e cortado no tamanho da coluna"""
+    if value is None or value == '':
+        return None
+    return str(value)[:length]
+
 class User(db.Model):
     __tablename__ = 'users'
+    __table_args__ = (
+        db.Index('ix_users_user_type', 'user_type'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
@@ -23,7 +41,107 @@ class User(db.Model):
     budget_per_meal = db.Column(db.Float)
     dietary_restrictions = db.Column(db.Text)
     
-    # CAMPOS CIENTÍFICOS CORRIGIDOS
+    # Nível de atividade: entrada do cálculo metabólico, por isso fica na tabela principal
+    exercise_frequency = db.Column(db.String(30))  # ✅ MUDOU: "sedentario", "leve", "moderado", "intenso", "muito_intenso"
+    
+    # Campos específicos do nutricionista
+    crn_number = db.Column(db.String(20))  # Número do CRN
+    specialization = db.Column(db.String(100))
+    
+    # Relacionamentos
+    # Anamnese completa em user_profiles, carregada só quando algum campo científico é acessado
+    profile = db.relationship('UserProfile', uselist=False, lazy='select', back_populates='user',
+                              cascade='all, delete-orphan')
+    diet_plans = db.relationship('DietPlan', backref='user', lazy=True, foreign_keys='DietPlan.user_id')
+    validated_plans = db.relationship('DietPlan', backref='nutritionist', lazy=True, foreign_keys='DietPlan.nutritionist_id')
+    
+    def set_password(self, password):
+        self.password_hash = password_hasher.hash(password)
+    
+    def check_password(self, password):
+        return password_hasher.verify(self.password_hash, password)
+    
+    # Campos do cadastro gravados em users (os da anamnese ficam em PROFILE_FIELDS)
+    REGISTRATION_FIELDS = ('age', 'weight', 'height', 'goal', 'budget_per_meal', 'dietary_restrictions',
+                           'exercise_frequency')
+    NUTRITIONIST_FIELDS = ('crn_number', 'specialization')
+    
+    @classmethod
+    def from_registration(cls, data):
+        """
+        Novo usuário com os campos do cadastro (register e importação em lote).
+        A senha não é tocada: defina com set_password ou password_hash.
+        """
+        user = cls(email=data['email'], name=data['name'], user_type=data.get('user_type') or 'user')
+        for field in cls.REGISTRATION_FIELDS:
+            setattr(user, field, data.get(field))
+        for field in PROFILE_FIELDS:
+            default = False if field.startswith('family_') else None
+            setattr(user, field, data.get(field, default))
+        if user.user_type == 'nutritionist':
+            for field in cls.NUTRITIONIST_FIELDS:
+                setattr(user, field, data.get(field))
+        return user
+    
+    # Colunas de entrada do motor metabólico (para carregamentos parciais de User)
+    METABOLIC_FIELDS = ('weight', 'height', 'age', 'exercise_frequency', 'goal')
+    
+    def metabolic_profile(self):
+        """
+        TMB, TDEE, meta calórica e macros calculados pelo motor metabólico.
+        Memoizado por instância; recalcula apenas se os dados de entrada mudarem.
+        """
+        inputs = (self.weight, self.height, self.age, self.exercise_frequency, self.goal,
+                  getattr(self, 'gender', None))
+        memo = self.__dict__.get('_metabolic_memo')
+        if memo is None or memo[0] != inputs:
+            from src.services import metabolic_engine  # NumPy só é importado no primeiro cálculo
+            memo = (inputs, metabolic_engine.compute_profile(*inputs))
+            self._metabolic_memo = memo
+        return memo[1]
+    
+    def calculate_bmr(self):
+        """Calcula Taxa Metabólica Basal usando Harris-Benedict"""
+        return self.metabolic_profile()['bmr']
+    
+    def calculate_tdee(self):
+        """Calcula Gasto Energético Total Diário"""
+        return self.metabolic_profile()['tdee']
+    
+    def calculate_macros(self):
+        """Calcula distribuição de macronutrientes"""
+        macros = self.metabolic_profile()['macros']
+        return dict(macros) if macros else None
+    
+    def calculate_target_calories(self):
+        """Meta calórica diária ajustada ao objetivo"""
+        return self.metabolic_profile()['target_calories']
+    
+    def to_dict(self):
+        """Converte usuário para dicionário"""
+        return {
+            'id': self.id,
+            'email': self.email,
+            'name': self.name,
+            'user_type': self.user_type,
+            'age': self.age,
+            'weight': self.weight,
+            'height': self.height,
+            'goal': self.goal,
+            'budget_per_meal': self.budget_per_meal,
+            'exercise_frequency': self.exercise_frequency,
+            'bmr': self.calculate_bmr(),
+            'tdee': self.calculate_tdee(),
+            'macros': self.calculate_macros(),
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+class UserProfile(db.Model):
+    """Anamnese científica do usuário (1:1 com users), separada para manter a linha de users estreita"""
+    __tablename__ = 'user_profiles'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    
     # Dados Antropométricos
     waist_circumference = db.Column(db.Float)  # Circunferência abdominal (cm)
     weight_6_months_ago = db.Column(db.Float)  # Peso há 6 meses
@@ -53,7 +171,6 @@ class User(db.Model):
     
     # Atividade Física - CORRIGIDO
     current_exercise = db.Column(db.String(100))  # Tipo de exercício atual
-    exercise_frequency = db.Column(db.String(30))  # ✅ MUDOU: "sedentario", "leve", "moderado", "intenso", "muito_intenso"
     exercise_duration = db.Column(db.Integer)  # Minutos por sessão
     exercise_intensity = db.Column(db.String(20))  # "leve", "moderado", "intenso"
     
@@ -75,105 +192,26 @@ class User(db.Model):
     main_motivation = db.Column(db.Text)  # Motivação principal
     previous_diet_experience = db.Column(db.Text)  # Experiência anterior com dietas
     
-    # Campos específicos do nutricionista
-    crn_number = db.Column(db.String(20))  # Número do CRN
-    specialization = db.Column(db.String(100))
-    
-    # Relacionamentos
-    diet_plans = db.relationship('DietPlan', backref='user', lazy=True, foreign_keys='DietPlan.user_id')
-    validated_plans = db.relationship('DietPlan', backref='nutritionist', lazy=True, foreign_keys='DietPlan.nutritionist_id')
-    
-    def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
-    
-    def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
-    
-    def calculate_bmr(self):
-        """Calcula Taxa Metabólica Basal usando Harris-Benedict"""
-        if not self.weight or not self.height or not self.age:
-            return None
-            
-        # Assumindo gênero masculino se não especificado (pode ser melhorado)
-        # Fórmula Harris-Benedict revisada
-        if hasattr(self, 'gender') and self.gender == 'female':
-            bmr = 447.593 + (9.247 * self.weight) + (3.098 * self.height) - (4.330 * self.age)
-        else:
-            bmr = 88.362 + (13.397 * self.weight) + (4.799 * self.height) - (5.677 * self.age)
-        
-        return round(bmr, 2)
-    
-    def calculate_tdee(self):
-        """Calcula Gasto Energético Total Diário"""
-        bmr = self.calculate_bmr()
-        if not bmr:
-            return None
-        
-        # Fatores de atividade baseados em exercise_frequency
-        activity_factors = {
-            'sedentario': 1.2,
-            'leve': 1.375,      # 1-3x/semana
-            'moderado': 1.55,   # 3-5x/semana
-            'intenso': 1.725,   # 6-7x/semana
-            'muito_intenso': 1.9  # 2x/dia
-        }
-        
-        factor = activity_factors.get(self.exercise_frequency, 1.2)
-        tdee = bmr * factor
-        
-        return round(tdee, 2)
-    
-    def calculate_macros(self):
-        """Calcula distribuição de macronutrientes"""
-        tdee = self.calculate_tdee()
-        if not tdee:
-            return None
-        
-        # Ajusta calorias baseado no objetivo
-        if self.goal == 'perder_peso':
-            calories = tdee * 0.85  # Déficit de 15%
-        elif self.goal == 'ganhar_peso':
-            calories = tdee * 1.15  # Superávit de 15%
-        else:
-            calories = tdee  # Manutenção
-        
-        # Distribuição padrão de macros
-        protein_ratio = 0.25  # 25% proteína
-        carb_ratio = 0.45     # 45% carboidrato
-        fat_ratio = 0.30      # 30% gordura
-        
-        protein_g = (calories * protein_ratio) / 4  # 4 cal/g
-        carb_g = (calories * carb_ratio) / 4        # 4 cal/g
-        fat_g = (calories * fat_ratio) / 9          # 9 cal/g
-        
-        return {
-            'calories': round(calories, 0),
-            'protein_g': round(protein_g, 1),
-            'carb_g': round(carb_g, 1),
-            'fat_g': round(fat_g, 1)
-        }
-    
-    def to_dict(self):
-        """Converte usuário para dicionário"""
-        return {
-            'id': self.id,
-            'email': self.email,
-            'name': self.name,
-            'user_type': self.user_type,
-            'age': self.age,
-            'weight': self.weight,
-            'height': self.height,
-            'goal': self.goal,
-            'budget_per_meal': self.budget_per_meal,
-            'exercise_frequency': self.exercise_frequency,
-            'bmr': self.calculate_bmr(),
-            'tdee': self.calculate_tdee(),
-            'macros': self.calculate_macros(),
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
+    user = db.relationship('User', back_populates='profile')
+
+# Campos de UserProfile acessíveis diretamente em User (user.sleep_hours etc.);
+# a atribuição cria o perfil quando ele ainda não existe
+PROFILE_FIELDS = tuple(column.name for column in UserProfile.__table__.columns if column.name != 'user_id')
+
+def _profile_creator(field):
+    return lambda value: UserProfile(**{field: value})
+
+for _field in PROFILE_FIELDS:
+    setattr(User, _field, association_proxy('profile', _field, creator=_profile_creator(_field)))
 
 class DietPlan(db.Model):
     __tablename__ = 'diet_plans'
+    __table_args__ = (
+        # Índices das consultas quentes (ver src/migrations/m0002_hot_query_indexes.py)
+        db.Index('ix_diet_plans_status_created', 'status', 'created_at', 'id'),
+        db.Index('ix_diet_plans_user_created', 'user_id', 'created_at', 'id'),
+        db.Index('ix_diet_plans_nutritionist_status', 'nutritionist_id', 'status'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -181,7 +219,15 @@ class DietPlan(db.Model):
     
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
-    plan_data = db.Column(db.Text)  # JSON com o plano completo
+    # Plano completo, acessado por plan_data: JSON sem compressão (JSONB no Postgres) para o codec
+    # 'json' e linhas antigas, ou payload comprimido (plan_codec); ambos carregados só quando acessados
+    _plan_json = db.deferred(db.Column('plan_data', db.JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), 'postgresql')))
+    _plan_payload = db.deferred(db.Column('plan_payload', db.LargeBinary))
+    
+    # Resumo extraído do plano na gravação, para listagens sem carregar plan_data
+    plan_type = db.Column(db.String(100))
+    total_calories = db.Column(db.Float)
+    total_cost = db.Column(db.Float)
     
     status = db.Column(db.String(20), default='pending')  # pending, approved, rejected
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -190,17 +236,141 @@ class DietPlan(db.Model):
     # Feedback do nutricionista
     nutritionist_feedback = db.Column(db.Text)
     
+    @property
+    def plan_data(self):
+        payload = self._plan_payload
+        if payload is None:
+            return self._plan_json
+        # Descomprime no primeiro acesso e reaproveita enquanto o payload não mudar
+        decoded = self.__dict__.get('_decoded_plan')
+        if decoded is None or decoded[0] is not payload:
+            decoded = (payload, plan_codec.decode(payload))
+            self.__dict__['_decoded_plan'] = decoded
+        return decoded[1]
+    
+    @plan_data.setter
+    def plan_data(self, plan):
+        self.store_plan(plan)
+    
+    def store_plan(self, plan, codec=None):
+        """Grava o plano com o codec informado (padrão: PLAN_DATA_CODEC)"""
+        payload = plan_codec.encode(plan, codec) if plan is not None else None
+        self._plan_payload = payload
+        self._plan_json = plan if payload is None else None
+        self.__dict__.pop('_decoded_plan', None)
+    
+    def set_ai_plan(self, ai_plan):
+        """Armazena o plano gerado pela IA e deriva título/descrição"""
+        self.plan_data = ai_plan
+        
+        daily_totals = ai_plan.get('daily_totals') or {}
+        columns = self.__table__.c
+        self.plan_type = _as_text(ai_plan.get('plan_type'), columns.plan_type.type.length)
+        self.total_calories = _as_float(daily_totals.get('total_calories'))
+        self.total_cost = _as_float(daily_totals.get('total_cost'))
+        
+        self.title = _as_text(ai_plan.get('plan_type'), columns.title.type.length) or 'Plano Alimentar Personalizado'
+        if ai_plan.get('fallback'):
+            self.description = 'Plano gerado automaticamente (IA indisponível)'
+        else:
+            self.description = 'Plano gerado pela IA Gemini com base no perfil científico'
+    
+    # Campos aceitos em to_dict(fields=...) / ?fields=
+    SERIALIZABLE_FIELDS = (
+        'id', 'user_id', 'nutritionist_id', 'title', 'description', 'plan_data',
+        'plan_type', 'total_calories', 'total_cost',
+        'status', 'created_at', 'validated_at', 'nutritionist_feedback'
+    )
+    # Projeção padrão das listagens resumidas (sem o JSON completo)
+    SUMMARY_FIELDS = tuple(field for field in SERIALIZABLE_FIELDS if field != 'plan_data')
+    
+    @classmethod
+    def plan_options(cls):
+        """Opções que carregam o plano completo junto com a linha"""
+        return [db.undefer(cls._plan_json), db.undefer(cls._plan_payload)]
+    
+    @classmethod
+    def load_options(cls, fields=None):
+        """Opções de carregamento que trazem apenas as colunas da projeção"""
+        if not fields:
+            return cls.plan_options()
+        columns = {'id', 'created_at'} | set(fields)  # id/created_at sustentam a paginação
+        attributes = []
+        for name in cls.SERIALIZABLE_FIELDS:
+            if name not in columns:
+                continue
+            if name == 'plan_data':
+                attributes += [cls._plan_json, cls._plan_payload]
+            else:
+                attributes.append(getattr(cls, name))
+        return [db.load_only(*attributes)]
+    
+    def to_dict(self, fields=None):
+        result = {}
+        for field in fields or self.SERIALIZABLE_FIELDS:
+            if field == 'plan_data':
+                result[field] = self.plan_data
+            elif field in ('created_at', 'validated_at'):
+                value = getattr(self, field)
+                result[field] = value.isoformat() if value else None
+            else:
+                result[field] = getattr(self, field)
+        return result
+
+class PlanGenerationJob(db.Model):
+    __tablename__ = 'plan_generation_jobs'
+    
+    id = db.Column(db.String(32), primary_key=True, default=lambda: uuid.uuid4().hex)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    diet_plan_id = db.Column(db.Integer, db.ForeignKey('diet_plans.id'))
+    
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, completed, failed
+    force_fresh = db.Column(db.Boolean, nullable=False, default=False)  # Ignora o cache de planos
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text)
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
     def to_dict(self):
         return {
             'id': self.id,
             'user_id': self.user_id,
-            'nutritionist_id': self.nutritionist_id,
-            'title': self.title,
-            'description': self.description,
-            'plan_data': json.loads(self.plan_data) if self.plan_data else None,
+            'diet_plan_id': self.diet_plan_id,
             'status': self.status,
+            'force_fresh': self.force_fresh,
+            'attempts': self.attempts,
+            'error': self.error,
             'created_at': self.created_at.isoformat() if self.created_at else None,
-            'validated_at': self.validated_at.isoformat() if self.validated_at else None,
-            'nutritionist_feedback': self.nutritionist_feedback
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
         }
 
+
+class PlanCacheEntry(db.Model):
+    __tablename__ = 'plan_cache'
+    
+    key = db.Column(db.String(64), primary_key=True)  # SHA-256 das entradas normalizadas do prompt
+    plan_data = db.Column(db.Text, nullable=False)  # JSON do plano gerado
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
+class NutritionistStats(db.Model):
+    __tablename__ = 'nutritionist_stats'
+    
+    # Mantida incrementalmente em validate_plan (ver src/services/plan_stats.py)
+    nutritionist_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    validations = db.Column(db.Integer, nullable=False, default=0)
+    approvals = db.Column(db.Integer, nullable=False, default=0)
+    rejections = db.Column(db.Integer, nullable=False, default=0)
+    unique_patients = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class SystemCounter(db.Model):
+    __tablename__ = 'system_counters'
+    
+    name = db.Column(db.String(50), primary_key=True)  # 'total_plans', 'pending_plans'
+    value = db.Column(db.Integer, nullable=False, default=0)
@@ -1,10 +1,19 @@
+import io
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from src.models.nutriai_models import db, User
-from datetime import timedelta
+from src.services.identity import create_user_token, current_principal, invalidate_identity
+from src.services.passwords import PasswordHasherBusy, password_hasher
+from src.services.user_import import FORMATS, detect_format, import_users, iter_rows
 
 auth_bp = Blueprint('auth', __name__)
 
+def _busy_response(error):
+    """503 quando o pool de hashing de senhas está saturado"""
+    response = jsonify({'error': 'Servidor ocupado, tente novamente em instantes'})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 503
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     """Registra novo usuário com dados científicos completos"""
@@ -19,86 +28,15 @@ def register():
         if User.query.filter_by(email=data['email']).first():
             return jsonify({'error': 'Email já cadastrado'}), 400
         
-        # Cria novo usuário
-        user = User(
-            email=data['email'],
-            name=data['name'],
-            user_type=data.get('user_type', 'user')
-        )
+        # Cria novo usuário (mesmo mapeamento de campos da importação em lote)
+        user = User.from_registration(data)
         user.set_password(data['password'])
         
-        # Dados básicos
-        user.age = data.get('age')
-        user.weight = data.get('weight')
-        user.height = data.get('height')
-        user.goal = data.get('goal')
-        user.budget_per_meal = data.get('budget_per_meal')
-        user.dietary_restrictions = data.get('dietary_restrictions')
-        
-        # Dados científicos antropométricos
-        user.waist_circumference = data.get('waist_circumference')
-        user.weight_6_months_ago = data.get('weight_6_months_ago')
-        user.target_weight = data.get('target_weight')
-        user.weight_variation_pattern = data.get('weight_variation_pattern')
-        
-        # Comportamento alimentar
-        user.meal_times = data.get('meal_times')
-        user.eating_speed = data.get('eating_speed')
-        user.snacking_frequency = data.get('snacking_frequency')
-        user.daily_water_intake = data.get('daily_water_intake')
-        user.alcohol_consumption = data.get('alcohol_consumption')
-        user.food_dislikes = data.get('food_dislikes')
-        
-        # Estilo de vida
-        user.sleep_hours = data.get('sleep_hours')
-        user.sleep_quality = data.get('sleep_quality')
-        user.stress_level = data.get('stress_level')
-        user.work_routine = data.get('work_routine')
-        user.work_schedule = data.get('work_schedule')
-        
-        # Histórico familiar
-        user.family_diabetes = data.get('family_diabetes', False)
-        user.family_hypertension = data.get('family_hypertension', False)
-        user.family_obesity = data.get('family_obesity', False)
-        user.family_heart_disease = data.get('family_heart_disease', False)
-        
-        # Atividade física
-        user.current_exercise = data.get('current_exercise')
-        user.exercise_frequency = data.get('exercise_frequency')
-        user.exercise_duration = data.get('exercise_duration')
-        user.exercise_intensity = data.get('exercise_intensity')
-        
-        # Medicamentos
-        user.current_medications = data.get('current_medications')
-        user.supplements = data.get('supplements')
-        user.medication_schedule = data.get('medication_schedule')
-        
-        # Autoavaliação
-        user.energy_level = data.get('energy_level')
-        user.disposition_level = data.get('disposition_level')
-        user.digestive_issues = data.get('digestive_issues')
-        user.bloating_frequency = data.get('bloating_frequency')
-        user.hunger_satiety_pattern = data.get('hunger_satiety_pattern')
-        
-        # Objetivos
-        user.monthly_weight_goal = data.get('monthly_weight_goal')
-        user.total_timeframe = data.get('total_timeframe')
-        user.main_motivation = data.get('main_motivation')
-        user.previous_diet_experience = data.get('previous_diet_experience')
-        
-        # Campos específicos do nutricionista
-        if user.user_type == 'nutritionist':
-            user.crn_number = data.get('crn_number')
-            user.specialization = data.get('specialization')
-        
         db.session.add(user)
         db.session.commit()
         
         # Cria token de acesso
-        access_token = create_access_token(
-            identity=user.id,
-            expires_delta=timedelta(days=30)
-        )
+        access_token = create_user_token(user)
         
         return jsonify({
             'message': 'Usuário registrado com sucesso',
@@ -106,6 +44,9 @@ def register():
             'user': user.to_dict()
         }), 201
         
+    except PasswordHasherBusy as e:
+        db.session.rollback()
+        return _busy_response(e)
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
@@ -124,11 +65,16 @@ def login():
         if not user or not user.check_password(data['password']):
             return jsonify({'error': 'Email ou senha inválidos'}), 401
         
+        # Regrava o hash se PASSWORD_HASH_METHOD mudou desde o cadastro (aumenta ou reduz o custo)
+        if password_hasher.needs_rehash(user.password_hash):
+            try:
+                user.set_password(data['password'])
+                db.session.commit()
+            except PasswordHasherBusy:
+                db.session.rollback()  # fica para o próximo login
+        
         # Cria token de acesso
-        access_token = create_access_token(
-            identity=user.id,
-            expires_delta=timedelta(days=30)
-        )
+        access_token = create_user_token(user)
         
         return jsonify({
             'message': 'Login realizado com sucesso',
@@ -136,6 +82,9 @@ def login():
             'user': user.to_dict()
         }), 200
         
+    except PasswordHasherBusy as e:
+        db.session.rollback()
+        return _busy_response(e)
     except Exception as e:
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
@@ -144,8 +93,8 @@ def login():
 def get_profile():
     """Obtém perfil do usuário logado"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        principal = current_principal()
+        user = principal.user if principal else None
         
         if not user:
             return jsonify({'error': 'Usuário não encontrado'}), 404
@@ -162,8 +111,8 @@ def get_profile():
 def update_profile():
     """Atualiza perfil do usuário com dados científicos"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        principal = current_principal()
+        user = principal.user if principal else None
         
         if not user:
             return jsonify({'error': 'Usuário não encontrado'}), 404
@@ -211,6 +160,7 @@ def update_profile():
                 user.specialization = data['specialization']
         
         db.session.commit()
+        invalidate_identity(user.id)
         
         return jsonify({
             'message': 'Perfil atualizado com sucesso',
@@ -226,8 +176,8 @@ def update_profile():
 def validate_token():
     """Valida se o token JWT ainda é válido"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        principal = current_principal()
+        user = principal.user if principal else None
         
         if not user:
             return jsonify({'error': 'Token inválido'}), 401
@@ -240,3 +190,46 @@ def validate_token():
     except Exception as e:
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
+@auth_bp.route('/import', methods=['POST'])
+@jwt_required()
+def import_patients():
+    """
+    Importa pacientes em lote (apenas nutricionistas): arquivo CSV ou JSONL no campo
+    "file" (multipart) ou no corpo da requisição, com os mesmos campos do register.
+    O arquivo é lido em fluxo e gravado em lotes; o resultado traz os erros por linha.
+    """
+    try:
+        principal = current_principal()
+        
+        if not principal:
+            return jsonify({'error': 'Usuário não encontrado'}), 404
+        
+        if principal.user_type != 'nutritionist':
+            return jsonify({'error': 'Apenas nutricionistas podem importar pacientes'}), 403
+        
+        upload = request.files.get('file')
+        if upload is not None:
+            stream, fmt = upload.stream, detect_format(upload.filename, upload.mimetype)
+        else:
+            stream, fmt = request.stream, detect_format(None, request.mimetype)
+        fmt = request.args.get('format') or fmt
+        if fmt not in FORMATS:
+            return jsonify({'error': 'Formato não suportado: envie CSV ou JSONL (ou use ?format=csv|jsonl)'}), 400
+        
+        batch_size = min(max(int(request.args.get('batch_size', 200)), 1), 1000)
+        dry_run = request.args.get('dry_run', 'false').lower() == 'true'
+        
+        # Só contas de paciente: nutricionistas não criam outros nutricionistas
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+        result = import_users(iter_rows(text, fmt), batch_size=batch_size,
+                              allowed_types=('user',), dry_run=dry_run, max_errors=500)
+        
+        verb = 'válidos' if dry_run else 'importados'
+        return jsonify({
+            'message': f'{result.imported} pacientes {verb}, {result.failed} linhas com erro',
+            **result.to_dict()
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
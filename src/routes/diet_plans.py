@@ -1,68 +1,152 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from src.models.nutriai_models import db, User, DietPlan
-from src.services.gemini_service import GeminiService
+from flask import Blueprint, Response, request, jsonify, url_for, stream_with_context
+from flask_jwt_extended import jwt_required
+from src.models.nutriai_models import db, User, DietPlan, PlanGenerationJob, NutritionistStats
+from src.services.gemini_service import get_gemini_service
+from src.services.identity import current_principal
+from src.services.plan_jobs import plan_job_queue, build_user_data
+from src.services.pagination import keyset_page, parse_fields, parse_page_size
+from src.services import plan_export
+from src.services.plan_stats import (
+    TOTAL_PLANS, PENDING_PLANS, get_counters, record_plan_created, record_validation
+)
 from datetime import datetime
+import json
 
 diet_plans_bp = Blueprint('diet_plans', __name__)
 
+def _check_can_generate(user):
+    """Valida se o usuário pode gerar planos; retorna a resposta de erro ou None"""
+    if not user:
+        return jsonify({'error': 'Usuário não encontrado'}), 404
+    
+    if user.user_type != 'user':
+        return jsonify({'error': 'Apenas usuários podem gerar planos'}), 403
+    
+    # Verifica se dados básicos estão completos
+    if not user.weight or not user.height or not user.age or not user.goal:
+        return jsonify({
+            'error': 'Dados básicos incompletos',
+            'required': ['weight', 'height', 'age', 'goal'],
+            'message': 'Complete seu perfil para gerar planos personalizados'
+        }), 400
+    
+    return None
+
+def _sse(event, data):
+    """Formata um evento Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
 @diet_plans_bp.route('/generate', methods=['POST'])
 @jwt_required()
 def generate_diet_plan():
     """Gera plano alimentar científico personalizado"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        # Só as colunas validadas em _check_can_generate
+        principal = current_principal()
+        user = principal.load(*User.METABOLIC_FIELDS) if principal else None
         
-        if not user:
-            return jsonify({'error': 'Usuário não encontrado'}), 404
+        error = _check_can_generate(user)
+        if error:
+            return error
         
-        if user.user_type != 'user':
-            return jsonify({'error': 'Apenas usuários podem gerar planos'}), 403
+        # force_fresh ignora o cache e pede um plano novo à IA
+        data = request.get_json(silent=True) or {}
         
-        # Verifica se dados básicos estão completos
-        if not user.weight or not user.height or not user.age or not user.goal:
-            return jsonify({
-                'error': 'Dados básicos incompletos',
-                'required': ['weight', 'height', 'age', 'goal'],
-                'message': 'Complete seu perfil para gerar planos personalizados'
-            }), 400
+        # Enfileira a geração; o worker chama o Gemini e grava o DietPlan
+        job = plan_job_queue.enqueue(user.id, force_fresh=bool(data.get('force_fresh')))
         
-        # Prepara dados científicos para a IA
-        user_data = user.to_dict()
+        response = jsonify({
+            'message': 'Geração do plano iniciada',
+            'job': job.to_dict(),
+            'status_url': url_for('diet_plans.get_generation_job', job_id=job.id)
+        })
+        response.headers['Location'] = url_for('diet_plans.get_generation_job', job_id=job.id)
+        return response, 202
         
-        # Inicializa serviço Gemini
-        gemini_service = GeminiService()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+@diet_plans_bp.route('/generate/stream', methods=['POST'])
+@jwt_required()
+def stream_diet_plan():
+    """Gera plano alimentar enviando cada refeição via SSE assim que fica pronta"""
+    try:
+        # O prompt usa o perfil completo
+        principal = current_principal()
+        user = principal.user if principal else None
         
-        # Gera plano com IA
-        ai_plan = gemini_service.generate_scientific_diet_plan(user_data)
+        error = _check_can_generate(user)
+        if error:
+            return error
         
-        # Cria registro do plano no banco
-        diet_plan = DietPlan(
-            user_id=user.id,
-            goal=user.goal,
-            budget_per_meal=user.budget_per_meal or 25.0,
-            dietary_restrictions=user.dietary_restrictions
-        )
-        diet_plan.set_ai_plan(ai_plan)
+        data = request.get_json(silent=True) or {}
+        force_fresh = bool(data.get('force_fresh'))
+        user_data = build_user_data(user)
+        gemini_service = get_gemini_service()
         
-        db.session.add(diet_plan)
-        db.session.commit()
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+    
+    def events():
+        yield _sse('start', {'gemini_configured': gemini_service.is_configured()})
+        
+        try:
+            ai_plan = {}
+            for section, value in gemini_service.stream_scientific_diet_plan(user_data, force_fresh=force_fresh):
+                ai_plan[section] = value
+                yield _sse('section', {'section': section, 'data': value})
+            
+            # Stream concluído: grava o plano completo
+            diet_plan = DietPlan(user_id=user.id)
+            diet_plan.set_ai_plan(ai_plan)
+            db.session.add(diet_plan)
+            db.session.flush()
+            record_plan_created(diet_plan)
+            db.session.commit()
+            
+            yield _sse('complete', {
+                'message': 'Plano alimentar gerado com sucesso',
+                'plan': diet_plan.to_dict()
+            })
+            
+        except Exception as e:
+            db.session.rollback()
+            yield _sse('error', {'error': f'Erro interno: {str(e)}'})
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@diet_plans_bp.route('/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_generation_job(job_id):
+    """Consulta o status de um job de geração de plano"""
+    try:
+        principal = current_principal()
         
-        return jsonify({
-            'message': 'Plano alimentar gerado com sucesso',
-            'plan': diet_plan.to_dict(),
-            'gemini_configured': gemini_service.is_configured(),
-            'scientific_analysis': {
+        job = PlanGenerationJob.query.get(job_id)
+        if not job or not principal or job.user_id != principal.id:
+            return jsonify({'error': 'Job não encontrado'}), 404
+        
+        plan_job_queue.ensure_scheduled(job)
+        
+        result = {'job': job.to_dict()}
+        
+        if job.status == 'completed':
+            user = principal.load(*User.METABOLIC_FIELDS)
+            result['plan'] = DietPlan.query.options(*DietPlan.plan_options()).get(job.diet_plan_id).to_dict()
+            result['scientific_analysis'] = {
                 'bmr': user.calculate_bmr(),
                 'tdee': user.calculate_tdee(),
                 'target_calories': user.calculate_target_calories(),
                 'macros': user.calculate_macros()
             }
-        }), 201
+        
+        return jsonify(result), 200
         
     except Exception as e:
-        db.session.rollback()
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
 @diet_plans_bp.route('/my-plans', methods=['GET'])
@@ -70,18 +154,23 @@ def generate_diet_plan():
 def get_my_plans():
     """Obtém histórico de planos do usuário"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        principal = current_principal()
+        user = principal.load(*User.METABOLIC_FIELDS) if principal else None
         
         if not user:
             return jsonify({'error': 'Usuário não encontrado'}), 404
         
-        # Busca planos do usuário
-        plans = DietPlan.query.filter_by(user_id=user.id).order_by(DietPlan.created_at.desc()).all()
+        fields = parse_fields(request.args.get('fields'), DietPlan.SERIALIZABLE_FIELDS)
+        page_size = parse_page_size(request.args.get('limit'))
+        
+        # Busca uma página dos planos do usuário
+        query = DietPlan.query.filter_by(user_id=user.id).options(*DietPlan.load_options(fields))
+        plans, next_cursor = keyset_page(query, DietPlan, request.args.get('cursor'), page_size)
         
         return jsonify({
-            'plans': [plan.to_dict() for plan in plans],
-            'total': len(plans),
+            'plans': [plan.to_dict(fields) for plan in plans],
+            'count': len(plans),
+            'next_cursor': next_cursor,
             'user_profile': {
                 'bmr': user.calculate_bmr(),
                 'tdee': user.calculate_tdee(),
@@ -90,6 +179,8 @@ def get_my_plans():
             }
         }), 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
@@ -98,8 +189,7 @@ def get_my_plans():
 def get_pending_plans():
     """Obtém planos pendentes de validação (para nutricionistas)"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = current_principal()  # id e user_type, sem carregar a linha de users
         
         if not user:
             return jsonify({'error': 'Usuário não encontrado'}), 404
@@ -107,19 +197,27 @@ def get_pending_plans():
         if user.user_type != 'nutritionist':
             return jsonify({'error': 'Apenas nutricionistas podem acessar planos pendentes'}), 403
         
-        # Busca planos pendentes
-        pending_plans = DietPlan.query.filter_by(status='pending').order_by(DietPlan.created_at.desc()).all()
+        fields = parse_fields(request.args.get('fields'), DietPlan.SERIALIZABLE_FIELDS)
+        page_size = parse_page_size(request.args.get('limit'))
+        
+        # Busca uma página dos planos pendentes
+        query = DietPlan.query.filter_by(status='pending').options(*DietPlan.load_options(fields))
+        pending_plans, next_cursor = keyset_page(query, DietPlan, request.args.get('cursor'), page_size)
+        stats = NutritionistStats.query.get(user.id)
         
         return jsonify({
-            'pending_plans': [plan.to_dict() for plan in pending_plans],
-            'total': len(pending_plans),
+            'pending_plans': [plan.to_dict(fields) for plan in pending_plans],
+            'count': len(pending_plans),
+            'next_cursor': next_cursor,
             'nutritionist_stats': {
-                'total_validated': DietPlan.query.filter_by(nutritionist_id=user.id).count(),
-                'approved': DietPlan.query.filter_by(nutritionist_id=user.id, status='approved').count(),
-                'rejected': DietPlan.query.filter_by(nutritionist_id=user.id, status='rejected').count()
+                'total_validated': stats.validations if stats else 0,
+                'approved': stats.approvals if stats else 0,
+                'rejected': stats.rejections if stats else 0
             }
         }), 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
@@ -128,8 +226,7 @@ def get_pending_plans():
 def validate_plan(plan_id):
     """Valida plano alimentar (nutricionista)"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = current_principal()
         
         if not user:
             return jsonify({'error': 'Usuário não encontrado'}), 404
@@ -137,10 +234,6 @@ def validate_plan(plan_id):
         if user.user_type != 'nutritionist':
             return jsonify({'error': 'Apenas nutricionistas podem validar planos'}), 403
         
-        plan = DietPlan.query.get(plan_id)
-        if not plan:
-            return jsonify({'error': 'Plano não encontrado'}), 404
-        
         data = request.get_json()
         action = data.get('action')  # 'approve' ou 'reject'
         feedback = data.get('feedback', '')
@@ -148,12 +241,23 @@ def validate_plan(plan_id):
         if action not in ['approve', 'reject']:
             return jsonify({'error': 'Ação deve ser "approve" ou "reject"'}), 400
         
+        # Linha travada até o commit: validações simultâneas do mesmo plano são serializadas
+        # e a segunda enxerga o status gravado pela primeira (contadores não divergem)
+        plan = DietPlan.query.with_for_update().populate_existing().filter_by(id=plan_id).first()
+        if not plan:
+            return jsonify({'error': 'Plano não encontrado'}), 404
+        
+        previous_status, previous_nutritionist_id = plan.status, plan.nutritionist_id
+        
         # Atualiza plano
         plan.status = 'approved' if action == 'approve' else 'rejected'
         plan.nutritionist_id = user.id
         plan.nutritionist_feedback = feedback
         plan.validated_at = datetime.utcnow()
         
+        # Estatísticas atualizadas na mesma transação
+        record_validation(plan, previous_status, previous_nutritionist_id)
+        
         db.session.commit()
         
         return jsonify({
@@ -170,13 +274,12 @@ def validate_plan(plan_id):
 def get_plan_details(plan_id):
     """Obtém detalhes de um plano específico"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = current_principal()
         
         if not user:
             return jsonify({'error': 'Usuário não encontrado'}), 404
         
-        plan = DietPlan.query.get(plan_id)
+        plan = DietPlan.query.options(*DietPlan.plan_options()).get(plan_id)
         if not plan:
             return jsonify({'error': 'Plano não encontrado'}), 404
         
@@ -187,7 +290,7 @@ def get_plan_details(plan_id):
         # Nutricionistas podem ver qualquer plano
         if user.user_type == 'nutritionist':
             # Inclui dados científicos do usuário para análise
-            plan_user = User.query.get(plan.user_id)
+            plan_user = User.query.options(db.joinedload(User.profile)).get(plan.user_id)
             plan_dict = plan.to_dict()
             plan_dict['user_scientific_data'] = {
                 'bmr': plan_user.calculate_bmr(),
@@ -219,50 +322,171 @@ def get_plan_details(plan_id):
     except Exception as e:
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
+def _int_arg(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f'{name} deve ser um número inteiro')
+
+@diet_plans_bp.route('/export', methods=['GET'])
+@jwt_required()
+def export_plans():
+    """
+    Exporta planos com totais por refeição e métricas do paciente em NDJSON ou CSV (nutricionista).
+    As linhas são lidas com cursor no servidor e enviadas em fluxo; gzip=true comprime o arquivo.
+    """
+    try:
+        user = current_principal()
+        
+        if not user:
+            return jsonify({'error': 'Usuário não encontrado'}), 404
+        
+        if user.user_type != 'nutritionist':
+            return jsonify({'error': 'Apenas nutricionistas podem exportar planos'}), 403
+        
+        fmt = request.args.get('format', 'ndjson')
+        if fmt not in plan_export.FORMATS:
+            return jsonify({'error': f"format deve ser um de: {', '.join(plan_export.FORMATS)}"}), 400
+        
+        # nutritionist_id=me: planos validados pelo próprio nutricionista
+        nutritionist_id = user.id if request.args.get('nutritionist_id') == 'me' else _int_arg('nutritionist_id')
+        query = plan_export.build_query(
+            status=request.args.get('status') or None,
+            nutritionist_id=nutritionist_id,
+            user_id=_int_arg('user_id'),
+            date_from=plan_export.parse_date(request.args.get('from')),
+            date_to=plan_export.parse_date(request.args.get('to'), end=True)
+        )
+        compress = request.args.get('gzip', 'false').lower() == 'true'
+        include_plan = request.args.get('include_plan', 'false').lower() == 'true'
+        
+        chunks = plan_export.export_plans(query, fmt, compress=compress, include_plan=include_plan)
+        filename = f"planos-{datetime.utcnow():%Y%m%d-%H%M%S}.{fmt}" + ('.gz' if compress else '')
+        mimetype = 'application/gzip' if compress else (
+            'application/x-ndjson' if fmt == 'ndjson' else 'text/csv; charset=utf-8'
+        )
+        
+        return Response(stream_with_context(chunks), mimetype=mimetype, headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'X-Accel-Buffering': 'no'
+        })
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
 @diet_plans_bp.route('/nutritionist-dashboard', methods=['GET'])
 @jwt_required()
 def nutritionist_dashboard():
     """Dashboard do nutricionista com estatísticas"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        principal = current_principal()
         
-        if not user:
+        if not principal:
             return jsonify({'error': 'Usuário não encontrado'}), 404
         
-        if user.user_type != 'nutritionist':
+        if principal.user_type != 'nutritionist':
             return jsonify({'error': 'Apenas nutricionistas podem acessar este dashboard'}), 403
         
-        # Estatísticas gerais
-        total_plans = DietPlan.query.count()
-        pending_plans = DietPlan.query.filter_by(status='pending').count()
-        my_validations = DietPlan.query.filter_by(nutritionist_id=user.id).count()
-        my_approvals = DietPlan.query.filter_by(nutritionist_id=user.id, status='approved').count()
-        my_rejections = DietPlan.query.filter_by(nutritionist_id=user.id, status='rejected').count()
+        # Estatísticas mantidas incrementalmente (leituras por chave primária)
+        counters = get_counters()
+        stats = NutritionistStats.query.get(principal.id) or NutritionistStats(
+            validations=0, approvals=0, rejections=0, unique_patients=0
+        )
         
         # Taxa de aprovação
-        approval_rate = (my_approvals / my_validations * 100) if my_validations > 0 else 0
+        approval_rate = (stats.approvals / stats.validations * 100) if stats.validations > 0 else 0
         
         # Planos recentes pendentes
-        recent_pending = DietPlan.query.filter_by(status='pending').order_by(DietPlan.created_at.desc()).limit(5).all()
-        
-        # Usuários únicos atendidos
-        unique_users = db.session.query(DietPlan.user_id).filter_by(nutritionist_id=user.id).distinct().count()
+        recent_pending = DietPlan.query.filter_by(status='pending').options(
+            *DietPlan.load_options(DietPlan.SUMMARY_FIELDS)
+        ).order_by(DietPlan.created_at.desc()).limit(5).all()
         
         return jsonify({
             'dashboard': {
-                'total_plans_system': total_plans,
-                'pending_validation': pending_plans,
-                'my_validations': my_validations,
-                'my_approvals': my_approvals,
-                'my_rejections': my_rejections,
+                'total_plans_system': counters[TOTAL_PLANS],
+                'pending_validation': counters[PENDING_PLANS],
+                'my_validations': stats.validations,
+                'my_approvals': stats.approvals,
+                'my_rejections': stats.rejections,
                 'approval_rate': round(approval_rate, 1),
-                'unique_patients': unique_users
+                'unique_patients': stats.unique_patients
             },
-            'recent_pending': [plan.to_dict() for plan in recent_pending],
-            'nutritionist': user.to_dict()
+            'recent_pending': [plan.to_dict(DietPlan.SUMMARY_FIELDS) for plan in recent_pending],
+            'nutritionist': principal.user.to_dict()
         }), 200
         
     except Exception as e:
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
+
+
+@diet_plans_bp.route('/cohort-metrics', methods=['GET'])
+@jwt_required()
+def cohort_metrics():
+    """Métricas metabólicas de todos os pacientes calculadas em lote (nutricionista)"""
+    try:
+        from src.services import metabolic_engine
+        
+        user = current_principal()
+        
+        if not user:
+            return jsonify({'error': 'Usuário não encontrado'}), 404
+        
+        if user.user_type != 'nutritionist':
+            return jsonify({'error': 'Apenas nutricionistas podem acessar métricas da coorte'}), 403
+        
+        # Carrega apenas as colunas usadas no cálculo
+        query = db.session.query(
+            User.id, User.name, User.weight, User.height, User.age, User.exercise_frequency, User.goal
+        ).filter(User.user_type == 'user').order_by(User.id)
+        
+        if request.args.get('ids'):
+            ids = [int(i) for i in request.args['ids'].split(',') if i.strip()]
+            query = query.filter(User.id.in_(ids))
+        
+        rows = query.all()
+        columns = list(zip(*rows)) if rows else [()] * 7
+        ids, names, weights, heights, ages, frequencies, goals = columns
+        
+        metrics = metabolic_engine.compute_batch(weights, heights, ages, frequencies, goals)
+        
+        result = {
+            'total_patients': len(rows),
+            'complete_profiles': metabolic_engine.count_complete(metrics['bmr']),
+            'summary': {
+                'bmr': metabolic_engine.summarize(metrics['bmr']),
+                'tdee': metabolic_engine.summarize(metrics['tdee']),
+                'target_calories': metabolic_engine.summarize(metrics['calories'])
+            }
+        }
+        
+        if request.args.get('summary_only', 'false').lower() != 'true':
+            bmr, tdee, calories, protein, carb, fat = (
+                metabolic_engine.to_list(metrics[key])
+                for key in ('bmr', 'tdee', 'calories', 'protein_g', 'carb_g', 'fat_g')
+            )
+            result['patients'] = [
+                {
+                    'id': ids[i],
+                    'name': names[i],
+                    'bmr': bmr[i],
+                    'tdee': tdee[i],
+                    'target_calories': calories[i],
+                    'macros': None if calories[i] is None else {
+                        'protein_g': protein[i], 'carb_g': carb[i], 'fat_g': fat[i]
+                    }
+                }
+                for i in range(len(rows))
+            ]
+        
+        return jsonify(result), 200
+        
+    except ValueError:
+        return jsonify({'error': 'Parâmetro ids inválido'}), 400
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
@@ -0,0 +1,103 @@
+"""Preparação do banco: migrações e usuários de exemplo (fora do caminho das requisições)"""
+from src.models.nutriai_models import db, User
+
+EXAMPLE_EMAILS = ('ana@email.com', 'maria@nutricionista.com', 'carlos@email.com')
+
+
+def seed_example_users() -> int:
+    """Cria os usuários de exemplo que ainda não existem; retorna quantos foram criados"""
+    existing = {email for (email,) in db.session.query(User.email).filter(User.email.in_(EXAMPLE_EMAILS))}
+    
+    # Usuário exemplo com dados científicos CORRIGIDOS
+    if 'ana@email.com' not in existing:
+        user = User(
+            email='ana@email.com',
+            name='Ana Silva',
+            user_type='user',
+            age=28,
+            weight=65.5,
+            height=165.0,
+            goal='perder_peso',
+            budget_per_meal=25.0,
+            dietary_restrictions='Sem lactose',
+            waist_circumference=78.0,
+            weight_6_months_ago=70.0,
+            target_weight=60.0,
+            weight_variation_pattern='engorda_facil',
+            meal_times='{"cafe": "07:00", "almoco": "12:00", "jantar": "19:00"}',
+            eating_speed='normal',
+            snacking_frequency='raramente',
+            daily_water_intake=8,
+            alcohol_consumption='social',
+            food_dislikes='Brócolis, fígado',
+            sleep_hours=7.5,
+            sleep_quality='regular',
+            stress_level=7,
+            work_routine='sedentario',
+            work_schedule='comercial',
+            family_diabetes=True,
+            family_hypertension=True,
+            family_obesity=False,
+            family_heart_disease=False,
+            current_exercise='Caminhada',
+            exercise_frequency='leve',  # ✅ CORRIGIDO: String em vez de Integer
+            exercise_duration=30,
+            exercise_intensity='leve',
+            energy_level=6,
+            disposition_level=7,
+            bloating_frequency='frequentemente',
+            hunger_satiety_pattern='muita_fome',
+            monthly_weight_goal=2.0,
+            total_timeframe=6,
+            main_motivation='Melhorar saúde e autoestima',
+            previous_diet_experience='Já tentei várias dietas mas sempre desisto'
+        )
+        user.set_password('123456')
+        db.session.add(user)
+    
+    # Nutricionista exemplo
+    if 'maria@nutricionista.com' not in existing:
+        nutritionist = User(
+            email='maria@nutricionista.com',
+            name='Dr. Maria Oliveira',
+            user_type='nutritionist',
+            crn_number='CRN-3 12345',
+            specialization='Nutrição Clínica e Esportiva'
+        )
+        nutritionist.set_password('123456')
+        db.session.add(nutritionist)
+    
+    # Segundo usuário exemplo
+    if 'carlos@email.com' not in existing:
+        user2 = User(
+            email='carlos@email.com',
+            name='Carlos Santos',
+            user_type='user',
+            age=35,
+            weight=85.0,
+            height=178.0,
+            goal='ganhar_massa',
+            budget_per_meal=30.0,
+            dietary_restrictions='Nenhuma',
+            exercise_frequency='moderado',  # ✅ CORRIGIDO: String em vez de Integer
+            stress_level=5,
+            energy_level=8,
+            family_diabetes=False,
+            family_hypertension=False
+        )
+        user2.set_password('123456')
+        db.session.add(user2)
+    
+    created = sum(isinstance(obj, User) for obj in db.session.new)
+    db.session.commit()
+    return created
+
+
+def init_database(seed: bool = True):
+    """Aplica as migrações pendentes e, opcionalmente, cria os usuários de exemplo"""
+    from src.migrations import runner
+    
+    applied = runner.upgrade(db.engine)
+    created = seed_example_users() if seed else 0
+    print("✅ Banco de dados inicializado com sucesso")
+    return applied, created
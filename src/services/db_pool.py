@@ -0,0 +1,175 @@
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool, QueuePool
+
+# serverless: conexão por requisição (NullPool) atrás de um pooler externo (endpoint -pooler do Neon / PgBouncer)
+# pooled:     processos de longa duração (Gunicorn), QueuePool com pre-ping e recycle
+# sqlite:     fallback local com WAL e busy_timeout
+PROFILES = ('serverless', 'pooled', 'sqlite')
+
+
+class PoolMetrics:
+    """Contadores de checkout/espera do pool, para enxergar esgotamento de conexões"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.checkins = 0
+            self.connects = 0
+            self.invalidations = 0
+            self.timeouts = 0
+            self.waits = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+            self.slow_waits = 0
+
+    def record_wait(self, seconds: float, slow_threshold: float):
+        with self._lock:
+            self.waits += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            if seconds >= slow_threshold:
+                self.slow_waits += 1
+
+    def increment(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'connects': self.connects,
+                'invalidations': self.invalidations,
+                'timeouts': self.timeouts,
+                'wait_avg_ms': round(self.wait_total / self.waits * 1000, 3) if self.waits else 0.0,
+                'wait_max_ms': round(self.wait_max * 1000, 3),
+                'slow_waits': self.slow_waits
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool que mede o tempo de espera por uma conexão livre (inclui abrir uma nova)"""
+
+    slow_wait_threshold = 0.1
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.increment('timeouts')
+            raise
+        finally:
+            pool_metrics.record_wait(time.perf_counter() - started, self.slow_wait_threshold)
+
+
+def resolve_profile(database_url: str) -> str:
+    """DB_POOL_PROFILE explícito ou, em 'auto', deduzido da URL e do ambiente"""
+    profile = os.getenv('DB_POOL_PROFILE', 'auto').lower()
+    if profile == 'auto':
+        if database_url.startswith('sqlite'):
+            return 'sqlite'
+        return 'serverless' if os.getenv('VERCEL') or os.getenv('AWS_LAMBDA_FUNCTION_NAME') else 'pooled'
+    if profile not in PROFILES:
+        raise ValueError(f'DB_POOL_PROFILE inválido: {profile}')
+    return profile
+
+
+def _connect_args(database_url: str) -> Dict[str, Any]:
+    """connect_timeout é parâmetro do libpq: só vale para URLs do Postgres"""
+    if make_url(database_url).get_backend_name() != 'postgresql':
+        return {}
+    return {'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', '5'))}
+
+
+def engine_options(database_url: str, profile: str) -> Dict[str, Any]:
+    """SQLALCHEMY_ENGINE_OPTIONS para o perfil"""
+    if profile == 'serverless':
+        return {'poolclass': NullPool, 'connect_args': _connect_args(database_url)}
+
+    InstrumentedQueuePool.slow_wait_threshold = float(os.getenv('DB_POOL_SLOW_WAIT', '0.1'))
+    options = {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': int(os.getenv('DB_POOL_SIZE', '5')),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '10')),
+        'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', '30'))
+    }
+
+    if profile == 'pooled':
+        options.update({
+            'pool_pre_ping': True,
+            # Abaixo do timeout de inatividade do Neon/proxies, que derrubam conexões ociosas
+            'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '300')),
+            # LIFO reutiliza as conexões mais recentes e deixa as ociosas expirarem
+            'pool_use_lifo': True,
+            'connect_args': _connect_args(database_url)
+        })
+    elif ':memory:' in database_url or database_url.rstrip('/') == 'sqlite:':
+        # Banco em memória precisa de uma única conexão compartilhada: mantém o padrão do SQLAlchemy
+        return {}
+
+    return options
+
+
+def _configure_sqlite(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute(f"PRAGMA busy_timeout={int(os.getenv('SQLITE_BUSY_TIMEOUT', '5000'))}")
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.close()
+
+
+def configure_app(app, database_url: str):
+    """Define SQLALCHEMY_ENGINE_OPTIONS pelo perfil; chamar antes de db.init_app"""
+    profile = resolve_profile(database_url)
+    app.config['DB_POOL_PROFILE'] = profile
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        **engine_options(database_url, profile),
+        **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+    }
+
+
+def init_app(app, db):
+    """Registra os eventos do pool no engine criado pelo Flask-SQLAlchemy"""
+    with app.app_context():
+        engine = db.engine
+
+    if engine.dialect.name == 'sqlite':
+        event.listen(engine, 'connect', _configure_sqlite)
+
+    for name, counter in (('connect', 'connects'), ('checkout', 'checkouts'),
+                          ('checkin', 'checkins'), ('invalidate', 'invalidations')):
+        event.listen(engine, name, lambda *args, counter=counter: pool_metrics.increment(counter))
+
+
+def pool_status(engine, profile: Optional[str] = None) -> Dict[str, Any]:
+    """Métricas acumuladas mais o estado atual do pool"""
+    pool = engine.pool
+    status: Dict[str, Any] = {
+        'profile': profile,
+        'pool_class': type(pool).__name__,
+        **pool_metrics.snapshot()
+    }
+    if isinstance(pool, QueuePool):
+        status.update({
+            'size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'overflow': max(pool.overflow(), 0),
+            'max_overflow': pool._max_overflow,
+            'idle': pool.checkedin()
+        })
+    return status
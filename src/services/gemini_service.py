@@ -1,182 +1,269 @@
 import os
-import json
-import google.generativeai as genai
-from typing import Dict, Any, Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterator, Optional, Tuple
+from src.services.plan_cache import plan_cache, fingerprint
+from src.services.json_stream import IncrementalSectionParser
+from src.services.metrics import metrics
+from src.services.plan_repair import REQUIRED_SECTIONS, RepairReport, derive_totals, salvage_plan, validate_plan
+from src.services.prompt_builder import BuiltPrompt, PromptBuilder, prompt_stats
+from src.services.resilience import (
+    CircuitBreaker, CircuitOpenError, call_with_retry, call_with_timeout, is_transient_error,
+    iter_with_timeout
+)
 
 class GeminiService:
     def __init__(self):
         self.api_key = os.getenv('GEMINI_API_KEY')
-        if self.api_key and self.api_key != 'your_gemini_api_key_here':
-            genai.configure(api_key=self.api_key)
-            self.model = genai.GenerativeModel('gemini-pro')
-            self.configured = True
-        else:
-            self.configured = False
+        
+        # Prazos e política de retry (segundos)
+        self.timeout = float(os.getenv('GEMINI_TIMEOUT', '25'))  # por tentativa
+        self.deadline = float(os.getenv('GEMINI_DEADLINE', '45'))  # total, incluindo retries
+        self.max_retries = int(os.getenv('GEMINI_MAX_RETRIES', '2'))
+        self.backoff_base = float(os.getenv('GEMINI_BACKOFF_BASE', '0.5'))
+        self.backoff_max = float(os.getenv('GEMINI_BACKOFF_MAX', '8'))
+        
+        self.breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv('GEMINI_BREAKER_THRESHOLD', '5')),
+            reset_timeout=float(os.getenv('GEMINI_BREAKER_RESET', '30'))
+        )
+        
+        # Threads que executam as chamadas para que o prazo possa ser imposto
+        self._call_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('GEMINI_MAX_CONCURRENCY', '8')),
+            thread_name_prefix='gemini-call'
+        )
+        
+        # O SDK (~0,7 s de import) só é carregado na primeira chamada real ao Gemini
+        self._model = None
+        self._model_lock = threading.Lock()
+        self.configured = bool(self.api_key and self.api_key != 'your_gemini_api_key_here')
+        
+        # Template do prompt e formato da resposta (GEMINI_PROMPT_TEMPLATE / GEMINI_PROMPT_TOKEN_BUDGET)
+        self.prompt_builder = PromptBuilder()
+        # Pede saída application/json quando o SDK instalado suporta
+        self.json_mode = os.getenv('GEMINI_JSON_MODE', 'true').lower() != 'false'
     
-    def generate_scientific_diet_plan(self, user_data: Dict[str, Any]) -> Dict[str, Any]:
+    @property
+    def model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    import google.generativeai as genai
+
+                    endpoint = os.getenv('GEMINI_API_ENDPOINT')
+                    if endpoint:
+                        # Servidor compatível (ex.: benchmarks/gemini_standin.py); só o transporte REST aceita http://
+                        genai.configure(api_key=self.api_key, transport='rest',
+                                        client_options={'api_endpoint': endpoint})
+                    else:
+                        genai.configure(api_key=self.api_key)
+                    self._model = genai.GenerativeModel('gemini-pro')
+        return self._model
+    
+    @model.setter
+    def model(self, model):
+        self._model = model
+    
+    def generate_scientific_diet_plan(self, user_data: Dict[str, Any], force_fresh: bool = False) -> Dict[str, Any]:
         """
-        Gera plano alimentar científico baseado em dados completos do usuário
+        Gera plano alimentar científico baseado em dados completos do usuário.
+        Perfis equivalentes reutilizam o plano em cache, exceto com force_fresh=True.
+        Com o circuito aberto, retorna o plano de fallback sem chamar o Gemini.
         """
         if not self.configured:
+            metrics.gemini_fallback('not_configured')
             return self._generate_fallback_plan(user_data)
         
+        cache_key = fingerprint(user_data, self.prompt_builder.variant)
+        if not force_fresh:
+            cached_plan = plan_cache.get(cache_key)
+            if cached_plan is not None:
+                return cached_plan
+        
         try:
-            prompt = self._build_scientific_prompt(user_data)
-            response = self.model.generate_content(prompt)
+            prompt = self._build_prompt(user_data)
+            response_text = self._generate_text(prompt)
             
-            # Tenta parsear a resposta como JSON
-            try:
-                plan_data = json.loads(response.text)
-                return plan_data
-            except json.JSONDecodeError:
-                # Se não conseguir parsear, cria estrutura baseada no texto
-                return self._parse_text_response(response.text, user_data)
-                
+            # Extrai/repara o JSON (markdown, truncamento) e expande as chaves curtas do modo compacto
+            plan_data, report = salvage_plan(response_text, prompt.template)
+            if plan_data is None:
+                # Se não houver JSON, cria estrutura baseada no texto
+                metrics.gemini_fallback('unparseable')
+                return self._parse_text_response(response_text, user_data)
+            
+            plan_data = self._complete_plan(plan_data, report, user_data)
+            if not report.missing:
+                plan_cache.set(cache_key, plan_data)
+            return plan_data
+        
+        except CircuitOpenError:
+            metrics.gemini_fallback('circuit_open')
+            return self._generate_fallback_plan(user_data)
         except Exception as e:
             print(f"Erro ao gerar plano com Gemini: {e}")
+            metrics.gemini_fallback('error')
             return self._generate_fallback_plan(user_data)
     
-    def _build_scientific_prompt(self, user_data: Dict[str, Any]) -> str:
+    def stream_scientific_diet_plan(self, user_data: Dict[str, Any],
+                                    force_fresh: bool = False) -> Iterator[Tuple[str, Any]]:
         """
-        Constrói prompt científico detalhado baseado nos dados do usuário
+        Versão em streaming de generate_scientific_diet_plan: produz (seção, conteúdo)
+        assim que cada seção de primeiro nível do JSON chega completa.
+        Seções que não chegarem (erro, prazo ou JSON inválido) são completadas pelo fallback.
         """
-        # Dados básicos
-        name = user_data.get('name', 'Usuário')
-        age = user_data.get('age', 30)
-        weight = user_data.get('weight', 70)
-        height = user_data.get('height', 170)
-        goal = user_data.get('goal', 'Manter peso')
-        budget = user_data.get('budget_per_meal', 25)
-        restrictions = user_data.get('dietary_restrictions', 'Nenhuma')
+        if not self.configured:
+            metrics.gemini_fallback('not_configured')
+            yield from self._generate_fallback_plan(user_data).items()
+            return
         
-        # Dados científicos
-        bmr = user_data.get('bmr', 1500)
-        tdee = user_data.get('tdee', 2000)
-        target_calories = user_data.get('target_calories', 1800)
-        macros = user_data.get('macros', {})
+        cache_key = fingerprint(user_data, self.prompt_builder.variant)
+        if not force_fresh:
+            cached_plan = plan_cache.get(cache_key)
+            if cached_plan is not None:
+                yield from cached_plan.items()
+                return
         
-        # Dados comportamentais
-        sleep_hours = user_data.get('sleep_hours', 8)
-        stress_level = user_data.get('stress_level', 5)
-        exercise_freq = user_data.get('exercise_frequency', 0)
-        water_intake = user_data.get('daily_water_intake', 8)
+        if not self.breaker.allow():
+            metrics.gemini_fallback('circuit_open')
+            yield from self._generate_fallback_plan(user_data).items()
+            return
         
-        # Histórico familiar
-        family_conditions = []
-        if user_data.get('family_diabetes'): family_conditions.append('diabetes')
-        if user_data.get('family_hypertension'): family_conditions.append('hipertensão')
-        if user_data.get('family_obesity'): family_conditions.append('obesidade')
-        if user_data.get('family_heart_disease'): family_conditions.append('problemas cardíacos')
+        prompt = self._build_prompt(user_data)
+        generation_config = self._generation_config(prompt)
+        parser = IncrementalSectionParser()
+        plan_data = {}
+        started = time.perf_counter()
         
-        prompt = f"""
-Você é um nutricionista especialista em nutrição científica. Crie um plano alimentar personalizado baseado na análise científica completa do paciente.
-
-DADOS DO PACIENTE:
-- Nome: {name}
-- Idade: {age} anos
-- Peso: {weight} kg
-- Altura: {height} cm
-- Objetivo: {goal}
-- Orçamento por refeição: R$ {budget}
-- Restrições alimentares: {restrictions}
-
-ANÁLISE METABÓLICA:
-- TMB (Taxa Metabólica Basal): {bmr} kcal
-- TDEE (Gasto Energético Total): {tdee} kcal
-- Meta calórica diária: {target_calories} kcal
-- Distribuição de macros: {macros}
-
-ESTILO DE VIDA:
-- Horas de sono: {sleep_hours}h
-- Nível de estresse (1-10): {stress_level}
-- Exercícios por semana: {exercise_freq}
-- Consumo de água: {water_intake} copos/dia
-
-HISTÓRICO FAMILIAR:
-- Condições familiares: {', '.join(family_conditions) if family_conditions else 'Nenhuma'}
-
-INSTRUÇÕES PARA O PLANO:
-1. Respeite RIGOROSAMENTE o orçamento de R$ {budget} por refeição
-2. Use preços reais do mercado brasileiro (2025)
-3. Considere as condições familiares para prevenção
-4. Adapte às necessidades metabólicas calculadas
-5. Inclua timing nutricional adequado
-6. Considere biodisponibilidade dos nutrientes
-7. Forneça lista de compras com preços estimados
-
-FORMATO DE RESPOSTA (JSON):
-{{
-  "breakfast": {{
-    "name": "Nome da refeição",
-    "ingredients": [
-      {{"item": "Ingrediente", "quantity": "100g", "price": 2.50, "calories": 150, "protein": 10, "carbs": 15, "fat": 5}}
-    ],
-    "preparation": "Modo de preparo detalhado",
-    "total_calories": 300,
-    "total_cost": 8.50,
-    "macros": {{"protein": 20, "carbs": 35, "fat": 12}},
-    "timing": "7h00 - Otimiza metabolismo matinal"
-  }},
-  "lunch": {{
-    "name": "Nome da refeição",
-    "ingredients": [...],
-    "preparation": "Modo de preparo",
-    "total_calories": 500,
-    "total_cost": {budget},
-    "macros": {{"protein": 35, "carbs": 45, "fat": 18}},
-    "timing": "12h00 - Pico energético do dia"
-  }},
-  "dinner": {{
-    "name": "Nome da refeição",
-    "ingredients": [...],
-    "preparation": "Modo de preparo",
-    "total_calories": 400,
-    "total_cost": {budget * 0.8},
-    "macros": {{"protein": 30, "carbs": 25, "fat": 15}},
-    "timing": "19h00 - Facilita digestão noturna"
-  }},
-  "snacks": [
-    {{
-      "name": "Lanche",
-      "ingredients": [...],
-      "total_calories": 150,
-      "total_cost": 5.00,
-      "timing": "15h00 - Sustenta energia"
-    }}
-  ],
-  "daily_totals": {{
-    "total_calories": {target_calories},
-    "total_cost": {budget * 3},
-    "protein_g": {macros.get('protein_g', 100)},
-    "carbs_g": {macros.get('carbs_g', 200)},
-    "fat_g": {macros.get('fat_g', 70)},
-    "fiber_g": 25,
-    "sodium_mg": 2000
-  }},
-  "shopping_list": [
-    {{"item": "Frango (peito)", "quantity": "1kg", "estimated_price": 18.00, "where_to_buy": "Açougue local"}},
-    {{"item": "Arroz integral", "quantity": "1kg", "estimated_price": 8.50, "where_to_buy": "Supermercado"}}
-  ],
-  "nutritionist_notes": {{
-    "metabolic_analysis": "Análise baseada em TMB {bmr} e TDEE {tdee}",
-    "family_prevention": "Considerações preventivas baseadas no histórico familiar",
-    "lifestyle_adaptations": "Adaptações para estilo de vida e rotina",
-    "supplement_recommendations": "Suplementos recomendados se necessário",
-    "monitoring_tips": "Como monitorar progresso e ajustar"
-  }},
-  "scientific_rationale": {{
-    "caloric_distribution": "Justificativa da distribuição calórica",
-    "macro_rationale": "Por que essa distribuição de macronutrientes",
-    "timing_science": "Base científica do timing nutricional",
-    "ingredient_selection": "Critérios científicos para seleção de ingredientes"
-  }}
-}}
-
-Gere um plano completo, científico e dentro do orçamento especificado.
-"""
+        failed = False
+        try:
+            with metrics.gemini_call('stream') as call:
+                chunks = iter_with_timeout(
+                    self._call_executor,
+                    lambda: (chunk.text for chunk in self.model.generate_content(
+                        prompt.text, stream=True, generation_config=generation_config
+                    )),
+                    idle_timeout=self.timeout,
+                    deadline=self.deadline
+                )
+                for text in chunks:
+                    call.record_tokens(prompt.text, text)
+                    for section, value in parser.feed(text):
+                        section, value = prompt.template.expand_section(section, value)
+                        plan_data[section] = value
+                        yield section, value
+            self.breaker.record_success()
+            prompt_stats.record_response(prompt.variant, time.perf_counter() - started, parser.text)
+        except GeneratorExit:
+            # Cliente desconectou: não conta como falha do Gemini
+            self.breaker.release_trial()
+            raise
+        except Exception as e:
+            failed = True
+            # Só falhas temporárias do Gemini abrem o circuito
+            if is_transient_error(e):
+                self.breaker.record_failure()
+            else:
+                self.breaker.release_trial()
+            prompt_stats.record_response(prompt.variant, time.perf_counter() - started, None)
+            print(f"Erro no streaming do Gemini: {e}")
+        
+        # Valida o que chegou; resposta truncada ou malformada é reparada a partir do texto recebido
+        if parser.done:
+            final_plan, report = validate_plan(plan_data)
+        else:
+            final_plan, report = salvage_plan(parser.text, prompt.template)
+        
+        if final_plan is None or len(report.missing) == len(REQUIRED_SECTIONS):
+            metrics.gemini_fallback('error' if failed else 'unparseable')
+            yield from self._generate_fallback_plan(user_data).items()
+            return
+        
+        final_plan = self._complete_plan(final_plan, report, user_data)
+        # Envia só as seções recuperadas, corrigidas ou completadas depois do stream
+        for section, value in final_plan.items():
+            if plan_data.get(section) != value:
+                yield section, value
+        
+        if not report.missing:
+            plan_cache.set(cache_key, final_plan)
+    
+    def _complete_plan(self, plan_data: Dict[str, Any], report: RepairReport,
+                       user_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Registra o reparo e completa as seções obrigatórias ausentes com o fallback.
+        O plano informa em salvaged_sections/fallback_sections o que não veio íntegro da IA.
+        """
+        if report.clean:
+            return plan_data
         
+        print(f"🔧 Resposta do Gemini aproveitada com reparo: {report.to_dict()}")
+        metrics.gemini_repair(report)
+        if report.salvaged:
+            plan_data['salvaged_sections'] = report.salvaged
+        if report.missing:
+            metrics.gemini_fallback('partial')
+            fallback = self._generate_fallback_plan(user_data)
+            for section in report.missing:
+                plan_data[section] = fallback[section]
+            plan_data['fallback_sections'] = report.missing
+            # Totais do dia coerentes com as refeições que ficaram no plano (IA + fallback)
+            plan_data['daily_totals'] = dict(plan_data['daily_totals'], **derive_totals(plan_data))
+        return plan_data
+    
+    def _generate_text(self, prompt: BuiltPrompt) -> str:
+        """Chama o modelo com prazo por tentativa, retry com backoff e circuit breaker"""
+        generation_config = self._generation_config(prompt)
+        
+        def attempt(remaining: float) -> str:
+            started = time.perf_counter()
+            try:
+                with metrics.gemini_call('generate') as call:
+                    response = call_with_timeout(
+                        self._call_executor,
+                        lambda: self.model.generate_content(prompt.text, generation_config=generation_config),
+                        min(self.timeout, remaining)
+                    )
+                    call.record_tokens(prompt.text, response.text, getattr(response, 'usage_metadata', None))
+            except Exception:
+                prompt_stats.record_response(prompt.variant, time.perf_counter() - started, None)
+                raise
+            prompt_stats.record_response(prompt.variant, time.perf_counter() - started, response.text)
+            return response.text
+        
+        return call_with_retry(
+            attempt,
+            max_retries=self.max_retries,
+            base_delay=self.backoff_base,
+            max_delay=self.backoff_max,
+            deadline=self.deadline,
+            breaker=self.breaker
+        )
+    
+    def _build_prompt(self, user_data: Dict[str, Any]) -> BuiltPrompt:
+        """Monta o prompt pelo template configurado (GEMINI_PROMPT_TEMPLATE) e registra o custo"""
+        prompt = self.prompt_builder.build(user_data)
+        prompt_stats.record_prompt(prompt)
         return prompt
     
+    def _generation_config(self, prompt: BuiltPrompt) -> Optional[Dict[str, Any]]:
+        config = {}
+        if prompt.template.max_output_tokens:
+            config['max_output_tokens'] = prompt.template.max_output_tokens
+        if self.json_mode and self._sdk_supports_json_mode():
+            config['response_mime_type'] = 'application/json'
+        return config or None
+    
+    @staticmethod
+    def _sdk_supports_json_mode() -> bool:
+        """Saída JSON estruturada só existe em versões mais novas do SDK"""
+        try:
+            from google.generativeai.types import GenerationConfig
+        except ImportError:
+            return False
+        return 'response_mime_type' in getattr(GenerationConfig, '__annotations__', {})
+    
     def _parse_text_response(self, text: str, user_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Parseia resposta em texto quando JSON falha
@@ -218,7 +305,7 @@ Gere um plano completo, científico e dentro do orçamento especificado.
         """
         budget = user_data.get('budget_per_meal', 25)
         target_calories = user_data.get('target_calories', 1800)
-        macros = user_data.get('macros', {})
+        macros = user_data.get('macros') or {}
         goal = user_data.get('goal', 'Manter peso')
         
         # Planos baseados no objetivo
@@ -286,7 +373,7 @@ Gere um plano completo, científico e dentro do orçamento especificado.
                 "total_calories": breakfast["total_calories"] + 467 + 356,
                 "total_cost": breakfast["total_cost"] + 19.00 + 21.00,
                 "protein_g": macros.get('protein_g', 120),
-                "carbs_g": macros.get('carbs_g', 180),
+                "carbs_g": macros.get('carb_g', 180),
                 "fat_g": macros.get('fat_g', 60)
             },
             "shopping_list": [
@@ -308,3 +395,16 @@ Gere um plano completo, científico e dentro do orçamento especificado.
         """Retorna se o serviço Gemini está configurado"""
         return self.configured
 
+
+_shared_service: Optional[GeminiService] = None
+_shared_lock = threading.Lock()
+
+def get_gemini_service() -> GeminiService:
+    """Retorna o cliente Gemini compartilhado pelo processo (criado uma única vez)"""
+    global _shared_service
+    if _shared_service is None:
+        with _shared_lock:
+            if _shared_service is None:
+                _shared_service = GeminiService()
+    return _shared_service
+
@@ -0,0 +1,153 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Optional, Tuple
+
+from flask import g
+from flask_jwt_extended import create_access_token, get_jwt, get_jwt_identity
+from sqlalchemy import event
+
+from src.models.nutriai_models import db, User
+
+TOKEN_EXPIRES = timedelta(days=30)
+
+
+def create_user_token(user: User) -> str:
+    """Token de acesso com o tipo do usuário como claim, dispensando consulta para autorização"""
+    return create_access_token(
+        identity=str(user.id),
+        additional_claims={'user_type': user.user_type},
+        expires_delta=TOKEN_EXPIRES
+    )
+
+
+class Principal:
+    """
+    Identidade do usuário autenticado: id e user_type sem carregar a linha de users.
+    Colunas adicionais são carregadas sob demanda por load()/user.
+    """
+    __slots__ = ('id', 'user_type', '_user')
+
+    def __init__(self, user_id: int, user_type: str):
+        self.id = user_id
+        self.user_type = user_type
+        self._user = None
+
+    @property
+    def is_nutritionist(self) -> bool:
+        return self.user_type == 'nutritionist'
+
+    def load(self, *fields: str) -> Optional[User]:
+        """Carrega o usuário apenas com as colunas informadas (as demais continuam lazy)"""
+        if self._user is not None:
+            return self._user
+        return User.query.options(
+            db.load_only(User.id, User.user_type, *(getattr(User, field) for field in fields))
+        ).filter_by(id=self.id).first()
+
+    @property
+    def user(self) -> Optional[User]:
+        """Perfil completo, carregado uma única vez por requisição"""
+        if self._user is None:
+            self._user = db.session.get(User, self.id)
+        return self._user
+
+
+class IdentityCache:
+    """Cache por processo de (id -> user_type) com TTL curto e invalidação explícita"""
+
+    def __init__(self):
+        self.ttl = float(os.getenv('IDENTITY_CACHE_TTL', '60'))
+        self.max_size = int(os.getenv('IDENTITY_CACHE_SIZE', '10000'))
+        self._entries: 'OrderedDict[int, Tuple[str, float]]' = OrderedDict()
+        # Momento da última alteração de cada usuário; claims emitidos antes disso são ignorados.
+        # Em ordem de invalidação: entradas mais antigas que TOKEN_EXPIRES são descartadas
+        self._invalidated_at: 'OrderedDict[int, float]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[1] < time.time():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return entry[0]
+
+    def set(self, user_id: int, user_type: str):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[user_id] = (user_type, time.time() + self.ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        now = time.time()
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._invalidated_at.pop(user_id, None)
+            self._invalidated_at[user_id] = now
+            # Tokens emitidos antes da invalidação mais antiga já expiraram
+            expired_before = now - TOKEN_EXPIRES.total_seconds()
+            while next(iter(self._invalidated_at.values())) < expired_before:
+                self._invalidated_at.popitem(last=False)
+
+    def claim_is_fresh(self, user_id: int, issued_at: Optional[float]) -> bool:
+        with self._lock:
+            invalidated_at = self._invalidated_at.get(user_id)
+        return invalidated_at is None or (issued_at is not None and issued_at > invalidated_at)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._invalidated_at.clear()
+
+
+identity_cache = IdentityCache()
+
+
+def current_principal() -> Optional[Principal]:
+    """
+    Principal da requisição atual (exige @jwt_required).
+    Ordem: g -> cache do processo -> claim user_type do JWT -> consulta de (id, user_type).
+    Retorna None se o usuário não existir mais.
+    """
+    if 'principal' in g:
+        return g.principal
+
+    user_id = int(get_jwt_identity())
+    user_type = identity_cache.get(user_id)
+
+    if user_type is None:
+        claims = get_jwt()
+        if claims.get('user_type') and identity_cache.claim_is_fresh(user_id, claims.get('iat')):
+            user_type = claims['user_type']
+        else:
+            row = db.session.query(User.user_type).filter_by(id=user_id).first()
+            user_type = row.user_type if row else None
+        if user_type is not None:
+            identity_cache.set(user_id, user_type)
+
+    g.principal = Principal(user_id, user_type) if user_type is not None else None
+    return g.principal
+
+
+def invalidate_identity(user_id: int):
+    """Descarta a identidade em cache após alterações no usuário"""
+    identity_cache.invalidate(user_id)
+    g.pop('principal', None)
+
+
+@event.listens_for(User, 'after_delete')
+def _invalidate_deleted_user(mapper, connection, user):
+    """
+    O claim user_type dispensa a consulta ao banco: sem invalidar, o token de um usuário
+    excluído continuaria aceito. Vale para exclusões pelo ORM (session.delete).
+    """
+    identity_cache.invalidate(user.id)
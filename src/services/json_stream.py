@@ -0,0 +1,181 @@
+import json
+from typing import Any, List, Tuple
+
+
+class IncrementalSectionParser:
+    """
+    Parser incremental para o objeto JSON retornado pela IA.
+
+    Recebe o texto em fragmentos (feed) e devolve cada membro de primeiro nível
+    ("breakfast", "lunch", ...) assim que ele está completo, sem esperar o fim da resposta.
+    Texto antes do primeiro '{' (ex.: cercas ```json de markdown) é ignorado.
+    """
+
+    def __init__(self):
+        self._text = ''
+        self._pos = 0
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member_start = None
+        self.done = False
+
+    @property
+    def text(self) -> str:
+        """Todo o texto recebido até agora"""
+        return self._text
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        self._text += chunk
+        sections = []
+
+        while self._pos < len(self._text) and not self.done:
+            ch = self._text[self._pos]
+
+            if not self._started:
+                if ch == '{':
+                    self._started = True
+                    self._depth = 1
+                    self._member_start = self._pos + 1
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in '{[':
+                self._depth += 1
+            elif ch in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    sections.extend(self._parse_member(self._member_start, self._pos))
+                    self.done = True
+            elif ch == ',' and self._depth == 1:
+                sections.extend(self._parse_member(self._member_start, self._pos))
+                self._member_start = self._pos + 1
+
+            self._pos += 1
+
+        return sections
+
+    def _parse_member(self, start: int, end: int) -> List[Tuple[str, Any]]:
+        member = self._text[start:end].strip()
+        if not member:
+            return []
+        try:
+            return list(json.loads('{' + member + '}').items())
+        except json.JSONDecodeError:
+            # Membro malformado: fica de fora e será tratado no fim da resposta
+            return []
+
+
+# Pontos de corte tentados (do mais recente para trás) quando fechar a resposta truncada não basta
+_MAX_REPAIR_ATTEMPTS = 4
+# '{' candidatos tentados como início do objeto (prosa antes do JSON pode ter chaves soltas)
+_MAX_START_CANDIDATES = 8
+
+
+def _strip_trailing_comma(out: List[str]) -> bool:
+    end = len(out)
+    while end and out[end - 1].isspace():
+        end -= 1
+    if end and out[end - 1] == ',':
+        del out[end - 1:]
+        return True
+    return False
+
+
+def _loads(text: str):
+    try:
+        # strict=False aceita quebras de linha cruas dentro das strings
+        return json.loads(text, strict=False)
+    except json.JSONDecodeError:
+        return None
+
+
+def repair_json(text: str) -> Tuple[Any, bool, bool]:
+    """
+    Extrai o primeiro objeto JSON do texto da IA num único passo, tolerando cercas de
+    markdown, vírgulas sobrando, fechamento trocado e resposta truncada (fecha strings e
+    estruturas abertas, recuando até o último valor completo se preciso).
+    Um '{' solto no texto antes do JSON é pulado: tenta os próximos '{' candidatos.
+    Retorna (objeto, reparado, truncado); objeto é None quando nada é aproveitável.
+    """
+    start = text.find('{')
+    empty = None
+    for _ in range(_MAX_START_CANDIDATES):
+        if start < 0:
+            break
+        result = _repair_from(text, start)
+        if result[0]:
+            return result
+        # Objeto vazio (ex.: '{' solto que engoliu o resto do texto): só se nada melhor aparecer
+        if result[0] is not None and empty is None:
+            empty = result
+        start = text.find('{', start + 1)
+    return empty or (None, False, False)
+
+
+def _repair_from(text: str, start: int) -> Tuple[Any, bool, bool]:
+    out = []
+    closers = []  # fechamentos pendentes, do mais externo ao mais interno
+    safe_points = []  # (tamanho de out, fechamentos) logo após cada valor completo
+    in_string = escape = False
+    repaired = False
+
+    for ch in text[start:]:
+        if in_string:
+            out.append(ch)
+            if escape:
+                escape = False
+            elif ch == '\\':
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+            out.append(ch)
+        elif ch in '{[':
+            closers.append('}' if ch == '{' else ']')
+            out.append(ch)
+            safe_points.append((len(out), ''.join(closers)))
+        elif ch in '}]':
+            repaired |= _strip_trailing_comma(out)
+            repaired |= ch != closers[-1]
+            out.append(closers.pop())
+            if not closers:
+                break
+        elif ch == ',':
+            repaired |= _strip_trailing_comma(out)
+            safe_points.append((len(out), ''.join(closers)))
+            out.append(ch)
+        else:
+            out.append(ch)
+
+    if not closers:
+        value = _loads(''.join(out))
+        return (value, repaired, False) if isinstance(value, dict) else (None, False, False)
+
+    # Truncado no meio de um número ou literal ("total_calories": 3, tru): o valor pode estar
+    # incompleto, então não basta fechar; só strings cortadas e estruturas abertas são fechadas
+    cut_in_token = not in_string and bool(out) and (out[-1].isalnum() or out[-1] in '.-+')
+    if not cut_in_token:
+        if in_string:
+            if escape:
+                out.pop()
+            out.append('"')
+        _strip_trailing_comma(out)
+        value = _loads(''.join(out) + ''.join(reversed(closers)))
+        if isinstance(value, dict):
+            return value, True, True
+
+    # Senão, recua até um valor completo e fecha a partir dali
+    for length, pending in reversed(safe_points[-_MAX_REPAIR_ATTEMPTS:]):
+        value = _loads(''.join(out[:length]) + pending[::-1])
+        if isinstance(value, dict):
+            return value, True, True
+    return None, False, False
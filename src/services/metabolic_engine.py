@@ -0,0 +1,132 @@
+import numpy as np
+from typing import Any, Dict, Optional, Sequence
+
+# Fatores de atividade baseados em exercise_frequency
+ACTIVITY_FACTORS = {
+    'sedentario': 1.2,
+    'leve': 1.375,      # 1-3x/semana
+    'moderado': 1.55,   # 3-5x/semana
+    'intenso': 1.725,   # 6-7x/semana
+    'muito_intenso': 1.9  # 2x/dia
+}
+DEFAULT_ACTIVITY_FACTOR = 1.2
+
+# Ajuste calórico por objetivo (demais objetivos: manutenção)
+GOAL_FACTORS = {
+    'perder_peso': 0.85,  # Déficit de 15%
+    'ganhar_peso': 1.15   # Superávit de 15%
+}
+
+# Distribuição padrão de macros: (fração das calorias, kcal por grama)
+MACRO_SPLIT = {
+    'protein_g': (0.25, 4),
+    'carb_g': (0.45, 4),
+    'fat_g': (0.30, 9)
+}
+
+
+def _as_float_array(values: Sequence[Any]) -> np.ndarray:
+    """Converte para float64, tratando None como NaN"""
+    return np.array(values, dtype=np.float64)
+
+
+def _round(values: np.ndarray, decimals: int) -> np.ndarray:
+    """
+    Arredondamento equivalente ao round() do Python: a escala é feita em precisão
+    estendida para que valores próximos de ...5 não mudem de lado por erro de float64
+    """
+    scale = np.longdouble(10) ** decimals
+    return (np.rint(values.astype(np.longdouble) * scale) / scale).astype(np.float64)
+
+
+def _lookup(values: Sequence[Any], table: Dict[str, float], default: float) -> np.ndarray:
+    return np.array([table.get(v, default) for v in values], dtype=np.float64)
+
+
+def compute_batch(weight: Sequence[Any], height: Sequence[Any], age: Sequence[Any],
+                  exercise_frequency: Sequence[Any], goal: Sequence[Any],
+                  gender: Optional[Sequence[Any]] = None) -> Dict[str, np.ndarray]:
+    """
+    Calcula TMB (Harris-Benedict revisada), TDEE, meta calórica e macros
+    para N perfis de uma só vez. Perfis sem peso, altura ou idade resultam em NaN.
+    """
+    weight = _as_float_array(weight)
+    height = _as_float_array(height)
+    age = _as_float_array(age)
+    n = len(weight)
+
+    with np.errstate(invalid='ignore'):
+        valid = (weight != 0) & (height != 0) & (age != 0) & ~np.isnan(weight + height + age)
+
+    # Assumindo gênero masculino se não especificado
+    female = np.zeros(n, dtype=bool) if gender is None else np.array([g == 'female' for g in gender], dtype=bool)
+
+    bmr = np.where(
+        female,
+        447.593 + (9.247 * weight) + (3.098 * height) - (4.330 * age),
+        88.362 + (13.397 * weight) + (4.799 * height) - (5.677 * age)
+    )
+    bmr = np.where(valid, _round(bmr, 2), np.nan)
+
+    tdee = _round(bmr * _lookup(exercise_frequency, ACTIVITY_FACTORS, DEFAULT_ACTIVITY_FACTOR), 2)
+    tdee = np.where(bmr != 0, tdee, np.nan)
+
+    calories = tdee * _lookup(goal, GOAL_FACTORS, 1.0)
+    calories = np.where(tdee != 0, calories, np.nan)
+
+    result = {
+        'bmr': bmr,
+        'tdee': tdee,
+        'calories': _round(calories, 0)
+    }
+    for name, (ratio, kcal_per_gram) in MACRO_SPLIT.items():
+        result[name] = _round(calories * ratio / kcal_per_gram, 1)
+
+    return result
+
+
+def _to_python(value: float) -> Optional[float]:
+    return None if np.isnan(value) else float(value)
+
+
+def compute_profile(weight, height, age, exercise_frequency, goal, gender=None) -> Dict[str, Any]:
+    """Caminho escalar: um perfil, mesmo formato de User.calculate_bmr/tdee/macros"""
+    batch = compute_batch([weight], [height], [age], [exercise_frequency], [goal],
+                          None if gender is None else [gender])
+    calories = _to_python(batch['calories'][0])
+
+    return {
+        'bmr': _to_python(batch['bmr'][0]),
+        'tdee': _to_python(batch['tdee'][0]),
+        'target_calories': calories,
+        'macros': None if calories is None else {
+            'calories': calories,
+            'protein_g': float(batch['protein_g'][0]),
+            'carb_g': float(batch['carb_g'][0]),
+            'fat_g': float(batch['fat_g'][0])
+        }
+    }
+
+
+def to_list(values: np.ndarray) -> list:
+    """Converte para lista Python com None no lugar de NaN (serializável em JSON)"""
+    return [None if v != v else v for v in values.tolist()]
+
+
+def count_complete(values: np.ndarray) -> int:
+    return int(np.count_nonzero(~np.isnan(values)))
+
+
+def summarize(values: np.ndarray) -> Dict[str, Optional[float]]:
+    """Estatísticas descritivas de uma coluna ignorando perfis incompletos"""
+    values = values[~np.isnan(values)]
+    if values.size == 0:
+        return {'mean': None, 'p10': None, 'median': None, 'p90': None}
+
+    p10, median, p90 = np.percentile(values, [10, 50, 90])
+    return {
+        'mean': round(float(values.mean()), 1),
+        'p10': round(float(p10), 1),
+        'median': round(float(median), 1),
+        'p90': round(float(p90), 1)
+    }
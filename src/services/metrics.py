@@ -0,0 +1,272 @@
+import os
+import time
+from contextlib import contextmanager
+
+from flask import Response, current_app, g, has_request_context, jsonify, request
+from sqlalchemy import event
+
+from src.services.prompt_builder import CHARS_PER_TOKEN
+
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+except ImportError:  # prometheus_client é opcional: pip install prometheus-client
+    prometheus_client = None
+
+# Em servidores com vários workers (Gunicorn), defina PROMETHEUS_MULTIPROC_DIR antes de subir
+# os processos: cada worker grava seus valores em arquivos e /metrics agrega todos
+MULTIPROC_DIR_ENV = 'PROMETHEUS_MULTIPROC_DIR'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+GEMINI_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 15, 25, 45)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+
+def _route_labels():
+    """Blueprint e regra da rota (não o caminho, para limitar a cardinalidade)"""
+    rule = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    return request.blueprint or 'app', rule
+
+
+def _classify_error(error: Exception) -> str:
+    names = {cls.__name__ for cls in type(error).__mro__}
+    if names & {'TooManyRequests', 'ResourceExhausted'}:
+        return 'rate_limited'
+    if names & {'TimeoutError', 'DeadlineExceeded'}:
+        return 'timeout'
+    return 'error'
+
+
+class GeminiCall:
+    """Resultado de uma chamada ao Gemini, preenchido dentro de Metrics.gemini_call"""
+
+    def __init__(self):
+        self.usage = None
+        self.prompt_chars = 0
+        self.response_chars = 0
+
+    def record_tokens(self, prompt: str, text: str, usage=None):
+        """Acumula o texto recebido (no stream, chamado a cada pedaço)"""
+        self.prompt_chars = len(prompt or '')
+        self.response_chars += len(text or '')
+        self.usage = usage or self.usage
+
+    @property
+    def prompt_tokens(self) -> int:
+        if self.usage is not None:
+            return getattr(self.usage, 'prompt_token_count', 0) or 0
+        return self.prompt_chars // CHARS_PER_TOKEN
+
+    @property
+    def response_tokens(self) -> int:
+        if self.usage is not None:
+            return getattr(self.usage, 'candidates_token_count', 0) or 0
+        return self.response_chars // CHARS_PER_TOKEN
+
+
+class Metrics:
+    """
+    Métricas Prometheus em /metrics: latência e status por rota, requisições em andamento,
+    consultas SQL por requisição e chamadas/tokens/falhas/fallbacks do Gemini.
+    Sem prometheus_client instalado (ou com METRICS_ENABLED=false) tudo vira no-op.
+    """
+
+    def __init__(self):
+        self.enabled = False
+
+    def init_app(self, app, db):
+        app.config.setdefault('METRICS_ENABLED', os.getenv('METRICS_ENABLED', 'true').lower() != 'false')
+        app.config.setdefault('METRICS_TOKEN', os.getenv('METRICS_TOKEN'))
+        app.extensions['metrics'] = self
+        app.add_url_rule('/metrics', 'metrics', self.export)
+
+        if not app.config['METRICS_ENABLED'] or prometheus_client is None:
+            return
+        if not self.enabled:
+            self._create_metrics()
+            self.enabled = True
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def _create_metrics(self):
+        Counter, Gauge, Histogram = prometheus_client.Counter, prometheus_client.Gauge, prometheus_client.Histogram
+
+        self.http_requests = Counter(
+            'nutriai_http_requests_total', 'Requisições HTTP por rota e status',
+            ['method', 'blueprint', 'route', 'status']
+        )
+        self.http_latency = Histogram(
+            'nutriai_http_request_duration_seconds', 'Latência até a resposta (sem o corpo de streams)',
+            ['method', 'blueprint', 'route'], buckets=LATENCY_BUCKETS
+        )
+        self.http_in_progress = Gauge(
+            'nutriai_http_requests_in_progress', 'Requisições em andamento',
+            ['method', 'blueprint'], multiprocess_mode='livesum'
+        )
+
+        self.db_queries = Counter(
+            'nutriai_db_queries_total', 'Consultas SQL executadas (route="background" fora de requisições)',
+            ['route']
+        )
+        self.db_query_latency = Histogram(
+            'nutriai_db_query_duration_seconds', 'Duração de cada consulta SQL',
+            ['route'], buckets=LATENCY_BUCKETS
+        )
+        self.db_queries_per_request = Histogram(
+            'nutriai_db_queries_per_request', 'Consultas SQL por requisição',
+            ['route'], buckets=QUERY_COUNT_BUCKETS
+        )
+        self.db_time_per_request = Histogram(
+            'nutriai_db_time_per_request_seconds', 'Tempo total em SQL por requisição',
+            ['route'], buckets=LATENCY_BUCKETS
+        )
+
+        self.gemini_calls = Counter(
+            'nutriai_gemini_calls_total', 'Chamadas à API do Gemini por resultado',
+            ['kind', 'outcome']
+        )
+        self.gemini_latency = Histogram(
+            'nutriai_gemini_call_duration_seconds', 'Duração das chamadas ao Gemini (stream: até o último pedaço)',
+            ['kind'], buckets=GEMINI_BUCKETS
+        )
+        self.gemini_tokens = Counter(
+            'nutriai_gemini_tokens_total', 'Tokens enviados/recebidos (estimados quando o SDK não informa)',
+            ['kind', 'direction']
+        )
+        self.gemini_fallbacks = Counter(
+            'nutriai_gemini_fallbacks_total', 'Planos completados ou substituídos pelo fallback',
+            ['reason']
+        )
+        self.gemini_repairs = Counter(
+            'nutriai_gemini_repairs_total', 'Respostas com JSON reparado e seções corrigidas/descartadas/ausentes',
+            ['action', 'section']
+        )
+
+    # Requisições
+
+    def _before_request(self):
+        g._metrics_started = time.perf_counter()
+        g._metrics_sql = [0, 0.0]
+        method, (blueprint, _) = request.method, _route_labels()
+        self.http_in_progress.labels(method, blueprint).inc()
+        g._metrics_in_progress = (method, blueprint)
+
+    def _after_request(self, response):
+        started = g.get('_metrics_started')
+        if started is None:
+            return response
+
+        blueprint, route = _route_labels()
+        self.http_requests.labels(request.method, blueprint, route, str(response.status_code)).inc()
+        self.http_latency.labels(request.method, blueprint, route).observe(time.perf_counter() - started)
+
+        queries, seconds = g._metrics_sql
+        self.db_queries_per_request.labels(route).observe(queries)
+        self.db_time_per_request.labels(route).observe(seconds)
+        return response
+
+    def _teardown_request(self, error=None):
+        labels = g.pop('_metrics_in_progress', None)
+        if labels is not None:
+            self.http_in_progress.labels(*labels).dec()
+
+    # SQL
+
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_metrics_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get('_metrics_started')
+        if not stack:
+            return
+        elapsed = time.perf_counter() - stack.pop()
+
+        route = 'background'
+        if has_request_context():
+            route = _route_labels()[1]
+            totals = g.get('_metrics_sql')
+            if totals is not None:
+                totals[0] += 1
+                totals[1] += elapsed
+        self.db_queries.labels(route).inc()
+        self.db_query_latency.labels(route).observe(elapsed)
+
+    # Gemini
+
+    @contextmanager
+    def gemini_call(self, kind: str):
+        """Mede uma chamada ao Gemini; exceções contam como falha (rate_limited, timeout, error)"""
+        call = GeminiCall()
+        started = time.perf_counter()
+        try:
+            yield call
+        except GeneratorExit:
+            self._finish_gemini(kind, 'cancelled', started, call)
+            raise
+        except Exception as e:
+            self._finish_gemini(kind, _classify_error(e), started, call)
+            raise
+        else:
+            self._finish_gemini(kind, 'success', started, call)
+
+    def _finish_gemini(self, kind, outcome, started, call):
+        if not self.enabled:
+            return
+        self.gemini_calls.labels(kind, outcome).inc()
+        self.gemini_latency.labels(kind).observe(time.perf_counter() - started)
+        if call.prompt_tokens:
+            self.gemini_tokens.labels(kind, 'prompt').inc(call.prompt_tokens)
+        if call.response_tokens:
+            self.gemini_tokens.labels(kind, 'response').inc(call.response_tokens)
+
+    def gemini_fallback(self, reason: str):
+        """reason: not_configured, circuit_open, error, unparseable ou partial"""
+        if self.enabled:
+            self.gemini_fallbacks.labels(reason).inc()
+
+    def gemini_repair(self, report):
+        """Registra o RepairReport de uma resposta que precisou ser aproveitada"""
+        if not self.enabled:
+            return
+        if report.repaired:
+            self.gemini_repairs.labels('json', '').inc()
+        for action in ('salvaged', 'dropped', 'missing'):
+            for section in getattr(report, action):
+                self.gemini_repairs.labels(action, section).inc()
+
+    # Exportação
+
+    def export(self):
+        if not self.enabled:
+            return jsonify({'error': 'Métricas desativadas (instale prometheus-client)'}), 404
+
+        # Fora do modo debug o endpoint só responde com METRICS_TOKEN configurado
+        token = current_app.config.get('METRICS_TOKEN')
+        if not token and not current_app.debug:
+            return jsonify({'error': 'Defina METRICS_TOKEN para expor as métricas'}), 403
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            return jsonify({'error': 'Não autorizado'}), 401
+
+        if os.getenv(MULTIPROC_DIR_ENV):
+            registry = prometheus_client.CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = prometheus_client.REGISTRY
+        return Response(prometheus_client.generate_latest(registry), mimetype=prometheus_client.CONTENT_TYPE_LATEST)
+
+
+def mark_process_dead(pid: int):
+    """Para o hook child_exit do Gunicorn: descarta os gauges do worker encerrado"""
+    if prometheus_client is not None and os.getenv(MULTIPROC_DIR_ENV):
+        multiprocess.mark_process_dead(pid)
+
+
+metrics = Metrics()
@@ -0,0 +1,68 @@
+import base64
+import json
+from datetime import datetime
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Token opaco com a posição (created_at, id) da última linha da página"""
+    payload = json.dumps([created_at.isoformat(), row_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token: str) -> Tuple[datetime, int]:
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise ValueError('Cursor inválido')
+
+
+def parse_page_size(value: Optional[str]) -> int:
+    if value is None:
+        return DEFAULT_PAGE_SIZE
+    try:
+        size = int(value)
+    except ValueError:
+        raise ValueError('limit deve ser um número inteiro')
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def parse_fields(value: Optional[str], allowed: Iterable[str]) -> Optional[list]:
+    """Lê a projeção ?fields=a,b,c; None significa todos os campos"""
+    if not value:
+        return None
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise ValueError(f"Campos desconhecidos: {', '.join(unknown)}")
+    return fields
+
+
+def keyset_page(query, model, cursor: Optional[str], page_size: int):
+    """
+    Pagina por (created_at, id) decrescente. Cada página custa o mesmo
+    independente da profundidade, ao contrário de OFFSET.
+    Retorna (linhas, próximo_cursor ou None).
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            model.created_at < created_at,
+            and_(model.created_at == created_at, model.id < row_id)
+        ))
+
+    rows = query.order_by(model.created_at.desc(), model.id.desc()).limit(page_size + 1).all()
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+
+    return rows, next_cursor
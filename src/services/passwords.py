@@ -0,0 +1,129 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+
+def normalize_method(method: str) -> str:
+    """
+    Prefixo que o Werkzeug grava no hash para o método, com os parâmetros padrão
+    preenchidos ('scrypt' -> 'scrypt:32768:8:1'), sem executar o KDF
+    """
+    name, *args = method.split(':')
+    if name == 'scrypt':
+        if args and len(args) != 3:
+            raise ValueError("PASSWORD_HASH_METHOD: 'scrypt' recebe 3 parâmetros (n:r:p)")
+        n, r, p = map(int, args) if args else (2 ** 15, 8, 1)
+        return f'scrypt:{n}:{r}:{p}'
+    if name == 'pbkdf2':
+        if len(args) > 2:
+            raise ValueError("PASSWORD_HASH_METHOD: 'pbkdf2' recebe 2 parâmetros (hash:iterações)")
+        hash_name = args[0] if args else 'sha256'
+        iterations = int(args[1]) if len(args) == 2 else DEFAULT_PBKDF2_ITERATIONS
+        return f'pbkdf2:{hash_name}:{iterations}'
+    raise ValueError(f'PASSWORD_HASH_METHOD inválido: {method}')
+
+
+class PasswordHasherBusy(Exception):
+    """Fila de hashing cheia: a requisição deve ser recusada com 503 + Retry-After"""
+
+    def __init__(self, retry_after: int):
+        super().__init__('Fila de hashing de senhas cheia')
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    """
+    Executa o KDF de senhas (scrypt/pbkdf2 do Werkzeug) em um pool limitado.
+    hashlib libera o GIL durante o KDF, então as threads usam núcleos distintos;
+    acima de PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE operações simultâneas, novas
+    chamadas são recusadas em vez de acumular requisições paradas.
+    """
+
+    def __init__(self, app=None):
+        self.method = None
+        self.workers = 1
+        self.retry_after = 1
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[threading.BoundedSemaphore] = None
+        self._normalized_method: Optional[str] = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PASSWORD_HASH_METHOD', os.getenv('PASSWORD_HASH_METHOD', 'scrypt'))
+        app.config.setdefault('PASSWORD_HASH_WORKERS', int(os.getenv('PASSWORD_HASH_WORKERS', str(os.cpu_count() or 1))))
+        app.config.setdefault('PASSWORD_HASH_QUEUE', int(os.getenv('PASSWORD_HASH_QUEUE', '32')))
+        app.config.setdefault('PASSWORD_HASH_RETRY_AFTER', int(os.getenv('PASSWORD_HASH_RETRY_AFTER', '1')))
+        app.extensions['password_hasher'] = self
+        self.configure(
+            app.config['PASSWORD_HASH_METHOD'],
+            app.config['PASSWORD_HASH_WORKERS'],
+            app.config['PASSWORD_HASH_QUEUE'],
+            app.config['PASSWORD_HASH_RETRY_AFTER']
+        )
+
+    def configure(self, method: str, workers: int, queue_size: int, retry_after: int = 1):
+        normalized_method = normalize_method(method)  # valida antes de trocar o pool
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+            self._normalized_method = normalized_method
+            self.method = method
+            self.workers = max(workers, 1)
+            self.retry_after = retry_after
+            self._executor = ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix='password-hash')
+            self._slots = threading.BoundedSemaphore(max(workers, 1) + max(queue_size, 0))
+
+    def _ensure_configured(self):
+        if self._executor is None:
+            self.configure(
+                os.getenv('PASSWORD_HASH_METHOD', 'scrypt'),
+                int(os.getenv('PASSWORD_HASH_WORKERS', str(os.cpu_count() or 1))),
+                int(os.getenv('PASSWORD_HASH_QUEUE', '32'))
+            )
+
+    def _run(self, fn, *args):
+        self._ensure_configured()
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy(self.retry_after)
+        try:
+            return self._executor.submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password: str) -> str:
+        self._ensure_configured()
+        return self._run(generate_password_hash, password, self.method)
+
+    def hash_many(self, passwords: Iterable[str]) -> List[str]:
+        """
+        Hashes de um lote (importação de usuários) em paralelo no mesmo pool.
+        Espera por vaga em vez de recusar e mantém no máximo `workers` hashes do lote em
+        andamento, deixando a fila livre para os cadastros e logins interativos.
+        """
+        self._ensure_configured()
+        slots, executor = self._slots, self._executor
+        in_flight = threading.Semaphore(self.workers)
+        futures = []
+        for password in passwords:
+            in_flight.acquire()
+            slots.acquire()
+            future = executor.submit(generate_password_hash, password, self.method)
+            future.add_done_callback(lambda _: (slots.release(), in_flight.release()))
+            futures.append(future)
+        return [future.result() for future in futures]
+    
+    def verify(self, password_hash: str, password: str) -> bool:
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """True se o hash foi gerado com parâmetros diferentes de PASSWORD_HASH_METHOD"""
+        self._ensure_configured()
+        return password_hash.split('$', 1)[0] != self._normalized_method
+
+
+password_hasher = PasswordHasher()
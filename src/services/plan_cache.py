@@ -0,0 +1,188 @@
+import os
+import copy
+import json
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional
+
+from flask import has_app_context
+
+from src.services.prompt_builder import prompt_context
+
+# Versão da chave: altere quando o prompt mudar de forma incompatível
+CACHE_KEY_VERSION = 'v2'
+
+# Tamanho dos intervalos usados para agrupar perfis semelhantes
+WEIGHT_BUCKET_KG = 2.0
+HEIGHT_BUCKET_CM = 5.0
+AGE_BUCKET_YEARS = 5
+
+
+def _bucket(value, size):
+    if value is None:
+        return None
+    try:
+        return int(float(value) // size)
+    except (TypeError, ValueError):
+        return None
+
+
+def _normalize_text(value) -> str:
+    return ' '.join(str(value or '').lower().split())
+
+
+def _normalize_list(value) -> list:
+    """'Sem lactose, Glúten' e 'glúten,sem lactose' geram a mesma lista"""
+    items = [_normalize_text(item) for item in str(value or '').split(',')]
+    return sorted(item for item in items if item and item != 'nenhuma')
+
+
+def fingerprint(user_data: Dict[str, Any], prompt_variant: str = '') -> str:
+    """
+    Gera a chave do cache a partir dos valores que entram no prompt (prompt_context),
+    normalizados e agrupados (peso, altura e idade em faixas; texto sem caixa/espaços extras).
+    Métricas derivadas (TMB, TDEE, macros) dependem só desses campos e não entram na chave.
+    prompt_variant (template e versão do prompt) separa planos gerados em formatos diferentes.
+    """
+    context = prompt_context(user_data)
+    normalized = {
+        'version': CACHE_KEY_VERSION,
+        'prompt': prompt_variant,
+        'goal': _normalize_text(context['goal']),
+        'weight': _bucket(context['weight'], WEIGHT_BUCKET_KG),
+        'height': _bucket(context['height'], HEIGHT_BUCKET_CM),
+        'age': _bucket(context['age'], AGE_BUCKET_YEARS),
+        'budget': round(float(context['budget'] or 25)),
+        'restrictions': _normalize_list(context['restrictions']),
+        'exercise_frequency': _normalize_text(context['exercise_frequency']),
+        'sleep_hours': _bucket(context['sleep_hours'], 1),
+        'stress_level': context['stress_level'],
+        'water_intake': context['water_intake'],
+        'family': sorted(context['family_conditions'])
+    }
+    payload = json.dumps(normalized, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class PlanCache:
+    """
+    Cache de planos gerados pelo Gemini em dois níveis:
+    LRU em memória (por processo) com TTL e tabela plan_cache persistente.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_seconds: Optional[int] = None):
+        self.enabled = os.getenv('PLAN_CACHE_ENABLED', 'true').lower() != 'false'
+        self.max_entries = max_entries or int(os.getenv('PLAN_CACHE_SIZE', '256'))
+        self.ttl_seconds = ttl_seconds or int(os.getenv('PLAN_CACHE_TTL', str(7 * 24 * 3600)))
+        self._entries = OrderedDict()  # key -> (expires_at_monotonic, plan)
+        self._lock = threading.Lock()
+        self._stats = {'memory_hits': 0, 'db_hits': 0, 'misses': 0, 'stores': 0}
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+
+        plan = self._memory_get(key)
+        if plan is not None:
+            self._count('memory_hits')
+            return plan
+
+        plan = self._db_get(key)
+        if plan is not None:
+            self._count('db_hits')
+            self._memory_set(key, plan)
+            return plan
+
+        self._count('misses')
+        return None
+
+    def set(self, key: str, plan: Dict[str, Any]):
+        if not self.enabled:
+            return
+
+        self._memory_set(key, plan)
+        self._db_set(key, plan)
+        self._count('stores')
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['memory_entries'] = len(self._entries)
+        lookups = stats['memory_hits'] + stats['db_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['memory_hits'] + stats['db_hits']) / lookups * 100, 1) if lookups else 0
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    # Nível 1: LRU em memória
+
+    def _memory_get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, plan = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return copy.deepcopy(plan)
+
+    def _memory_set(self, key: str, plan: Dict[str, Any]):
+        # Cópia própria: alterações do chamador no plano não vazam para outros usuários
+        plan = copy.deepcopy(plan)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, plan)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    # Nível 2: tabela plan_cache (conexão própria, não interfere na sessão do chamador)
+
+    def _db_get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not has_app_context():
+            return None
+
+        from src.models.nutriai_models import db, PlanCacheEntry
+
+        try:
+            table = PlanCacheEntry.__table__
+            with db.engine.connect() as conn:
+                row = conn.execute(
+                    table.select().where(table.c.key == key, table.c.expires_at > datetime.utcnow())
+                ).first()
+            return json.loads(row.plan_data) if row else None
+        except Exception as e:
+            print(f"Erro ao ler cache de planos: {e}")
+            return None
+
+    def _db_set(self, key: str, plan: Dict[str, Any]):
+        if not has_app_context():
+            return
+
+        from src.models.nutriai_models import db, PlanCacheEntry
+
+        try:
+            table = PlanCacheEntry.__table__
+            now = datetime.utcnow()
+            with db.engine.begin() as conn:
+                conn.execute(table.delete().where((table.c.key == key) | (table.c.expires_at <= now)))
+                conn.execute(table.insert().values(
+                    key=key,
+                    plan_data=json.dumps(plan, ensure_ascii=False),
+                    created_at=now,
+                    expires_at=now + timedelta(seconds=self.ttl_seconds)
+                ))
+        except Exception as e:
+            print(f"Erro ao gravar cache de planos: {e}")
+
+
+plan_cache = PlanCache()
@@ -0,0 +1,66 @@
+import json
+import os
+import zlib
+from typing import Any, Dict, Optional
+
+try:
+    import zstandard
+except ImportError:  # zstd é opcional: pip install zstandard
+    zstandard = None
+
+# Primeiro byte do payload identifica o codec, permitindo trocar de codec sem reescrever linhas antigas
+VERSION_ZLIB = 0x01
+VERSION_ZSTD = 0x02
+
+CODECS = ('json', 'zlib', 'zstd')
+
+
+def configured_codec() -> str:
+    """Codec usado nas gravações (PLAN_DATA_CODEC); 'json' grava sem compressão na coluna JSON"""
+    codec = os.getenv('PLAN_DATA_CODEC', 'zlib').lower()
+    if codec not in CODECS:
+        raise ValueError(f'PLAN_DATA_CODEC inválido: {codec}')
+    if codec == 'zstd' and zstandard is None:
+        return 'zlib'
+    return codec
+
+
+def serialize(plan: Dict[str, Any]) -> bytes:
+    return json.dumps(plan, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def encode(plan: Dict[str, Any], codec: Optional[str] = None) -> Optional[bytes]:
+    """Comprime o plano; retorna None para o codec 'json' (gravado sem compressão)"""
+    codec = codec or configured_codec()
+
+    if codec == 'json':
+        return None
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError('Codec zstd requer o pacote zstandard')
+        level = int(os.getenv('PLAN_DATA_ZSTD_LEVEL', '10'))
+        return bytes([VERSION_ZSTD]) + zstandard.ZstdCompressor(level=level).compress(serialize(plan))
+
+    level = int(os.getenv('PLAN_DATA_ZLIB_LEVEL', '6'))
+    return bytes([VERSION_ZLIB]) + zlib.compress(serialize(plan), level)
+
+
+def decode(payload: bytes) -> Dict[str, Any]:
+    version, body = payload[0], payload[1:]
+
+    if version == VERSION_ZLIB:
+        raw = zlib.decompress(body)
+    elif version == VERSION_ZSTD:
+        if zstandard is None:
+            raise RuntimeError('Plano comprimido com zstd, mas o pacote zstandard não está instalado')
+        raw = zstandard.ZstdDecompressor().decompress(body)
+    else:
+        raise ValueError(f'Versão de codec desconhecida: {version}')
+
+    return json.loads(raw)
+
+
+def codec_of(payload: Optional[bytes]) -> str:
+    if payload is None:
+        return 'json'
+    return {VERSION_ZLIB: 'zlib', VERSION_ZSTD: 'zstd'}.get(payload[0], 'unknown')
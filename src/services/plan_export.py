@@ -0,0 +1,173 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, Optional
+
+from sqlalchemy import select
+
+from src.models.nutriai_models import db, User, DietPlan
+from src.services import plan_codec
+from src.services.plan_repair import MEAL_SECTIONS
+
+FORMATS = ('ndjson', 'csv')
+STATUSES = ('pending', 'approved', 'rejected')
+
+# Colunas exportadas, na ordem do CSV
+PLAN_FIELDS = (
+    'id', 'user_id', 'nutritionist_id', 'status', 'title', 'plan_type',
+    'created_at', 'validated_at', 'total_calories', 'total_cost'
+)
+MEAL_FIELDS = tuple(f'{meal}_{field}' for meal in MEAL_SECTIONS for field in ('name', 'calories', 'cost')) + (
+    'snacks_count', 'snacks_calories', 'protein_g', 'carbs_g', 'fat_g', 'ai_fallback'
+)
+OWNER_FIELDS = (
+    'owner_name', 'owner_age', 'owner_weight', 'owner_height', 'owner_goal', 'owner_exercise_frequency',
+    'owner_bmr', 'owner_tdee', 'owner_target_calories'
+)
+EXPORT_FIELDS = PLAN_FIELDS + MEAL_FIELDS + OWNER_FIELDS
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def parse_date(value: Optional[str], end: bool = False) -> Optional[datetime]:
+    """AAAA-MM-DD ou ISO 8601; em `end`, uma data sem hora inclui o dia inteiro"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'Data inválida: {value} (use AAAA-MM-DD)')
+    if end and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+
+def build_query(status: Optional[str] = None, nutritionist_id: Optional[int] = None,
+                user_id: Optional[int] = None, date_from: Optional[datetime] = None,
+                date_to: Optional[datetime] = None):
+    """Planos com as colunas do dono (sem entidades ORM, para não acumular o identity map)"""
+    if status is not None and status not in STATUSES:
+        raise ValueError(f"status deve ser um de: {', '.join(STATUSES)}")
+
+    columns = [getattr(DietPlan, field) for field in PLAN_FIELDS]
+    columns += [DietPlan._plan_json, DietPlan._plan_payload]
+    columns += [User.name, User.age, User.weight, User.height, User.goal, User.exercise_frequency]
+
+    query = select(*columns).join(User, User.id == DietPlan.user_id)
+    if status is not None:
+        query = query.where(DietPlan.status == status)
+    if nutritionist_id is not None:
+        query = query.where(DietPlan.nutritionist_id == nutritionist_id)
+    if user_id is not None:
+        query = query.where(DietPlan.user_id == user_id)
+    if date_from is not None:
+        query = query.where(DietPlan.created_at >= date_from)
+    if date_to is not None:
+        query = query.where(DietPlan.created_at < date_to)
+    return query.order_by(DietPlan.id)
+
+
+def _number(value):
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+def flatten_plan(plan: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Totais por refeição e macros do dia extraídos de plan_data"""
+    plan = plan if isinstance(plan, dict) else {}
+    flat = {}
+    for meal in MEAL_SECTIONS:
+        data = plan.get(meal) if isinstance(plan.get(meal), dict) else {}
+        flat[f'{meal}_name'] = data.get('name')
+        flat[f'{meal}_calories'] = _number(data.get('total_calories'))
+        flat[f'{meal}_cost'] = _number(data.get('total_cost'))
+
+    snacks = [snack for snack in plan.get('snacks') or [] if isinstance(snack, dict)]
+    flat['snacks_count'] = len(snacks)
+    flat['snacks_calories'] = sum(_number(snack.get('total_calories')) or 0 for snack in snacks)
+
+    totals = plan.get('daily_totals') if isinstance(plan.get('daily_totals'), dict) else {}
+    for field in ('protein_g', 'carbs_g', 'fat_g'):
+        flat[field] = _number(totals.get(field))
+    flat['ai_fallback'] = bool(plan.get('fallback'))
+    return flat
+
+
+def _decode_plan(plan_json, plan_payload):
+    return plan_codec.decode(plan_payload) if plan_payload is not None else plan_json
+
+
+def iter_records(query, include_plan: bool = False, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Percorre a consulta com cursor no servidor (yield_per: stream_results no Postgres)
+    em blocos de chunk_size linhas; as métricas do dono são calculadas em lote por bloco.
+    """
+    from src.services import metabolic_engine  # NumPy só é importado quando há exportação
+
+    plan_column = len(PLAN_FIELDS)
+    owner_columns = slice(plan_column + 2, None)
+
+    result = db.session.execute(query.execution_options(yield_per=chunk_size))
+    for rows in result.partitions():
+        _, age, weight, height, goal, frequency = zip(*[row[owner_columns] for row in rows])
+        metrics = metabolic_engine.compute_batch(weight, height, age, frequency, goal)
+        bmr, tdee, calories = (metabolic_engine.to_list(metrics[key]) for key in ('bmr', 'tdee', 'calories'))
+
+        for i, row in enumerate(rows):
+            record = dict(zip(PLAN_FIELDS, row))
+            for field in ('created_at', 'validated_at'):
+                record[field] = record[field].isoformat() if record[field] else None
+
+            plan = _decode_plan(row[plan_column], row[plan_column + 1])
+            record.update(flatten_plan(plan))
+            record.update(zip(OWNER_FIELDS, tuple(row[owner_columns]) + (bmr[i], tdee[i], calories[i])))
+            if include_plan:
+                record['plan_data'] = plan
+            yield record
+
+
+def _serialize(records: Iterator[Dict[str, Any]], fmt: str) -> Iterator[str]:
+    if fmt == 'ndjson':
+        for record in records:
+            yield json.dumps(record, ensure_ascii=False) + '\n'
+        return
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    for record in records:
+        writer.writerow(record)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_plans(query, fmt: str = 'ndjson', compress: bool = False, include_plan: bool = False,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, flush_bytes: int = 64 * 1024) -> Iterator[bytes]:
+    """
+    Exportação em fluxo: bytes em NDJSON ou CSV (opcionalmente gzip), agrupados em
+    blocos de ~flush_bytes. A memória não cresce com o número de linhas.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato deve ser um de: {', '.join(FORMATS)}")
+
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None  # wbits=31: formato gzip
+    pending, size = [], 0
+    for text in _serialize(iter_records(query, include_plan and fmt == 'ndjson', chunk_size), fmt):
+        pending.append(text)
+        size += len(text)
+        if size >= flush_bytes:
+            data = ''.join(pending).encode('utf-8')
+            pending, size = [], 0
+            data = compressor.compress(data) if compressor else data
+            if data:
+                yield data
+
+    data = ''.join(pending).encode('utf-8')
+    if compressor:
+        data = compressor.compress(data) + compressor.flush()
+    if data:
+        yield data
@@ -0,0 +1,202 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Optional
+
+from flask import current_app
+
+from src.models.nutriai_models import db, User, DietPlan, PlanGenerationJob
+from src.services.plan_stats import record_plan_created
+
+
+def build_user_data(user: User) -> dict:
+    """Prepara os dados científicos do usuário para o prompt da IA"""
+    user_data = user.to_dict()
+    user_data['target_calories'] = user.calculate_target_calories()
+    return user_data
+
+
+def run_generation_job(job_id: str) -> Optional[str]:
+    """
+    Executa um job de geração de plano (requer app context ativo).
+    Retorna o status final do job ou None se outro worker já o assumiu.
+    """
+    # Reivindica o job de forma atômica: apenas um worker passa de 'queued' para 'running'
+    claimed = PlanGenerationJob.query.filter_by(id=job_id, status='queued').update({
+        'status': 'running',
+        'started_at': datetime.utcnow(),
+        'attempts': PlanGenerationJob.attempts + 1
+    }, synchronize_session=False)
+    db.session.commit()
+
+    if not claimed:
+        return None
+
+    job = db.session.get(PlanGenerationJob, job_id)
+
+    try:
+        from src.services.gemini_service import get_gemini_service
+
+        user = db.session.get(User, job.user_id)
+        if not user:
+            raise ValueError('Usuário não encontrado')
+
+        ai_plan = get_gemini_service().generate_scientific_diet_plan(
+            build_user_data(user), force_fresh=job.force_fresh
+        )
+
+        diet_plan = DietPlan(user_id=user.id)
+        diet_plan.set_ai_plan(ai_plan)
+        db.session.add(diet_plan)
+        db.session.flush()
+        record_plan_created(diet_plan)
+
+        job.diet_plan_id = diet_plan.id
+        job.status = 'completed'
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(PlanGenerationJob, job_id)
+        job.status = 'failed'
+        job.error = str(e)
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        print(f"❌ Erro no job de geração {job_id}: {e}")
+
+    return job.status
+
+
+def reclaim_stale_job(job_id: str, stale_before: datetime, max_attempts: int) -> Optional[str]:
+    """
+    Devolve à fila um job 'running' iniciado antes de stale_before (worker caiu ou foi
+    reiniciado no meio da geração); depois de max_attempts tentativas, marca como 'failed'.
+    Retorna o novo status ou None se o job não estava travado.
+    """
+    stale = PlanGenerationJob.query.filter(
+        PlanGenerationJob.id == job_id,
+        PlanGenerationJob.status == 'running',
+        PlanGenerationJob.started_at < stale_before
+    )
+    status = None
+    if stale.filter(PlanGenerationJob.attempts < max_attempts).update(
+        {'status': 'queued', 'started_at': None}, synchronize_session=False
+    ):
+        status = 'queued'
+    elif stale.update({
+        'status': 'failed',
+        'error': 'Geração interrompida: o worker parou de responder',
+        'finished_at': datetime.utcnow()
+    }, synchronize_session=False):
+        status = 'failed'
+    db.session.commit()
+
+    if status:
+        print(f"♻️ Job de geração {job_id} travado em 'running': {status}")
+    return status
+
+
+def _run_in_process(job_id: str) -> Optional[str]:
+    """Ponto de entrada para ProcessPoolExecutor: cada processo carrega sua própria app"""
+    from src.main import app
+
+    with app.app_context():
+        return run_generation_job(job_id)
+
+
+class PlanJobQueue:
+    """
+    Fila de geração de planos persistida na tabela plan_generation_jobs.
+
+    Os endpoints apenas enfileiram o job; um pool de workers (threads ou processos)
+    executa a chamada ao Gemini fora do ciclo da requisição.
+    """
+
+    def __init__(self, app=None):
+        self._executor = None
+        self._lock = threading.Lock()
+        self._in_flight = set()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PLAN_WORKERS', int(os.getenv('PLAN_WORKERS', '2')))
+        app.config.setdefault('PLAN_WORKER_MODE', os.getenv('PLAN_WORKER_MODE', 'thread'))  # 'thread' ou 'process'
+        # Job 'running' há mais que o prazo total do Gemini + margem é considerado abandonado
+        app.config.setdefault('PLAN_JOB_STALE_AFTER', float(os.getenv(
+            'PLAN_JOB_STALE_AFTER', str(float(os.getenv('GEMINI_DEADLINE', '45')) + 60)
+        )))
+        app.config.setdefault('PLAN_JOB_MAX_ATTEMPTS', int(os.getenv('PLAN_JOB_MAX_ATTEMPTS', '3')))
+        app.extensions['plan_job_queue'] = self
+
+    def _get_executor(self, app):
+        with self._lock:
+            if self._executor is None:
+                workers = app.config['PLAN_WORKERS']
+                if app.config['PLAN_WORKER_MODE'] == 'process':
+                    self._executor = ProcessPoolExecutor(max_workers=workers)
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='plan-worker')
+            return self._executor
+
+    def enqueue(self, user_id: int, force_fresh: bool = False) -> PlanGenerationJob:
+        """Persiste um novo job e o envia ao pool de workers"""
+        job = PlanGenerationJob(user_id=user_id, force_fresh=force_fresh)
+        db.session.add(job)
+        db.session.commit()
+
+        self.submit(job.id)
+        return job
+
+    def submit(self, job_id: str):
+        app = current_app._get_current_object()
+
+        with self._lock:
+            if job_id in self._in_flight:
+                return
+            self._in_flight.add(job_id)
+
+        executor = self._get_executor(app)
+        if app.config['PLAN_WORKER_MODE'] == 'process':
+            future = executor.submit(_run_in_process, job_id)
+        else:
+            future = executor.submit(self._run_with_context, app, job_id)
+        future.add_done_callback(lambda _: self._discard(job_id))
+
+    def ensure_scheduled(self, job: PlanGenerationJob):
+        """
+        Reenvia jobs que continuam 'queued' mas não estão no pool deste processo
+        (ex.: instância reiniciada antes de processá-los) e recupera jobs travados em
+        'running' cujo worker morreu no meio da geração
+        """
+        if job.id in self._in_flight:
+            return
+
+        if job.status == 'running' and job.started_at is not None:
+            config = current_app.config
+            stale_before = datetime.utcnow() - timedelta(seconds=config['PLAN_JOB_STALE_AFTER'])
+            if job.started_at < stale_before:
+                reclaim_stale_job(job.id, stale_before, config['PLAN_JOB_MAX_ATTEMPTS'])
+
+        if job.status == 'queued':
+            self.submit(job.id)
+
+    def _discard(self, job_id: str):
+        with self._lock:
+            self._in_flight.discard(job_id)
+
+    @staticmethod
+    def _run_with_context(app, job_id: str):
+        with app.app_context():
+            return run_generation_job(job_id)
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+plan_job_queue = PlanJobQueue()
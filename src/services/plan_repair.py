@@ -0,0 +1,167 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.services.json_stream import repair_json
+
+# Seções sem as quais o plano é completado pelo fallback
+MEAL_SECTIONS = ('breakfast', 'lunch', 'dinner')
+REQUIRED_SECTIONS = MEAL_SECTIONS + ('daily_totals',)
+
+MEAL_NAMES = {'breakfast': 'Café da manhã', 'lunch': 'Almoço', 'dinner': 'Jantar', 'snacks': 'Lanche'}
+
+
+@dataclass
+class RepairReport:
+    """O que foi preciso fazer para aproveitar a resposta da IA"""
+    repaired: bool = False  # o texto não era JSON válido e foi reparado
+    salvaged: List[str] = field(default_factory=list)  # seções corrigidas ou derivadas de outras
+    dropped: List[str] = field(default_factory=list)  # seções inválidas descartadas
+    missing: List[str] = field(default_factory=list)  # seções obrigatórias ausentes
+
+    @property
+    def clean(self) -> bool:
+        return not (self.repaired or self.salvaged or self.dropped or self.missing)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'repaired': self.repaired,
+            'salvaged': self.salvaged,
+            'dropped': self.dropped,
+            'missing': self.missing
+        }
+
+
+def _number(value) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        try:
+            return float(value.replace('R$', '').replace(',', '.').strip())
+        except ValueError:
+            return None
+    return None
+
+
+def _check_items(items) -> Tuple[List[dict], bool]:
+    """Mantém só os itens com nome ('item'); fixed=True se algum foi descartado"""
+    if not isinstance(items, list):
+        return [], items is not None
+    valid = [item for item in items if isinstance(item, dict) and item.get('item')]
+    return valid, len(valid) != len(items)
+
+
+def _check_meal(section: str, meal) -> Tuple[Optional[dict], bool]:
+    """Refeição válida (ou corrigida) e se precisou de correção; None quando não há o que aproveitar"""
+    if not isinstance(meal, dict):
+        return None, False
+
+    meal = dict(meal)
+    ingredients, fixed = _check_items(meal.get('ingredients'))
+    if not meal.get('name') and not ingredients:
+        return None, False
+    if 'ingredients' in meal:
+        meal['ingredients'] = ingredients
+    if not isinstance(meal.get('name'), str) or not meal['name']:
+        meal['name'] = MEAL_NAMES.get(section, 'Refeição')
+        fixed = True
+
+    # Totais ausentes ou inválidos são recalculados pelos ingredientes
+    for total, item_key in (('total_calories', 'calories'), ('total_cost', 'price')):
+        value = _number(meal.get(total))
+        if value is None and ingredients:
+            value = round(sum(_number(item.get(item_key)) or 0 for item in ingredients), 2)
+        if value is None:
+            meal.pop(total, None)
+            continue
+        if value != meal.get(total):
+            meal[total] = value
+            fixed = True
+
+    # Só o nome, sem ingredientes nem totais: não há refeição para aproveitar
+    if not ingredients and 'total_calories' not in meal and 'total_cost' not in meal:
+        return None, False
+    return meal, fixed
+
+
+def derive_totals(plan: Dict[str, Any]) -> Optional[dict]:
+    """Calorias e custo do dia somados das refeições do plano"""
+    meals = [plan[section] for section in MEAL_SECTIONS if section in plan]
+    meals += plan.get('snacks') or []
+    if not meals:
+        return None
+    return {
+        'total_calories': round(sum(meal.get('total_calories') or 0 for meal in meals), 2),
+        'total_cost': round(sum(meal.get('total_cost') or 0 for meal in meals), 2)
+    }
+
+
+def validate_plan(plan: Dict[str, Any]) -> Tuple[Dict[str, Any], RepairReport]:
+    """
+    Confere o plano (chaves canônicas) contra o esquema pedido no prompt: refeições com nome
+    e totais numéricos, daily_totals, lanches e lista de compras. Corrige o que dá para
+    derivar, descarta o que é inválido e aponta as seções obrigatórias ausentes.
+    """
+    report = RepairReport()
+    plan = dict(plan)
+
+    for section in MEAL_SECTIONS:
+        if section not in plan:
+            continue
+        meal, fixed = _check_meal(section, plan[section])
+        if meal is None:
+            del plan[section]
+            report.dropped.append(section)
+        else:
+            plan[section] = meal
+            if fixed:
+                report.salvaged.append(section)
+
+    if 'snacks' in plan:
+        snacks = plan['snacks']
+        checked = [_check_meal('snacks', snack) for snack in snacks] if isinstance(snacks, list) else []
+        plan['snacks'] = [meal for meal, _ in checked if meal is not None]
+        if not isinstance(snacks, list) or len(plan['snacks']) != len(snacks) or any(fixed for _, fixed in checked):
+            report.salvaged.append('snacks')
+
+    if 'shopping_list' in plan:
+        plan['shopping_list'], fixed = _check_items(plan['shopping_list'])
+        if fixed:
+            report.salvaged.append('shopping_list')
+
+    # Totais derivados só com todas as refeições: com alguma faltando, daily_totals fica ausente
+    # e é recalculado depois que o fallback completa o plano
+    totals = plan.get('daily_totals')
+    if not (isinstance(totals, dict) and _number(totals.get('total_calories')) is not None):
+        derived = derive_totals(plan) if all(section in plan for section in MEAL_SECTIONS) else None
+        if derived is not None:
+            plan['daily_totals'] = dict(totals, **derived) if isinstance(totals, dict) else derived
+            report.salvaged.append('daily_totals')
+        elif 'daily_totals' in plan:
+            del plan['daily_totals']
+            report.dropped.append('daily_totals')
+
+    report.missing = [section for section in REQUIRED_SECTIONS if section not in plan]
+    return plan, report
+
+
+def salvage_plan(text: str, template=None) -> Tuple[Optional[Dict[str, Any]], RepairReport]:
+    """
+    Aproveita o máximo da resposta da IA: extrai/repara o JSON (markdown, truncamento),
+    expande as chaves curtas do template e valida o plano.
+    Retorna (None, relatório) quando o texto não tem nenhum objeto JSON.
+    """
+    raw, repaired, truncated = repair_json(text)
+    if raw is None:
+        return None, RepairReport(repaired=False, missing=list(REQUIRED_SECTIONS))
+
+    if template is not None:
+        raw = template.expand(raw)
+    plan, report = validate_plan(raw)
+    report.repaired = repaired
+    # A última seção do texto é a que foi cortada pelo truncamento
+    cut = next(reversed(raw), None) if truncated else None
+    if cut in plan and cut not in report.salvaged:
+        report.salvaged.append(cut)
+    return plan, report
@@ -0,0 +1,139 @@
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from src.models.nutriai_models import db, DietPlan, NutritionistStats, SystemCounter
+
+TOTAL_PLANS = 'total_plans'
+PENDING_PLANS = 'pending_plans'
+
+# Coluna de NutritionistStats incrementada para cada status final
+STATUS_COLUMNS = {'approved': 'approvals', 'rejected': 'rejections'}
+
+# Bancos com INSERT ... ON CONFLICT DO UPDATE
+UPSERT_DIALECTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+
+def _increment(model, keys: Dict[str, object], deltas: Dict[str, int]):
+    """
+    Soma deltas às colunas da linha, criando-a se ainda não existir, sem corrida entre
+    transações concorrentes: upsert atômico no SQLite/Postgres; nos demais bancos,
+    INSERT num savepoint que vira UPDATE se outra transação criou a linha antes.
+    """
+    table = model.__table__
+    increments = {name: table.c[name] + delta for name, delta in deltas.items()}
+    if 'updated_at' in table.c:
+        increments['updated_at'] = datetime.utcnow()
+    initial = dict(keys, **{name: max(delta, 0) for name, delta in deltas.items()})
+
+    insert = UPSERT_DIALECTS.get(db.session.get_bind().dialect.name)
+    if insert is not None:
+        db.session.execute(
+            insert(table).values(**initial).on_conflict_do_update(index_elements=list(keys), set_=increments)
+        )
+        return
+
+    update = table.update().where(*(table.c[name] == value for name, value in keys.items())).values(**increments)
+    if db.session.execute(update).rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.execute(table.insert().values(**initial))
+    except IntegrityError:
+        db.session.execute(update)
+
+
+def _add_to_counter(name: str, delta: int):
+    _increment(SystemCounter, {'name': name}, {'value': delta})
+
+
+def _add_to_stats(nutritionist_id: int, status: str, patients_delta: int, sign: int):
+    deltas = {'validations': sign, 'unique_patients': patients_delta}
+    if status in STATUS_COLUMNS:
+        deltas[STATUS_COLUMNS[status]] = sign
+    _increment(NutritionistStats, {'nutritionist_id': nutritionist_id}, deltas)
+
+
+def _has_other_validated_plan(nutritionist_id: int, user_id: int, plan_id: int) -> bool:
+    return db.session.query(
+        DietPlan.query.filter(
+            DietPlan.nutritionist_id == nutritionist_id,
+            DietPlan.user_id == user_id,
+            DietPlan.id != plan_id
+        ).exists()
+    ).scalar()
+
+
+def record_plan_created(plan: DietPlan):
+    """Atualiza os contadores globais na mesma transação da criação do plano"""
+    _add_to_counter(TOTAL_PLANS, 1)
+    if (plan.status or 'pending') == 'pending':
+        _add_to_counter(PENDING_PLANS, 1)
+
+
+def record_validation(plan: DietPlan, previous_status: Optional[str], previous_nutritionist_id: Optional[int]):
+    """
+    Aplica a transição de status do plano às estatísticas (mesma transação do validate_plan).
+    Chamar depois de alterar plan.status/plan.nutritionist_id e antes do commit.
+    """
+    if (previous_status or 'pending') == 'pending' and plan.status != 'pending':
+        _add_to_counter(PENDING_PLANS, -1)
+
+    # Revalidação: retira o plano das estatísticas do nutricionista anterior
+    if previous_nutritionist_id is not None:
+        had_patient = _has_other_validated_plan(previous_nutritionist_id, plan.user_id, plan.id)
+        _add_to_stats(previous_nutritionist_id, previous_status, 0 if had_patient else -1, -1)
+
+    has_patient = _has_other_validated_plan(plan.nutritionist_id, plan.user_id, plan.id)
+    _add_to_stats(plan.nutritionist_id, plan.status, 0 if has_patient else 1, 1)
+
+
+def get_counters() -> Dict[str, int]:
+    counters = {TOTAL_PLANS: 0, PENDING_PLANS: 0}
+    for counter in SystemCounter.query.filter(SystemCounter.name.in_(counters)).all():
+        counters[counter.name] = counter.value
+    return counters
+
+
+def rebuild_stats(conn) -> Dict[str, int]:
+    """Recalcula do zero as estatísticas e contadores a partir de diet_plans (em uma conexão/transação)"""
+    plans = DietPlan.__table__
+    stats = NutritionistStats.__table__
+    counters = SystemCounter.__table__
+
+    rows = conn.execute(
+        select(
+            plans.c.nutritionist_id,
+            func.count().label('validations'),
+            func.sum((plans.c.status == 'approved').cast(db.Integer)).label('approvals'),
+            func.sum((plans.c.status == 'rejected').cast(db.Integer)).label('rejections'),
+            func.count(plans.c.user_id.distinct()).label('unique_patients')
+        ).where(plans.c.nutritionist_id.isnot(None)).group_by(plans.c.nutritionist_id)
+    ).fetchall()
+
+    total = conn.execute(select(func.count()).select_from(plans)).scalar()
+    pending = conn.execute(select(func.count()).select_from(plans).where(plans.c.status == 'pending')).scalar()
+
+    conn.execute(stats.delete())
+    if rows:
+        conn.execute(stats.insert(), [
+            {
+                'nutritionist_id': row.nutritionist_id,
+                'validations': row.validations,
+                'approvals': row.approvals or 0,
+                'rejections': row.rejections or 0,
+                'unique_patients': row.unique_patients
+            }
+            for row in rows
+        ])
+
+    conn.execute(counters.delete().where(counters.c.name.in_([TOTAL_PLANS, PENDING_PLANS])))
+    conn.execute(counters.insert(), [
+        {'name': TOTAL_PLANS, 'value': total},
+        {'name': PENDING_PLANS, 'value': pending}
+    ])
+
+    return {'nutritionists': len(rows), TOTAL_PLANS: total, PENDING_PLANS: pending}
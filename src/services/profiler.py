@@ -0,0 +1,178 @@
+import cProfile
+import json
+import os
+import random
+import re
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+# Normalização das consultas: literais e listas de IN viram "?" para agrupar repetições
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*(?:\?|%\(\w+\)s|:\w+|__\[POSTCOMPILE_\w+\])\s*,?)+\)', re.I)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def fingerprint(statement: str) -> str:
+    """Forma normalizada da consulta, igual para execuções que só mudam os parâmetros"""
+    statement = _STRING_LITERAL.sub('?', statement)
+    statement = _NUMBER_LITERAL.sub('?', statement)
+    statement = _IN_LIST.sub('IN (?)', statement)
+    return _WHITESPACE.sub(' ', statement).strip()
+
+
+class RequestProfile:
+    """Consultas SQL de uma requisição, agrupadas por fingerprint"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.statements = 0
+        self.db_time = 0.0
+        self.counts = Counter()
+        self.times = Counter()
+
+    def record(self, statement: str, seconds: float):
+        key = fingerprint(statement)
+        self.statements += 1
+        self.db_time += seconds
+        self.counts[key] += 1
+        self.times[key] += seconds
+
+    def repeated(self, threshold: int):
+        """Fingerprints executados `threshold` vezes ou mais: suspeitos de N+1"""
+        return [(key, count) for key, count in self.counts.most_common() if count >= threshold]
+
+    def summary(self, threshold: int) -> dict:
+        return {
+            'statements': self.statements,
+            'db_time_ms': round(self.db_time * 1000, 3),
+            'n_plus_one': [{'fingerprint': key, 'count': count} for key, count in self.repeated(threshold)],
+            'queries': [
+                {'fingerprint': key, 'count': count, 'time_ms': round(self.times[key] * 1000, 3)}
+                for key, count in self.counts.most_common()
+            ]
+        }
+
+
+class RequestProfiler:
+    """
+    Perfil por requisição (desligado por padrão, PROFILER_ENABLED=true ou app em debug):
+    conta consultas e tempo em SQL, aponta consultas repetidas (N+1), envia o header
+    Server-Timing e grava dumps do cProfile em PROFILE_DIR por amostragem
+    (PROFILE_SAMPLE_RATE) ou quando a requisição traz o header X-Profile.
+    """
+
+    def __init__(self, app=None, db=None):
+        self.app = None
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        app.config.setdefault('PROFILER_ENABLED', os.getenv('PROFILER_ENABLED', 'false').lower() == 'true')
+        app.config.setdefault('PROFILER_N1_THRESHOLD', int(os.getenv('PROFILER_N1_THRESHOLD', '5')))
+        app.config.setdefault('PROFILE_SAMPLE_RATE', float(os.getenv('PROFILE_SAMPLE_RATE', '0')))
+        app.config.setdefault('PROFILE_DIR', os.getenv('PROFILE_DIR') or os.path.join(app.instance_path, 'profiles'))
+        # Se definido, X-Profile precisa trazer este valor (evita que qualquer cliente ligue o cProfile)
+        app.config.setdefault('PROFILE_TOKEN', os.getenv('PROFILE_TOKEN'))
+        app.extensions['request_profiler'] = self
+        self.app = app
+
+        if not (app.config['PROFILER_ENABLED'] or app.debug):
+            return
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def _wants_cprofile(self) -> bool:
+        header = request.headers.get('X-Profile')
+        if header:
+            token = self.app.config['PROFILE_TOKEN']
+            return header == token if token else header.lower() in ('1', 'true')
+        rate = self.app.config['PROFILE_SAMPLE_RATE']
+        return rate > 0 and random.random() < rate
+
+    def _before_request(self):
+        g._request_profile = RequestProfile()
+        if self._wants_cprofile():
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+                g._cprofile = profiler
+            except ValueError:
+                pass  # outro profiler já está ativo nesta thread
+
+    def _after_request(self, response):
+        profile = g.get('_request_profile')
+        if profile is None:
+            return response
+
+        total_ms = (time.perf_counter() - profile.started) * 1000
+        response.headers.add(
+            'Server-Timing', f'db;dur={profile.db_time * 1000:.2f};desc="{profile.statements} queries"'
+        )
+        response.headers.add('Server-Timing', f'app;dur={total_ms:.2f}')
+
+        threshold = self.app.config['PROFILER_N1_THRESHOLD']
+        route = request.url_rule.rule if request.url_rule is not None else request.path
+        for key, count in profile.repeated(threshold):
+            print(f"⚠️ Possível N+1 em {request.method} {route}: {count}x {key[:160]}")
+
+        profiler = g.pop('_cprofile', None)
+        if profiler is not None:
+            profiler.disable()
+            path = self._dump(profiler, profile, route, total_ms)
+            response.headers['X-Profile-Dump'] = os.path.basename(path)
+        return response
+
+    def _teardown_request(self, error=None):
+        # Requisição abortada antes do after_request: garante que o cProfile é desligado
+        profiler = g.pop('_cprofile', None)
+        if profiler is not None:
+            profiler.disable()
+
+    def _dump(self, profiler, profile, route, total_ms) -> str:
+        """Grava <PROFILE_DIR>/<timestamp>-<método>-<rota>.prof e o resumo do SQL em .json"""
+        directory = self.app.config['PROFILE_DIR']
+        os.makedirs(directory, exist_ok=True)
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') or 'root'
+        base = os.path.join(directory, f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{request.method}-{slug}")
+
+        profiler.dump_stats(base + '.prof')
+        with open(base + '.json', 'w', encoding='utf-8') as f:
+            json.dump({
+                'method': request.method,
+                'path': request.full_path.rstrip('?'),
+                'route': route,
+                'total_ms': round(total_ms, 3),
+                **profile.summary(self.app.config['PROFILER_N1_THRESHOLD'])
+            }, f, indent=2, ensure_ascii=False)
+        return base + '.prof'
+
+    # SQL
+
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_profiler_started', []).append(time.perf_counter())
+
+    @staticmethod
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get('_profiler_started')
+        if not stack:
+            return
+        elapsed = time.perf_counter() - stack.pop()
+        profile = g.get('_request_profile') if has_request_context() else None
+        if profile is not None:
+            profile.record(statement, elapsed)
+
+
+request_profiler = RequestProfiler()
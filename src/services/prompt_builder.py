@@ -0,0 +1,400 @@
+import math
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Estimativa de tokens sem chamar a API (count_tokens custa uma requisição): ~4 caracteres por token
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+@dataclass(frozen=True)
+class Section:
+    """Trecho do prompt; priority 0 é obrigatório, os maiores são cortados primeiro"""
+    name: str
+    render: Callable[[Dict[str, Any]], str]
+    priority: int = 0
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    name: str
+    version: int
+    sections: Tuple[Section, ...]
+    token_budget: int = 0  # 0 = sem limite
+    max_output_tokens: Optional[int] = None
+    # Chaves curtas da resposta -> (chave canônica, esquema do valor)
+    response_keys: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def key(self) -> str:
+        return f'{self.name}-v{self.version}'
+
+    def expand_section(self, name: str, value: Any) -> Tuple[str, Any]:
+        """Converte uma seção de primeiro nível da resposta para as chaves canônicas do plano"""
+        if name in self.response_keys:
+            canonical, schema = self.response_keys[name]
+            return canonical, _expand(value, schema)
+        return name, value
+
+    def expand(self, plan: Dict[str, Any]) -> Dict[str, Any]:
+        if not self.response_keys or not isinstance(plan, dict):
+            return plan
+        return dict(self.expand_section(name, value) for name, value in plan.items())
+
+
+def _expand(value, schema):
+    if isinstance(schema, list) and isinstance(value, list):
+        return [_expand(item, schema[0]) for item in value]
+    if isinstance(schema, dict) and isinstance(value, dict):
+        expanded = {}
+        for key, item in value.items():
+            canonical, child = schema.get(key, (key, None))
+            expanded[canonical] = _expand(item, child)
+        return expanded
+    return value
+
+
+@dataclass
+class BuiltPrompt:
+    text: str
+    template: PromptTemplate
+    variant: str
+    tokens: int
+    section_tokens: Dict[str, int]
+    dropped: List[str]
+
+
+def prompt_context(user_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Valores usados pelos templates, com os mesmos padrões do prompt original"""
+    family_conditions = []
+    if user_data.get('family_diabetes'): family_conditions.append('diabetes')
+    if user_data.get('family_hypertension'): family_conditions.append('hipertensão')
+    if user_data.get('family_obesity'): family_conditions.append('obesidade')
+    if user_data.get('family_heart_disease'): family_conditions.append('problemas cardíacos')
+
+    # O nome do paciente não vai para a IA: não muda o plano e é dado pessoal
+    return {
+        'age': user_data.get('age', 30),
+        'weight': user_data.get('weight', 70),
+        'height': user_data.get('height', 170),
+        'goal': user_data.get('goal', 'Manter peso'),
+        'budget': user_data.get('budget_per_meal', 25),
+        'restrictions': user_data.get('dietary_restrictions', 'Nenhuma'),
+        'bmr': user_data.get('bmr', 1500),
+        'tdee': user_data.get('tdee', 2000),
+        'target_calories': user_data.get('target_calories', 1800),
+        'macros': user_data.get('macros') or {},
+        'sleep_hours': user_data.get('sleep_hours', 8),
+        'stress_level': user_data.get('stress_level', 5),
+        'exercise_frequency': user_data.get('exercise_frequency', 0),
+        'water_intake': user_data.get('daily_water_intake', 8),
+        'family_conditions': family_conditions
+    }
+
+
+# Template "full": o prompt original, com o exemplo de JSON completo e seções em prosa
+
+def _full_schema(c):
+    budget, macros = c['budget'], c['macros']
+    return f"""FORMATO DE RESPOSTA (JSON):
+{{
+  "breakfast": {{
+    "name": "Nome da refeição",
+    "ingredients": [
+      {{"item": "Ingrediente", "quantity": "100g", "price": 2.50, "calories": 150, "protein": 10, "carbs": 15, "fat": 5}}
+    ],
+    "preparation": "Modo de preparo detalhado",
+    "total_calories": 300,
+    "total_cost": 8.50,
+    "macros": {{"protein": 20, "carbs": 35, "fat": 12}},
+    "timing": "7h00 - Otimiza metabolismo matinal"
+  }},
+  "lunch": {{
+    "name": "Nome da refeição",
+    "ingredients": [...],
+    "preparation": "Modo de preparo",
+    "total_calories": 500,
+    "total_cost": {budget},
+    "macros": {{"protein": 35, "carbs": 45, "fat": 18}},
+    "timing": "12h00 - Pico energético do dia"
+  }},
+  "dinner": {{
+    "name": "Nome da refeição",
+    "ingredients": [...],
+    "preparation": "Modo de preparo",
+    "total_calories": 400,
+    "total_cost": {budget * 0.8},
+    "macros": {{"protein": 30, "carbs": 25, "fat": 15}},
+    "timing": "19h00 - Facilita digestão noturna"
+  }},
+  "snacks": [
+    {{
+      "name": "Lanche",
+      "ingredients": [...],
+      "total_calories": 150,
+      "total_cost": 5.00,
+      "timing": "15h00 - Sustenta energia"
+    }}
+  ],
+  "daily_totals": {{
+    "total_calories": {c['target_calories']},
+    "total_cost": {budget * 3},
+    "protein_g": {macros.get('protein_g', 100)},
+    "carbs_g": {macros.get('carb_g', 200)},
+    "fat_g": {macros.get('fat_g', 70)},
+    "fiber_g": 25,
+    "sodium_mg": 2000
+  }},
+  "shopping_list": [
+    {{"item": "Frango (peito)", "quantity": "1kg", "estimated_price": 18.00, "where_to_buy": "Açougue local"}},
+    {{"item": "Arroz integral", "quantity": "1kg", "estimated_price": 8.50, "where_to_buy": "Supermercado"}}
+  ],
+  "nutritionist_notes": {{
+    "metabolic_analysis": "Análise baseada em TMB {c['bmr']} e TDEE {c['tdee']}",
+    "family_prevention": "Considerações preventivas baseadas no histórico familiar",
+    "lifestyle_adaptations": "Adaptações para estilo de vida e rotina",
+    "supplement_recommendations": "Suplementos recomendados se necessário",
+    "monitoring_tips": "Como monitorar progresso e ajustar"
+  }},
+  "scientific_rationale": {{
+    "caloric_distribution": "Justificativa da distribuição calórica",
+    "macro_rationale": "Por que essa distribuição de macronutrientes",
+    "timing_science": "Base científica do timing nutricional",
+    "ingredient_selection": "Critérios científicos para seleção de ingredientes"
+  }}
+}}
+"""
+
+
+FULL = PromptTemplate(
+    name='full',
+    version=3,
+    sections=(
+        Section('intro', lambda c: """
+Você é um nutricionista especialista em nutrição científica. Crie um plano alimentar personalizado baseado na análise científica completa do paciente.
+"""),
+        Section('patient', lambda c: f"""DADOS DO PACIENTE:
+- Idade: {c['age']} anos
+- Peso: {c['weight']} kg
+- Altura: {c['height']} cm
+- Objetivo: {c['goal']}
+- Orçamento por refeição: R$ {c['budget']}
+- Restrições alimentares: {c['restrictions']}
+"""),
+        Section('metabolic', lambda c: f"""ANÁLISE METABÓLICA:
+- TMB (Taxa Metabólica Basal): {c['bmr']} kcal
+- TDEE (Gasto Energético Total): {c['tdee']} kcal
+- Meta calórica diária: {c['target_calories']} kcal
+- Distribuição de macros: {c['macros']}
+"""),
+        Section('lifestyle', lambda c: f"""ESTILO DE VIDA:
+- Horas de sono: {c['sleep_hours']}h
+- Nível de estresse (1-10): {c['stress_level']}
+- Exercícios por semana: {c['exercise_frequency']}
+- Consumo de água: {c['water_intake']} copos/dia
+""", priority=2),
+        Section('family', lambda c: f"""HISTÓRICO FAMILIAR:
+- Condições familiares: {', '.join(c['family_conditions']) if c['family_conditions'] else 'Nenhuma'}
+""", priority=1),
+        Section('instructions', lambda c: f"""INSTRUÇÕES PARA O PLANO:
+1. Respeite RIGOROSAMENTE o orçamento de R$ {c['budget']} por refeição
+2. Use preços reais do mercado brasileiro (2025)
+3. Considere as condições familiares para prevenção
+4. Adapte às necessidades metabólicas calculadas
+5. Inclua timing nutricional adequado
+6. Considere biodisponibilidade dos nutrientes
+7. Forneça lista de compras com preços estimados
+""", priority=3),
+        Section('schema', _full_schema),
+        Section('closing', lambda c: """Gere um plano completo, científico e dentro do orçamento especificado.
+"""),
+    )
+)
+
+
+# Template "compact": instruções curtas e resposta com chaves curtas (expandidas ao receber)
+
+_MACROS = {'p': ('protein', None), 'c': ('carbs', None), 'f': ('fat', None)}
+_INGREDIENT = {'it': ('item', None), 'q': ('quantity', None), 'pr': ('price', None), 'kc': ('calories', None),
+               'p': ('protein', None), 'c': ('carbs', None), 'f': ('fat', None)}
+_MEAL = {'n': ('name', None), 'i': ('ingredients', [_INGREDIENT]), 'pp': ('preparation', None),
+         'tc': ('total_calories', None), 'tp': ('total_cost', None), 'm': ('macros', _MACROS), 'tm': ('timing', None)}
+COMPACT_RESPONSE_KEYS = {
+    'pt': ('plan_type', None),
+    'b': ('breakfast', _MEAL),
+    'l': ('lunch', _MEAL),
+    'd': ('dinner', _MEAL),
+    's': ('snacks', [_MEAL]),
+    't': ('daily_totals', {'tc': ('total_calories', None), 'tp': ('total_cost', None), 'p': ('protein_g', None),
+                           'c': ('carbs_g', None), 'f': ('fat_g', None)}),
+    'sl': ('shopping_list', [{'it': ('item', None), 'q': ('quantity', None), 'ep': ('estimated_price', None)}]),
+    'nn': ('nutritionist_notes', {'ma': ('metabolic_analysis', None), 'fp': ('family_prevention', None),
+                                  'la': ('lifestyle_adaptations', None), 'mt': ('monitoring_tips', None)}),
+    'sr': ('scientific_rationale', {'cd': ('caloric_distribution', None), 'mr': ('macro_rationale', None)})
+}
+
+
+def _compact_schema(c):
+    return """Responda SOMENTE com JSON minificado, sem markdown, com estas chaves:
+{"pt":"tipo do plano","b":REFEIÇÃO,"l":REFEIÇÃO,"d":REFEIÇÃO,"s":[REFEIÇÃO],"t":{"tc":kcal,"tp":custo,"p":g,"c":g,"f":g},"sl":[{"it":"item","q":"1kg","ep":preço}]}
+REFEIÇÃO = {"n":"nome","i":[{"it":"ingrediente","q":"100g","pr":preço,"kc":kcal}],"pp":"preparo curto","tc":kcal,"tp":custo,"m":{"p":g,"c":g,"f":g},"tm":"7h00"}
+"""
+
+
+def _compact_family(c):
+    if not c['family_conditions']:
+        return ''
+    return f"Histórico familiar: {', '.join(c['family_conditions'])} (priorize prevenção)\n"
+
+
+COMPACT = PromptTemplate(
+    name='compact',
+    version=2,
+    token_budget=700,
+    max_output_tokens=2048,
+    response_keys=COMPACT_RESPONSE_KEYS,
+    sections=(
+        Section('intro', lambda c: "Nutricionista científico: crie um plano alimentar de 1 dia para o paciente.\n"),
+        Section('patient', lambda c: f"""PACIENTE: {c['age']} anos, {c['weight']} kg, {c['height']} cm
+Objetivo: {c['goal']}
+Orçamento por refeição: R$ {c['budget']}
+Restrições: {c['restrictions']}
+"""),
+        Section('metabolic', lambda c: f"""TMB {c['bmr']} kcal, TDEE {c['tdee']} kcal
+Meta calórica diária: {c['target_calories']} kcal
+Macros (g): proteína {c['macros'].get('protein_g', 100)}, carboidratos {c['macros'].get('carb_g', 200)}, gordura {c['macros'].get('fat_g', 70)}
+"""),
+        Section('lifestyle', lambda c: f"Sono {c['sleep_hours']}h, estresse {c['stress_level']}/10, "
+                                       f"exercício {c['exercise_frequency']}, água {c['water_intake']} copos/dia\n",
+                priority=2),
+        Section('family', _compact_family, priority=1),
+        Section('instructions', lambda c: "Regras: preços reais do mercado brasileiro, orçamento por refeição "
+                                          "respeitado, totais coerentes com a meta.\n", priority=3),
+        Section('schema', _compact_schema),
+    )
+)
+
+# Seções em prosa, pedidas no modo compacto só com GEMINI_PROMPT_RATIONALE=true
+RATIONALE = Section('rationale', lambda c: 'Inclua também "nn":{"ma","fp","la","mt"} e "sr":{"cd","mr"} '
+                                           'com uma frase curta em cada campo.\n', priority=4)
+
+TEMPLATES = {template.name: template for template in (FULL, COMPACT)}
+
+
+class PromptStats:
+    """Tokens por seção e latência por variante de template, para /api/status"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def _entry(self, variant):
+        return self._stats.setdefault(variant, {
+            'prompts': 0, 'prompt_tokens': 0, 'sections': {}, 'dropped': {},
+            'calls': 0, 'failures': 0, 'latency': 0.0, 'response_tokens': 0
+        })
+
+    def record_prompt(self, built: BuiltPrompt):
+        with self._lock:
+            entry = self._entry(built.variant)
+            entry['prompts'] += 1
+            entry['prompt_tokens'] += built.tokens
+            for name, tokens in built.section_tokens.items():
+                entry['sections'][name] = entry['sections'].get(name, 0) + tokens
+            for name in built.dropped:
+                entry['dropped'][name] = entry['dropped'].get(name, 0) + 1
+
+    def record_response(self, variant: str, seconds: float, text: Optional[str]):
+        """text=None registra uma falha"""
+        with self._lock:
+            entry = self._entry(variant)
+            entry['calls'] += 1
+            entry['latency'] += seconds
+            if text is None:
+                entry['failures'] += 1
+            else:
+                entry['response_tokens'] += estimate_tokens(text)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            result = {}
+            for variant, entry in self._stats.items():
+                prompts, calls = entry['prompts'] or 1, entry['calls'] or 1
+                succeeded = (entry['calls'] - entry['failures']) or 1
+                result[variant] = {
+                    'prompts': entry['prompts'],
+                    'avg_prompt_tokens': round(entry['prompt_tokens'] / prompts, 1),
+                    'avg_section_tokens': {name: round(tokens / prompts, 1) for name, tokens in entry['sections'].items()},
+                    'dropped_sections': dict(entry['dropped']),
+                    'calls': entry['calls'],
+                    'failures': entry['failures'],
+                    'avg_latency_ms': round(entry['latency'] / calls * 1000, 1),
+                    'avg_response_tokens': round(entry['response_tokens'] / succeeded, 1)
+                }
+            return result
+
+
+prompt_stats = PromptStats()
+
+
+class PromptBuilder:
+    """
+    Monta o prompt a partir de um template versionado (GEMINI_PROMPT_TEMPLATE: compact ou full)
+    respeitando o orçamento de tokens: seções opcionais são cortadas, da maior prioridade
+    para a menor, até caber em GEMINI_PROMPT_TOKEN_BUDGET (padrão do template).
+    """
+
+    def __init__(self, template: Optional[str] = None, token_budget: Optional[int] = None,
+                 rationale: Optional[bool] = None):
+        name = template or os.getenv('GEMINI_PROMPT_TEMPLATE', 'compact')
+        if name not in TEMPLATES:
+            raise ValueError(f'GEMINI_PROMPT_TEMPLATE inválido: {name} (use {", ".join(TEMPLATES)})')
+        self.template = TEMPLATES[name]
+
+        if token_budget is None:
+            token_budget = int(os.getenv('GEMINI_PROMPT_TOKEN_BUDGET', str(self.template.token_budget)))
+        self.token_budget = token_budget
+
+        if rationale is None:
+            rationale = os.getenv('GEMINI_PROMPT_RATIONALE', 'false').lower() == 'true'
+        # O template full sempre pede as seções em prosa
+        self.rationale = rationale and self.template.name != 'full'
+
+    @property
+    def variant(self) -> str:
+        """Identifica o formato da resposta; entra na chave do cache de planos"""
+        return self.template.key + ('+rationale' if self.rationale else '')
+
+    def build(self, user_data: Dict[str, Any]) -> BuiltPrompt:
+        context = prompt_context(user_data)
+        sections = list(self.template.sections)
+        if self.rationale:
+            sections.append(RATIONALE)
+
+        rendered = [(section, section.render(context)) for section in sections]
+        rendered = [(section, text) for section, text in rendered if text]
+        dropped = []
+
+        if self.token_budget:
+            total = sum(estimate_tokens(text) for _, text in rendered)
+            for section, text in sorted(rendered, key=lambda item: -item[0].priority):
+                if total <= self.token_budget or section.priority == 0:
+                    break
+                rendered.remove((section, text))
+                dropped.append(section.name)
+                total -= estimate_tokens(text)
+
+        text = '\n'.join(text for _, text in rendered)
+        return BuiltPrompt(
+            text=text,
+            template=self.template,
+            variant=self.variant,
+            tokens=estimate_tokens(text),
+            section_tokens={section.name: estimate_tokens(text) for section, text in rendered},
+            dropped=dropped
+        )
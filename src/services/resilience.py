@@ -0,0 +1,187 @@
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Callable, Iterable, Iterator, Optional, TypeVar
+
+T = TypeVar('T')
+
+# Erros considerados temporários (nomes das classes em google.api_core.exceptions e builtins)
+TRANSIENT_ERRORS = {
+    'TimeoutError', 'ConnectionError', 'DeadlineExceeded', 'ServiceUnavailable',
+    'InternalServerError', 'TooManyRequests', 'ResourceExhausted', 'Aborted', 'BadGateway',
+    'GatewayTimeout', 'RetryError'
+}
+
+
+class CircuitOpenError(Exception):
+    """Chamada recusada porque o circuito está aberto"""
+
+
+def is_transient_error(error: Exception) -> bool:
+    return any(cls.__name__ in TRANSIENT_ERRORS for cls in type(error).__mro__)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker thread-safe: após `failure_threshold` falhas consecutivas o circuito
+    abre e recusa chamadas por `reset_timeout` segundos; depois libera uma chamada de teste
+    (half-open) que decide se fecha ou reabre.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_progress = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._trial_in_progress = False
+            # Half-open: apenas uma chamada de teste por vez
+            if self._trial_in_progress:
+                return False
+            self._trial_in_progress = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_progress = False
+
+    def release_trial(self):
+        """Libera a chamada de teste do half-open sem registrar resultado"""
+        with self._lock:
+            self._trial_in_progress = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_progress = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """Backoff exponencial com jitter completo"""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+def call_with_timeout(executor: ThreadPoolExecutor, fn: Callable[[], T], timeout: float) -> T:
+    """
+    Executa fn em uma thread do executor e aguarda no máximo `timeout` segundos.
+    Se o prazo estourar, a chamada é abandonada (a thread termina sozinha) e TimeoutError é lançado.
+    """
+    future = executor.submit(fn)
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        future.cancel()
+        raise TimeoutError(f'Chamada excedeu o prazo de {timeout:.1f}s')
+
+
+def iter_with_timeout(executor: ThreadPoolExecutor, factory: Callable[[], Iterable[T]],
+                      idle_timeout: float, deadline: float) -> Iterator[T]:
+    """
+    Consome o iterável criado por factory() em uma thread do executor, repassando os itens.
+    Lança TimeoutError se nenhum item chegar em `idle_timeout` segundos
+    ou se o total ultrapassar `deadline` segundos.
+    """
+    items = queue.Queue()
+    finished = object()
+    cancelled = threading.Event()
+
+    def produce():
+        try:
+            for item in factory():
+                if cancelled.is_set():
+                    return
+                items.put((True, item))
+            items.put((True, finished))
+        except Exception as e:
+            items.put((False, e))
+
+    executor.submit(produce)
+    expires_at = time.monotonic() + deadline
+
+    try:
+        while True:
+            remaining = expires_at - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError('Prazo total do streaming esgotado')
+            try:
+                ok, item = items.get(timeout=min(idle_timeout, remaining))
+            except queue.Empty:
+                raise TimeoutError(f'Nenhum dado recebido em {idle_timeout:.1f}s')
+            if not ok:
+                raise item
+            if item is finished:
+                return
+            yield item
+    finally:
+        cancelled.set()
+
+
+def call_with_retry(fn: Callable[[float], T], *, max_retries: int, base_delay: float, max_delay: float,
+                    deadline: float, breaker: Optional[CircuitBreaker] = None) -> T:
+    """
+    Chama fn(remaining_seconds) com retry exponencial em erros temporários,
+    respeitando o prazo total `deadline` (segundos) e o circuit breaker.
+    """
+    expires_at = time.monotonic() + deadline
+    attempt = 0
+
+    while True:
+        if breaker is not None and not breaker.allow():
+            raise CircuitOpenError('Circuito aberto: serviço indisponível')
+
+        remaining = expires_at - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError('Prazo total da chamada esgotado')
+
+        try:
+            result = fn(remaining)
+        except Exception as e:
+            if not is_transient_error(e):
+                # Erro da requisição ou do nosso código (bloqueio de segurança, 400...): o serviço
+                # respondeu, então não conta para abrir o circuito
+                if breaker is not None:
+                    breaker.release_trial()
+                raise
+            if breaker is not None:
+                breaker.record_failure()
+            if attempt >= max_retries:
+                raise
+            delay = backoff_delay(attempt, base_delay, max_delay)
+            if time.monotonic() + delay >= expires_at:
+                raise
+            time.sleep(delay)
+            attempt += 1
+            continue
+
+        if breaker is not None:
+            breaker.record_success()
+        return result
@@ -0,0 +1,248 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import shutil
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from flask import Response, abort, request
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional: pip install brotli
+    brotli = None
+
+COMPRESSIBLE_TYPES = {
+    'text/html', 'text/css', 'text/javascript', 'application/javascript', 'application/json',
+    'image/svg+xml', 'text/plain', 'application/manifest+json'
+}
+# Preferência do servidor quando o cliente aceita mais de uma codificação
+ENCODINGS = ('br', 'gzip')
+SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+# Arquivos com hash de conteúdo no nome (app.3f9a1c2b7d.js) nunca mudam: cache de 1 ano
+HASHED_NAME = re.compile(r'\.[0-9a-f]{8,}\.[A-Za-z0-9]+$')
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE = 'no-cache'
+
+
+@dataclass
+class Asset:
+    path: str
+    mtime: float
+    mimetype: str
+    digest: str
+    variants: Dict[str, bytes] = field(default_factory=dict)
+
+    def etag(self, encoding: str) -> str:
+        # ETag forte e distinto por codificação: bytes diferentes, tags diferentes
+        return self.digest if encoding == 'identity' else f'{self.digest}-{encoding}'
+
+
+def _mimetype(path: str) -> str:
+    return mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+
+def _compress(data: bytes, encoding: str) -> bytes:
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    return brotli.compress(data, quality=11)
+
+
+def _available_encodings() -> List[str]:
+    return [encoding for encoding in ENCODINGS if encoding != 'br' or brotli is not None]
+
+
+def negotiate(accept_encoding: str, available) -> str:
+    """Escolhe a codificação pelo Accept-Encoding (respeitando q=0) entre as disponíveis"""
+    accepted = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        match = re.search(r'q=([0-9.]+)', params)
+        if match:
+            try:
+                quality = float(match.group(1))
+            except ValueError:
+                quality = 0.0
+        accepted[name] = quality
+
+    candidates = [
+        encoding for encoding in ENCODINGS
+        if encoding in available and accepted.get(encoding, accepted.get('*', 0)) > 0
+    ]
+    if not candidates:
+        return 'identity'
+    return max(candidates, key=lambda encoding: accepted.get(encoding, accepted.get('*', 0)))
+
+
+class StaticAssets:
+    """
+    Serve os arquivos estáticos com variantes gzip/brotli, ETag forte por codificação,
+    respostas 304 e cache imutável para nomes com hash.
+    Usa a saída de `flask assets build` (STATIC_BUILD_DIR) quando existir; senão comprime
+    os arquivos de static/ em memória na primeira requisição de cada um.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._assets: Dict[str, Asset] = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('STATIC_BUILD_DIR', os.getenv('STATIC_BUILD_DIR') or os.path.join(app.static_folder, 'dist'))
+        app.config.setdefault('STATIC_COMPRESS_MIN_SIZE', int(os.getenv('STATIC_COMPRESS_MIN_SIZE', '1024')))
+        app.extensions['static_assets'] = self
+        app.view_functions['static'] = self.send
+        self.app = app
+
+    @property
+    def root(self) -> str:
+        build_dir = self.app.config['STATIC_BUILD_DIR']
+        if os.path.isfile(os.path.join(build_dir, 'index.html')):
+            return build_dir
+        return self.app.static_folder
+
+    def _load(self, filename: str) -> Optional[Asset]:
+        path = safe_join(self.root, filename)
+        if path is None or not os.path.isfile(path):
+            return None
+
+        mtime = os.path.getmtime(path)
+        asset = self._assets.get(path)
+        if asset is not None and asset.mtime == mtime:
+            return asset
+
+        with open(path, 'rb') as f:
+            data = f.read()
+        asset = Asset(
+            path=path,
+            mtime=mtime,
+            mimetype=_mimetype(path),
+            digest=hashlib.sha256(data).hexdigest()[:32],
+            variants={'identity': data}
+        )
+
+        if asset.mimetype in COMPRESSIBLE_TYPES and len(data) >= self.app.config['STATIC_COMPRESS_MIN_SIZE']:
+            for encoding in ENCODINGS:
+                precompressed = path + SUFFIXES[encoding]
+                if os.path.isfile(precompressed) and os.path.getmtime(precompressed) >= mtime:
+                    with open(precompressed, 'rb') as f:
+                        asset.variants[encoding] = f.read()
+                elif encoding in _available_encodings():
+                    asset.variants[encoding] = _compress(data, encoding)
+
+        with self._lock:
+            self._assets[path] = asset
+        return asset
+
+    def send(self, filename: str):
+        asset = self._load(filename)
+        if asset is None:
+            abort(404)
+
+        encoding = negotiate(request.headers.get('Accept-Encoding', ''), asset.variants)
+        etag = asset.etag(encoding)
+
+        headers = {
+            'Cache-Control': IMMUTABLE_CACHE if HASHED_NAME.search(filename) else REVALIDATE_CACHE,
+            'Vary': 'Accept-Encoding'
+        }
+
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304, headers=headers)
+            response.set_etag(etag)
+            return response
+
+        response = Response(asset.variants[encoding], mimetype=asset.mimetype, headers=headers)
+        response.set_etag(etag)
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+        return response
+
+
+static_assets = StaticAssets()
+
+
+# Build
+
+INLINE_STYLE = re.compile(r'<style>(.*?)</style>', re.S)
+INLINE_SCRIPT = re.compile(r'<script( type="text/babel")?>(.*?)</script>', re.S)
+
+
+def _write_hashed(assets_dir: str, stem: str, extension: str, content: str) -> str:
+    data = content.encode('utf-8')
+    name = f'{stem}.{hashlib.sha256(data).hexdigest()[:10]}.{extension}'
+    with open(os.path.join(assets_dir, name), 'wb') as f:
+        f.write(data)
+    return f'/assets/{name}'
+
+
+def _split_html(html: str, stem: str, assets_dir: str) -> str:
+    """Move CSS/JS inline para arquivos com hash no nome (cacheáveis como imutáveis)"""
+
+    def replace_style(match):
+        href = _write_hashed(assets_dir, stem, 'css', match.group(1))
+        return f'<link rel="stylesheet" href="{href}">'
+
+    def replace_script(match):
+        babel = match.group(1) or ''
+        src = _write_hashed(assets_dir, stem, 'js', match.group(2))
+        return f'<script{babel} src="{src}"></script>'
+
+    return INLINE_SCRIPT.sub(replace_script, INLINE_STYLE.sub(replace_style, html))
+
+
+def build(static_dir: str, build_dir: str, split: bool = True, min_size: int = 1024) -> List[str]:
+    """
+    Gera em build_dir uma cópia de static_dir com o CSS/JS inline separado em
+    arquivos com hash e as variantes .gz/.br dos arquivos comprimíveis.
+    """
+    if os.path.isdir(build_dir):
+        shutil.rmtree(build_dir)
+    assets_dir = os.path.join(build_dir, 'assets')
+    os.makedirs(assets_dir)
+
+    build_dir_abs = os.path.abspath(build_dir)
+    for current, dirs, files in os.walk(static_dir):
+        dirs[:] = [d for d in dirs if os.path.abspath(os.path.join(current, d)) != build_dir_abs]
+        target_dir = os.path.join(build_dir, os.path.relpath(current, static_dir))
+        os.makedirs(target_dir, exist_ok=True)
+
+        for name in files:
+            if name.endswith(tuple(SUFFIXES.values())):
+                continue
+            source = os.path.join(current, name)
+            target = os.path.join(target_dir, name)
+            if split and name.endswith('.html'):
+                with open(source, encoding='utf-8') as f:
+                    html = _split_html(f.read(), os.path.splitext(name)[0], assets_dir)
+                with open(target, 'w', encoding='utf-8') as f:
+                    f.write(html)
+            else:
+                shutil.copy2(source, target)
+
+    written = []
+    for current, _, files in os.walk(build_dir):
+        for name in files:
+            path = os.path.join(current, name)
+            written.append(path)
+            if _mimetype(path) not in COMPRESSIBLE_TYPES or os.path.getsize(path) < min_size:
+                continue
+            with open(path, 'rb') as f:
+                data = f.read()
+            for encoding in _available_encodings():
+                with open(path + SUFFIXES[encoding], 'wb') as f:
+                    f.write(_compress(data, encoding))
+                written.append(path + SUFFIXES[encoding])
+
+    return sorted(written)
@@ -0,0 +1,77 @@
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+
+class StatisticsSnapshot:
+    """
+    Estatísticas do sistema recalculadas periodicamente por uma thread em background.
+    As requisições apenas leem o último snapshot em memória; nenhuma contagem roda no caminho da requisição.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._data: Optional[Dict[str, Any]] = None
+        self._refreshed_at: Optional[datetime] = None
+        self._error: Optional[str] = None
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('STATUS_REFRESH_INTERVAL', float(os.getenv('STATUS_REFRESH_INTERVAL', '60')))
+        app.extensions['statistics_snapshot'] = self
+        self.app = app
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='statistics-snapshot', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self.refresh()
+            time.sleep(self.app.config['STATUS_REFRESH_INTERVAL'])
+
+    def refresh(self):
+        from src.models.nutriai_models import db, User
+        from src.services.plan_stats import TOTAL_PLANS, PENDING_PLANS, get_counters
+
+        with self.app.app_context():
+            try:
+                counters = get_counters()
+                data = {
+                    'total_users': User.query.count(),
+                    'total_plans': counters[TOTAL_PLANS],
+                    'pending_validation': counters[PENDING_PLANS]
+                }
+                error = None
+            except Exception as e:
+                data, error = None, str(e)
+            finally:
+                db.session.remove()
+
+        with self._lock:
+            if data is not None:
+                self._data = data
+                self._refreshed_at = datetime.utcnow()
+            self._error = error
+
+    def get(self) -> Dict[str, Any]:
+        """Último snapshot (statistics=None enquanto o primeiro cálculo não termina)"""
+        self._ensure_started()
+        with self._lock:
+            return {
+                'statistics': dict(self._data) if self._data is not None else None,
+                'refreshed_at': self._refreshed_at.isoformat() if self._refreshed_at else None,
+                'refresh_interval': self.app.config['STATUS_REFRESH_INTERVAL'],
+                'error': self._error
+            }
+
+
+statistics_snapshot = StatisticsSnapshot()
@@ -0,0 +1,243 @@
+import csv
+import json
+import re
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+
+from src.models.nutriai_models import db, User, UserProfile, PROFILE_FIELDS
+from src.services.passwords import password_hasher
+
+FORMATS = ('csv', 'jsonl')
+USER_TYPES = ('user', 'nutritionist')
+
+# Campos aceitos por linha: os mesmos do POST /api/auth/register
+IMPORT_FIELDS = (('email', 'password', 'name', 'user_type') + User.REGISTRATION_FIELDS
+                 + PROFILE_FIELDS + User.NUTRITIONIST_FIELDS)
+
+_EMAIL = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+_TRUE = ('1', 'true', 'sim', 's', 'yes', 'y', 'x')
+_FALSE = ('0', 'false', 'nao', 'não', 'n', 'no')
+
+
+def _column_types() -> Dict[str, Any]:
+    columns = list(User.__table__.columns) + list(UserProfile.__table__.columns)
+    return {column.name: column.type for column in columns}
+
+
+_COLUMN_TYPES = _column_types()
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str] = None) -> Optional[str]:
+    """Formato pela extensão do arquivo ou pelo Content-Type"""
+    name = (filename or '').lower()
+    content_type = (content_type or '').lower()
+    if name.endswith('.csv') or 'csv' in content_type:
+        return 'csv'
+    if name.endswith(('.jsonl', '.ndjson')) or 'ndjson' in content_type or 'jsonl' in content_type:
+        return 'jsonl'
+    return None
+
+
+def iter_rows(stream, fmt: str) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """
+    Lê o arquivo (texto) linha a linha, sem carregá-lo inteiro.
+    Produz (número da linha, dados, erro); linhas ilegíveis vêm com dados None.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row, None
+        return
+
+    for line_no, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_no, None, f'JSON inválido: {e.msg}'
+            continue
+        if not isinstance(row, dict):
+            yield line_no, None, 'Cada linha deve ser um objeto JSON'
+            continue
+        yield line_no, row, None
+
+
+def _coerce(field: str, value):
+    """Converte o valor (texto no CSV) para o tipo da coluna; ValueError se inválido"""
+    if isinstance(value, str):
+        value = value.strip()
+        if value == '':
+            return None
+    if value is None:
+        return None
+
+    column_type = _COLUMN_TYPES.get(field)
+    python_type = column_type.python_type if column_type is not None else str
+    if python_type is bool:
+        if isinstance(value, bool):
+            return value
+        text = str(value).lower()
+        if text in _TRUE or text in _FALSE:
+            return text in _TRUE
+        raise ValueError(f'{field}: esperado sim/não')
+    if python_type in (int, float):
+        try:
+            number = float(str(value).replace(',', '.'))
+        except ValueError:
+            raise ValueError(f'{field}: esperado número')
+        if python_type is float:
+            return number
+        if not number.is_integer():
+            raise ValueError(f'{field}: esperado número inteiro')
+        return int(number)
+
+    value = str(value)
+    length = getattr(column_type, 'length', None)
+    if length and len(value) > length:
+        raise ValueError(f'{field}: máximo de {length} caracteres')
+    return value
+
+
+def normalize_row(row: Dict[str, Any], allowed_types=USER_TYPES) -> Tuple[Optional[dict], Optional[str]]:
+    """Valida a linha e devolve os dados no formato do register, ou a mensagem de erro"""
+    data = {}
+    try:
+        for field in IMPORT_FIELDS:
+            if field in row:
+                data[field] = _coerce(field, row[field])
+    except ValueError as e:
+        return None, str(e)
+
+    if not data.get('email') or not data.get('password') or not data.get('name'):
+        return None, 'Email, senha e nome são obrigatórios'
+    if not _EMAIL.match(data['email']):
+        return None, 'Email inválido'
+
+    data['user_type'] = data.get('user_type') or 'user'
+    if data['user_type'] not in allowed_types:
+        return None, f"Tipo de usuário não permitido: {data['user_type']}"
+    return data, None
+
+
+class ImportResult:
+    """Contadores da importação; guarda só os primeiros max_errors erros"""
+
+    def __init__(self, dry_run: bool = False, max_errors: int = 1000,
+                 on_error: Optional[Callable[[dict], None]] = None):
+        self.dry_run = dry_run
+        self.max_errors = max_errors
+        self.on_error = on_error
+        self.rows = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors: List[dict] = []
+        # Simulação: nada é gravado, então os emails dos lotes anteriores ficam aqui
+        # (cresce com o arquivo, só em dry_run)
+        self.dry_run_emails: set = set()
+
+    def fail(self, line: int, email: Optional[str], message: str):
+        self.failed += 1
+        error = {'line': line, 'email': email, 'error': message}
+        if len(self.errors) < self.max_errors:
+            self.errors.append(error)
+        if self.on_error is not None:
+            self.on_error(error)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'rows': self.rows,
+            'imported': self.imported,
+            'failed': self.failed,
+            'dry_run': self.dry_run,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors)
+        }
+
+
+def import_users(rows: Iterable[Tuple[int, Optional[dict], Optional[str]]], batch_size: int = 200,
+                 allowed_types=USER_TYPES, dry_run: bool = False, max_errors: int = 1000,
+                 on_error: Optional[Callable[[dict], None]] = None,
+                 on_batch: Optional[Callable[[ImportResult], None]] = None) -> ImportResult:
+    """
+    Importa os usuários de iter_rows em lotes: valida cada linha, descarta emails já
+    cadastrados ou repetidos no lote, gera os hashes do lote em paralelo
+    (password_hasher.hash_many) e grava o lote numa única transação.
+    A memória usada depende do tamanho do lote, não do arquivo (em dry_run, guarda também
+    os emails já vistos para apontar repetições entre lotes como a importação real).
+    """
+    result = ImportResult(dry_run, max_errors, on_error)
+    batch = []
+
+    for line, row, error in rows:
+        result.rows += 1
+        data = None
+        if error is None:
+            data, error = normalize_row(row, allowed_types)
+        if error is not None:
+            email = row.get('email') if isinstance(row, dict) else None
+            result.fail(line, email if isinstance(email, str) else None, error)
+            continue
+
+        batch.append((line, data))
+        if len(batch) >= batch_size:
+            _import_batch(batch, result)
+            batch = []
+            if on_batch is not None:
+                on_batch(result)
+
+    if batch:
+        _import_batch(batch, result)
+        if on_batch is not None:
+            on_batch(result)
+    return result
+
+
+def _import_batch(batch: List[Tuple[int, dict]], result: ImportResult):
+    # Emails repetidos no lote e já cadastrados (lotes anteriores já estão no banco,
+    # exceto em dry_run, quando vêm de result.dry_run_emails)
+    emails = [data['email'] for _, data in batch]
+    existing = {email for (email,) in db.session.query(User.email).filter(User.email.in_(emails))}
+    pending = []
+    seen = result.dry_run_emails if result.dry_run else set()
+    for line, data in batch:
+        if data['email'] in existing:
+            result.fail(line, data['email'], 'Email já cadastrado')
+        elif data['email'] in seen:
+            result.fail(line, data['email'], 'Email repetido no arquivo')
+        else:
+            seen.add(data['email'])
+            pending.append((line, data))
+
+    if result.dry_run or not pending:
+        result.imported += len(pending) if result.dry_run else 0
+        return
+
+    hashes = password_hasher.hash_many(data['password'] for _, data in pending)
+    users = []
+    for (_, data), password_hash in zip(pending, hashes):
+        user = User.from_registration(data)
+        user.password_hash = password_hash
+        users.append(user)
+
+    try:
+        db.session.add_all(users)
+        db.session.commit()
+        result.imported += len(users)
+    except IntegrityError:
+        # Conflito com um cadastro concorrente: refaz linha a linha para isolar a falha
+        db.session.rollback()
+        for (line, data), password_hash in zip(pending, hashes):
+            user = User.from_registration(data)
+            user.password_hash = password_hash
+            try:
+                db.session.add(user)
+                db.session.commit()
+                result.imported += 1
+            except IntegrityError:
+                db.session.rollback()
+                result.fail(line, data['email'], 'Email já cadastrado')
+    finally:
+        db.session.expunge_all()